@@ -1,367 +1,638 @@
-import streamlit as st
-import os
-from dotenv import load_dotenv
-from weather_service import WeatherService
-from julep_service import JulepAgentService
-from utils import (
-    load_css, get_weather_emoji, format_time, 
-    validate_api_key, create_download_content,
-    show_progress_with_message, clear_progress,
-    format_weather_display, extract_agent_response
-)
-
-# Load environment variables
-load_dotenv()
-
-# Page configuration
-st.set_page_config(
-    page_title="Foodie Tours",
-    page_icon="🍜",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# Load CSS
-load_css("styles.css")
-
-# Initialize session state
-if 'tours' not in st.session_state:
-    st.session_state.tours = {}
-if 'julep_service' not in st.session_state:
-    st.session_state.julep_service = None
-if 'weather_service' not in st.session_state:
-    st.session_state.weather_service = None
-
-def initialize_services():
-    """Initialize weather and Julep services"""
-    # Get API keys from environment
-    julep_key = os.getenv('JULEP_API_KEY')
-    weather_key = os.getenv('OPENWEATHER_API_KEY')
-    
-    if not julep_key:
-        st.error("❌ JULEP_API_KEY not found in environment variables!")
-        st.info("Please add your Julep API key to the .env file")
-        return False
-    
-    if not weather_key:
-        st.error("❌ OPENWEATHER_API_KEY not found in environment variables!")
-        st.info("Please add your OpenWeatherMap API key to the .env file")
-        return False
-    
-    # Validate API keys
-    julep_valid, julep_msg = validate_api_key(julep_key, "Julep API Key")
-    weather_valid, weather_msg = validate_api_key(weather_key, "Weather API Key")
-    
-    if not julep_valid:
-        st.error(f"❌ {julep_msg}")
-        return False
-    
-    if not weather_valid:
-        st.error(f"❌ {weather_msg}")
-        return False
-    
-    # Initialize services
-    try:
-        # Weather service
-        st.session_state.weather_service = WeatherService(weather_key)
-        
-        # Julep service
-        julep_service = JulepAgentService(julep_key)
-        if julep_service.initialize_client() and julep_service.create_agents():
-            st.session_state.julep_service = julep_service
-            return True
-        else:
-            return False
-            
-    except Exception as e:
-        st.error(f"❌ Error initializing services: {str(e)}")
-        return False
-
-def create_foodie_tour_for_city(city):
-    """Create a complete foodie tour for a single city using Julep workflow"""
-    
-    progress_bar, status_text = show_progress_with_message(0, "⚡ INITIATING WEATHER DATA NEURAL LINK...")
-    
-    # Get weather data
-    weather_data = st.session_state.weather_service.get_weather_data(city)
-    if not weather_data:
-        clear_progress(progress_bar, status_text)
-        st.error(f"❌ Could not fetch weather data for {city}")
-        return None
-    
-    # Display weather card
-    st.markdown(format_weather_display(weather_data), unsafe_allow_html=True)
-    
-    dining_rec = st.session_state.weather_service.get_dining_recommendation(weather_data)
-    st.markdown(f'<div class="highlight-text">{dining_rec}</div>', unsafe_allow_html=True)
-    
-    # Step 1: Weather Analysis using Julep Agent
-    progress_bar.progress(25)
-    status_text.text("🌤️ Analyzing weather with AI agent...")
-    
-    weather_prompt = f"""
-    Analyze the current weather in {city} and provide specific dining recommendations:
-    
-    Current Conditions:
-    - Temperature: {weather_data['temperature']}°C (feels like {weather_data['feels_like']}°C)
-    - Weather: {weather_data['description']}
-    - Rain Probability: {weather_data['rain_probability']}%
-    - Humidity: {weather_data['humidity']}%
-    - Wind Speed: {weather_data['wind_speed']} m/s
-    
-    Please provide:
-    1. Specific dining recommendations based on these conditions
-    2. Best times for outdoor dining (if applicable)
-    3. Weather-appropriate food and drink suggestions
-    4. Any special considerations for today's weather
-    
-    Keep your response conversational and practical.
-    """
-    
-    weather_analysis = st.session_state.julep_service.chat_with_agent("weather", weather_prompt)
-    weather_analysis = extract_agent_response(weather_analysis)
-    
-    # Step 2: Weather-appropriate dishes using Culinary Agent
-    progress_bar.progress(50)
-    status_text.text("🍜 Finding weather-appropriate local dishes with AI...")
-    
-    dishes_prompt = f"""
-    Recommend 3 iconic dishes from {city} that are perfect for today's weather:
-    - Temperature: {weather_data['temperature']}°C
-    - Conditions: {weather_data['description']}
-    - Rain probability: {weather_data['rain_probability']}%
-    
-    For each dish, explain:
-    1. What makes it iconic to {city}
-    2. Why it's perfect for today's weather
-    3. Its cultural significance
-    
-    Present this in a clear, engaging format.
-    """
-    
-    dishes = st.session_state.julep_service.chat_with_agent("culinary", dishes_prompt)
-    dishes = extract_agent_response(dishes)
-    
-    # Step 3: Find suitable restaurants using Restaurant Agent
-    progress_bar.progress(75)
-    status_text.text("🏨 Finding weather-suitable restaurants with AI...")
-    
-    restaurant_prompt = f"""
-    Find the best restaurants in {city} for today's weather conditions:
-    - Weather: {weather_data['temperature']}°C, {weather_data['description']}
-    - Rain probability: {weather_data['rain_probability']}%
-    - Recommended dining style: {dining_rec}
-    
-    For each restaurant, provide:
-    1. Name and location
-    2. Specialty dish
-    3. Why it's perfect for today's weather (indoor/outdoor seating)
-    4. What makes it special
-    
-    Focus on authentic, highly-rated places that suit today's conditions.
-    """
-    
-    restaurants = st.session_state.julep_service.chat_with_agent("restaurant", restaurant_prompt)
-    restaurants = extract_agent_response(restaurants)
-    
-    # Step 4: Create tour narrative using Tour Agent
-    progress_bar.progress(90)
-    status_text.text("📖 Creating your personalized tour narrative...")
-    
-    tour_prompt = f"""
-    Create an engaging one-day foodie tour for {city} that adapts to today's weather:
-    
-    Weather Context: {weather_data['temperature']}°C, {weather_data['description']}, {weather_data['rain_probability']}% rain chance
-    
-    Include:
-    1. Morning, afternoon, and evening activities
-    2. Specific timing recommendations
-    3. Weather-appropriate transitions between locations
-    4. Cultural stories and local insights
-    5. Backup plans if weather changes
-    
-    Make it feel like a personal guide is talking to the reader.
-    """
-    
-    narrative = st.session_state.julep_service.chat_with_agent("tour", tour_prompt)
-    narrative = extract_agent_response(narrative)
-    
-    # Step 5: Final coordination using Coordinator Agent
-    progress_bar.progress(100)
-    status_text.text("🎯 Finalizing your complete guide...")
-    
-    coordinator_prompt = f"""
-    Create a comprehensive, easy-to-follow foodie tour guide for {city} that incorporates:
-    - Current weather conditions and recommendations
-    - Weather-appropriate local dishes
-    - Suitable restaurants for today's conditions
-    - A complete day itinerary
-    
-    Format this as a practical guide that someone could actually use today, with clear sections and actionable advice.
-    """
-    
-    final_tour = st.session_state.julep_service.chat_with_agent("coordinator", coordinator_prompt)
-    final_tour = extract_agent_response(final_tour)
-    
-    clear_progress(progress_bar, status_text)
-    st.success("✅ AI-powered tour complete!")
-    
-    return {
-        "city": city,
-        "weather_data": weather_data,
-        "dining_recommendations": dining_rec,
-        "weather_analysis": weather_analysis,
-        "dishes": dishes,
-        "restaurants": restaurants,
-        "narrative": narrative,
-        "final_tour": final_tour
-    }
-
-def display_tour(tour):
-    """Display a single tour with beautiful formatting"""
-    
-    # Weather analysis section
-    st.markdown('<div class="content-section fade-in">', unsafe_allow_html=True)
-    st.markdown("### 🌤️ AI Weather Analysis & Dining Strategy")
-    st.markdown(tour["weather_analysis"])
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Dishes section
-    st.markdown('<div class="dish-card fade-in">', unsafe_allow_html=True)
-    st.markdown("### 🍜 AI-Curated Dishes for Today's Weather")
-    st.markdown(tour["dishes"])
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Restaurants section
-    st.markdown('<div class="restaurant-card fade-in">', unsafe_allow_html=True)
-    st.markdown("### 🏨 Weather-Perfect Restaurant Recommendations")
-    st.markdown(tour["restaurants"])
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Tour narrative
-    st.markdown('<div class="tour-timeline fade-in">', unsafe_allow_html=True)
-    st.markdown("### 📖 Your AI-Crafted Day Adventure")
-    st.markdown(tour["narrative"])
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Final comprehensive guide
-    st.markdown('<div class="content-section fade-in">', unsafe_allow_html=True)
-    st.markdown("### 🎯 Complete AI-Generated Tour Guide")
-    st.markdown(tour["final_tour"])
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Download button
-    tour_content = create_download_content(tour)
-    
-    st.download_button(
-        label="📥 Download Complete Tour Guide",
-        data=tour_content,
-        file_name=f"{tour['city']}_AI_foodie_tour.md",
-        mime="text/markdown"
-    )
-
-def main():
-    """Main application function"""
-    
-    # Main Header with App Title
-    st.markdown('<div class="main-header">🍜 FOODIE TOURS</div>', unsafe_allow_html=True)
-    
-    # Mood-based Food Tagline
-    st.markdown('<div class="mood-tagline">🎭 Choose Food According to Your Mood 🍽️</div>', unsafe_allow_html=True)
-    
-    # Header with cyberpunk styling    # Sidebar
-    with st.sidebar:
-        st.markdown('<div class="holo-header"><h3>🍽️ CULINARY AI COMMAND CENTER</h3></div>', unsafe_allow_html=True)
-        
-        # Julep Logo
-        st.image("img/julep3.png", width=200)
-        st.markdown('<div class="holo-divider"></div>', unsafe_allow_html=True)
-        
-        # API Status
-        julep_key = os.getenv('JULEP_API_KEY')
-        weather_key = os.getenv('OPENWEATHER_API_KEY')
-        
-        # City selection
-        st.markdown('<div class="holo-header"><h4>🗺️ CULINARY DESTINATIONS HUB</h4></div>', unsafe_allow_html=True)
-        
-        popular_cities = [
-            "Tokyo", "Paris", "New York", "Bangkok", "Istanbul",
-            "Rome", "Barcelona", "London", "Mumbai", "Seoul",
-            "Mexico City", "Buenos Aires", "Cairo", "Sydney", "Berlin",
-            "Singapore", "Hong Kong", "Dubai", "Los Angeles", "Amsterdam"
-        ]
-        
-        st.markdown('<div class="data-panel">', unsafe_allow_html=True)
-        selected_cities = st.multiselect(
-            "Select cities for AI culinary exploration:",
-            popular_cities,
-            default=["Tokyo"],
-            help="Choose destinations to discover local food culture and create personalized tours"
-        )
-        
-        custom_city = st.text_input("Add your own destination:")
-        if custom_city and custom_city not in selected_cities:
-            selected_cities.append(custom_city)
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        st.markdown('<div class="holo-divider"></div>', unsafe_allow_html=True)
-          # Julep AI info
-        st.markdown('<div class="holo-header"><h4>⬢ NEURAL ARCHITECTURE</h4></div>', unsafe_allow_html=True)
-        st.markdown('<div class="data-panel">', unsafe_allow_html=True)
-        st.info("""
-        **Integrated AI Matrix:**
-        - 🌤️ Weather & Dining Strategist
-        - 🍜 Local Cuisine Specialist  
-        - 🏨 Restaurant Discovery Agent
-        - 📖 Tour Experience Designer
-        - 🎯 Foodie Tour Coordinator
-        """)
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        if os.getenv("DEBUG") == "True":
-            st.warning("🔧 Debug mode enabled")
-    
-    # Main content
-    if not selected_cities:
-        st.info("👈 Activate neural coordinates from control panel to initialize AI gastronomy protocols!")
-        return
-    
-    # Initialize services
-    if st.session_state.julep_service is None or st.session_state.weather_service is None:
-        with st.spinner("🚀 Initializing Julep AI agents and services..."):
-            if not initialize_services():
-                return
-        st.success("✅ Julep AI multi-agent system initialized successfully!")
-      # Generate tours button
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        if st.button("🍽️ CREATE AI-POWERED FOODIE TOURS", key="generate_tours"):
-            st.session_state.tours = {}
-            
-            for city in selected_cities:
-                st.markdown(f'<div class="city-card slide-in"><h3>🤖 AI agents creating tour for {city}...</h3></div>', unsafe_allow_html=True)
-                
-                try:
-                    tour = create_foodie_tour_for_city(city)
-                    if tour:
-                        st.session_state.tours[city] = tour
-                        st.markdown(f'<div class="success-message">✅ {city} AI tour completed!</div>', unsafe_allow_html=True)
-                    
-                except Exception as e:
-                        st.markdown(f'<div class="error-message">❌ Error creating AI tour for {city}: {str(e)}</div>', unsafe_allow_html=True)
-    
-    # Display tours
-    if st.session_state.tours:
-        st.markdown("## 🗺️ Your AI-Powered Foodie Tours")
-        
-        if len(st.session_state.tours) > 1:
-            tabs = st.tabs(list(st.session_state.tours.keys()))
-            for i, (city, tour) in enumerate(st.session_state.tours.items()):
-                with tabs[i]:
-                    display_tour(tour)
-        else:
-            city, tour = next(iter(st.session_state.tours.items()))
-            display_tour(tour)
-
-if __name__ == "__main__":
-    main()
+import streamlit as st
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from weather_service import WeatherService
+from julep_service import JulepAgentService, RESPONSE_CACHE_TTL
+from cache import TTLCache
+from persistent_cache import open_persistent_cache
+from cassette import open_cassette
+from tour_cache import TourStore, to_shared_tour, to_app_tour
+from pipeline import Step, run_step_graph
+from singleflight import SingleFlight
+from metrics import metrics
+from utils import (
+    load_css, get_weather_emoji, format_time, 
+    validate_api_key, create_download_content,
+    show_progress_with_message, clear_progress,
+    format_weather_display, extract_agent_response
+)
+
+# Load environment variables
+load_dotenv()
+
+# Page configuration
+st.set_page_config(
+    page_title="Foodie Tours",
+    page_icon="🍜",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Load CSS
+load_css("styles.css")
+
+# Initialize session state
+if 'tours' not in st.session_state:
+    st.session_state.tours = {}
+if 'julep_service' not in st.session_state:
+    st.session_state.julep_service = None
+if 'weather_service' not in st.session_state:
+    st.session_state.weather_service = None
+
+@st.cache_resource
+def get_persistent_cache():
+    """Open the on-disk cache shared with the MCP server (once per process)"""
+    return open_persistent_cache()
+
+@st.cache_resource
+def get_cassette():
+    """Upstream record/replay cassette configured by FOODIE_CASSETTE (once per process)"""
+    return open_cassette()
+
+@st.cache_resource
+def get_response_cache():
+    """Agent response memo shared by all browser sessions in this process"""
+    return TTLCache(max_entries=1024, ttl=RESPONSE_CACHE_TTL)
+
+def initialize_services():
+    """Initialize weather and Julep services"""
+    # Get API keys from environment
+    julep_key = os.getenv('JULEP_API_KEY')
+    weather_key = os.getenv('OPENWEATHER_API_KEY')
+    
+    if not julep_key:
+        st.error("❌ JULEP_API_KEY not found in environment variables!")
+        st.info("Please add your Julep API key to the .env file")
+        return False
+    
+    if not weather_key:
+        st.error("❌ OPENWEATHER_API_KEY not found in environment variables!")
+        st.info("Please add your OpenWeatherMap API key to the .env file")
+        return False
+    
+    # Validate API keys
+    julep_valid, julep_msg = validate_api_key(julep_key, "Julep API Key")
+    weather_valid, weather_msg = validate_api_key(weather_key, "Weather API Key")
+    
+    if not julep_valid:
+        st.error(f"❌ {julep_msg}")
+        return False
+    
+    if not weather_valid:
+        st.error(f"❌ {weather_msg}")
+        return False
+    
+    # Initialize services
+    try:
+        # Weather service
+        st.session_state.weather_service = WeatherService(
+            weather_key, persistent_cache=get_persistent_cache(), cassette=get_cassette()
+        )
+        
+        # Julep service
+        julep_service = JulepAgentService(
+            julep_key,
+            persistent_cache=get_persistent_cache(),
+            response_cache=get_response_cache(),
+            cassette=get_cassette()
+        )
+        if julep_service.initialize_client() and julep_service.create_agents():
+            st.session_state.julep_service = julep_service
+            return True
+        else:
+            return False
+            
+    except Exception as e:
+        st.error(f"❌ Error initializing services: {str(e)}")
+        return False
+
+# Maximum agent calls in flight for a single city's tour
+TOUR_STEP_WORKERS = 4
+# Maximum city tours generated at once across all browser sessions
+MAX_CONCURRENT_CITIES = max(1, int(os.getenv("FOODIE_MAX_CONCURRENT_CITIES", "3")))
+
+TOUR_STEP_MESSAGES = {
+    "weather_analysis": "🌤️ Weather analysis ready...",
+    "dishes": "🍜 Weather-appropriate local dishes found...",
+    "restaurants": "🏨 Weather-suitable restaurants found...",
+    "narrative": "📖 Tour narrative crafted...",
+    "final_tour": "🎯 Finalizing your complete guide..."
+}
+
+def build_tour_steps(city, julep_service, on_chunk=None):
+    """
+    Build the agent step graph for a city's tour
+    
+    The weather, dishes, restaurants and narrative steps only need the
+    weather data, so they run concurrently; the coordinator waits for them.
+    When on_chunk is given, agent output is streamed and reported as
+    (step name, text so far) from the step's worker thread.
+    """
+    
+    def ask(step_name, agent_type, prompt):
+        with metrics.timer(f"app.step.{step_name}"):
+            if on_chunk is None:
+                return extract_agent_response(julep_service.chat_with_agent(agent_type, prompt))
+            
+            text = ""
+            for chunk in julep_service.chat_with_agent_stream(agent_type, prompt):
+                text += chunk
+                on_chunk(step_name, text)
+            return extract_agent_response(text)
+    
+    def weather_analysis_step(weather_data):
+        weather_prompt = f"""
+    Analyze the current weather in {city} and provide specific dining recommendations:
+    
+    Current Conditions:
+    - Temperature: {weather_data['temperature']}°C (feels like {weather_data['feels_like']}°C)
+    - Weather: {weather_data['description']}
+    - Rain Probability: {weather_data['rain_probability']}%
+    - Humidity: {weather_data['humidity']}%
+    - Wind Speed: {weather_data['wind_speed']} m/s
+    
+    Please provide:
+    1. Specific dining recommendations based on these conditions
+    2. Best times for outdoor dining (if applicable)
+    3. Weather-appropriate food and drink suggestions
+    4. Any special considerations for today's weather
+    
+    Keep your response conversational and practical.
+    """
+        return ask("weather_analysis", "weather", weather_prompt)
+    
+    def dishes_step(weather_data):
+        dishes_prompt = f"""
+    Recommend 3 iconic dishes from {city} that are perfect for today's weather:
+    - Temperature: {weather_data['temperature']}°C
+    - Conditions: {weather_data['description']}
+    - Rain probability: {weather_data['rain_probability']}%
+    
+    For each dish, explain:
+    1. What makes it iconic to {city}
+    2. Why it's perfect for today's weather
+    3. Its cultural significance
+    
+    Present this in a clear, engaging format.
+    """
+        return ask("dishes", "culinary", dishes_prompt)
+    
+    def restaurants_step(weather_data, dining_rec):
+        restaurant_prompt = f"""
+    Find the best restaurants in {city} for today's weather conditions:
+    - Weather: {weather_data['temperature']}°C, {weather_data['description']}
+    - Rain probability: {weather_data['rain_probability']}%
+    - Recommended dining style: {dining_rec}
+    
+    For each restaurant, provide:
+    1. Name and location
+    2. Specialty dish
+    3. Why it's perfect for today's weather (indoor/outdoor seating)
+    4. What makes it special
+    
+    Focus on authentic, highly-rated places that suit today's conditions.
+    """
+        return ask("restaurants", "restaurant", restaurant_prompt)
+    
+    def narrative_step(weather_data):
+        tour_prompt = f"""
+    Create an engaging one-day foodie tour for {city} that adapts to today's weather:
+    
+    Weather Context: {weather_data['temperature']}°C, {weather_data['description']}, {weather_data['rain_probability']}% rain chance
+    
+    Include:
+    1. Morning, afternoon, and evening activities
+    2. Specific timing recommendations
+    3. Weather-appropriate transitions between locations
+    4. Cultural stories and local insights
+    5. Backup plans if weather changes
+    
+    Make it feel like a personal guide is talking to the reader.
+    """
+        return ask("narrative", "tour", tour_prompt)
+    
+    def final_tour_step(**earlier_outputs):
+        # Waits for every other step so it still runs last; their answers aren't embedded
+        coordinator_prompt = f"""
+    Create a comprehensive, easy-to-follow foodie tour guide for {city} that incorporates:
+    - Current weather conditions and recommendations
+    - Weather-appropriate local dishes
+    - Suitable restaurants for today's conditions
+    - A complete day itinerary
+    
+    Format this as a practical guide that someone could actually use today, with clear sections and actionable advice.
+    """
+        return ask("final_tour", "coordinator", coordinator_prompt)
+    
+    return [
+        Step("weather_analysis", weather_analysis_step, ["weather_data"]),
+        Step("dishes", dishes_step, ["weather_data"]),
+        Step("restaurants", restaurants_step, ["weather_data", "dining_rec"]),
+        Step("narrative", narrative_step, ["weather_data"]),
+        Step("final_tour", final_tour_step, ["weather_data", "weather_analysis", "dishes", "restaurants", "narrative"])
+    ]
+
+def generate_tour(city, weather_service, julep_service, tour_store, flights=None,
+                  on_weather=None, on_step_done=None, on_chunk=None):
+    """
+    Build the tour for a city without touching the Streamlit UI
+    
+    Safe to call from worker threads: services are passed in explicitly.
+    on_weather and on_step_done run on the calling thread; on_chunk runs
+    on the agent step threads.
+    
+    Args:
+        city: Name of the city
+        weather_service: WeatherService instance
+        julep_service: JulepAgentService instance
+        tour_store: TourStore shared with the MCP server
+        flights: SingleFlight coalescing identical in-flight tours; a caller
+            joining another's run gets on_step_done replayed at the end,
+            but no on_chunk streaming
+        on_weather: Called as (weather_data, dining_rec) once weather is known
+        on_step_done: Called as (step name, output) as each agent step finishes
+        on_chunk: Called as (step name, text so far) while agent output streams in
+        
+    Returns:
+        Tour dictionary, or None if weather data is unavailable
+    """
+    weather_data = weather_service.get_weather_data(city)
+    if not weather_data:
+        return None
+    
+    dining_rec = weather_service.get_dining_recommendation(weather_data)
+    if on_weather:
+        on_weather(weather_data, dining_rec)
+    
+    # Reuse a tour generated under the same weather bucket by any session or the MCP server
+    cached_tour = tour_store.get(city, weather_data)
+    if cached_tour:
+        tour = to_app_tour(cached_tour)
+        tour.setdefault("dining_recommendations", dining_rec)
+        return tour
+    
+    def build():
+        # Agent steps run concurrently as soon as their inputs are ready
+        with metrics.timer("app.tour"):
+            results = run_step_graph(
+                build_tour_steps(city, julep_service, on_chunk=on_chunk),
+                {"weather_data": weather_data, "dining_rec": dining_rec},
+                max_workers=TOUR_STEP_WORKERS,
+                on_step_done=on_step_done
+            )
+        
+        tour = {
+            "city": city,
+            "weather_data": weather_data,
+            "dining_recommendations": dining_rec,
+            "weather_analysis": results["weather_analysis"],
+            "dishes": results["dishes"],
+            "restaurants": results["restaurants"],
+            "narrative": results["narrative"],
+            "final_tour": results["final_tour"]
+        }
+        tour_store.put(city, weather_data, to_shared_tour(tour))
+        return tour
+    
+    if flights is None:
+        return build()
+    
+    # Identical requests from other sessions wait on one pipeline run
+    tour, shared = flights.do(tour_store.key(city, weather_data), build)
+    if shared and on_step_done:
+        # Step names double as the tour fields holding their output
+        for step_name in TOUR_STEP_MESSAGES:
+            on_step_done(step_name, tour[step_name])
+    return dict(tour)
+
+def pump_events(futures, events, handle_event, on_done):
+    """
+    Render worker events on the script thread until every future finishes
+    
+    Streamlit elements can only be updated from the script thread, so
+    workers put (key, kind, payload) events on a queue and this loop
+    hands them to handle_event.
+    
+    Args:
+        futures: Dictionary of future -> key; emptied as futures finish
+        events: Queue of (key, kind, payload) tuples
+        handle_event: Called as (key, kind, payload)
+        on_done: Called as (key, future) once a future has finished
+    """
+    while futures:
+        finished = [future for future in futures if future.done()]
+        try:
+            # Block briefly for the next event, then drain whatever else is queued
+            handle_event(*events.get(timeout=0.1))
+            while True:
+                handle_event(*events.get_nowait())
+        except queue.Empty:
+            pass
+        
+        for future in finished:
+            on_done(futures.pop(future), future)
+
+def create_live_sections():
+    """Create one placeholder per tour section for streamed agent output"""
+    return {section: st.empty() for section, _, _ in TOUR_SECTIONS}
+
+def render_live_section(sections, step_name, text):
+    """Show partially streamed agent output in its tour section"""
+    heading = next(heading for section, _, heading in TOUR_SECTIONS if section == step_name)
+    sections[step_name].markdown(f"{heading}\n\n{text} ▌")
+
+def clear_live_sections(sections):
+    """Remove streamed previews once the finished tour is displayed"""
+    for placeholder in sections.values():
+        placeholder.empty()
+
+def create_foodie_tour_for_city(city):
+    """Create a complete foodie tour for a single city using Julep workflow"""
+    
+    progress_bar, status_text = show_progress_with_message(0, "⚡ INITIATING WEATHER DATA NEURAL LINK...")
+    weather_card = st.empty()
+    dining_card = st.empty()
+    sections = create_live_sections()
+    completed = []
+    events = queue.Queue()
+    
+    def handle_event(key, kind, payload):
+        if kind == "weather":
+            weather_data, dining_rec = payload
+            # Display weather card
+            weather_card.markdown(format_weather_display(weather_data), unsafe_allow_html=True)
+            dining_card.markdown(f'<div class="highlight-text">{dining_rec}</div>', unsafe_allow_html=True)
+            progress_bar.progress(10)
+            status_text.text("🤖 AI agents are working on your tour...")
+        elif kind == "chunk":
+            render_live_section(sections, *payload)
+        elif kind == "step":
+            completed.append(payload)
+            progress_bar.progress(10 + 90 * len(completed) // len(TOUR_STEP_MESSAGES))
+            status_text.text(TOUR_STEP_MESSAGES[payload])
+    
+    result = {}
+    
+    def on_done(key, future):
+        result["tour"] = future.result()
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(
+            generate_tour,
+            city,
+            st.session_state.weather_service,
+            st.session_state.julep_service,
+            TourStore(get_persistent_cache()),
+            get_tour_flights(),
+            on_weather=lambda weather_data, dining_rec: events.put((city, "weather", (weather_data, dining_rec))),
+            on_step_done=lambda step_name, output: events.put((city, "step", step_name)),
+            on_chunk=lambda step_name, text: events.put((city, "chunk", (step_name, text)))
+        )
+        try:
+            pump_events({future: city}, events, handle_event, on_done)
+        finally:
+            # Agent errors propagate to the caller; don't leave progress behind
+            clear_progress(progress_bar, status_text)
+            clear_live_sections(sections)
+    
+    tour = result["tour"]
+    if not tour:
+        st.error(f"❌ Could not fetch weather data for {city}")
+        return None
+    
+    if completed:
+        st.success("✅ AI-powered tour complete!")
+    else:
+        st.success("✅ Loaded a tour for matching weather from cache!")
+    return tour
+
+@st.cache_resource
+def get_tour_flights():
+    """Coalesces identical in-flight tours across all sessions in this process"""
+    return SingleFlight()
+
+@st.cache_resource
+def get_city_slots():
+    """Process-wide cap on city pipelines running at once, shared by all sessions"""
+    return threading.BoundedSemaphore(MAX_CONCURRENT_CITIES)
+
+def create_foodie_tours_concurrently(cities):
+    """
+    Generate tours for several cities in parallel, rendering each tab when ready
+    
+    Each city runs in its own worker thread and errors are isolated per
+    city. Agent output streams into the city's tab while it is generated.
+    
+    Returns:
+        Dictionary of city -> tour for the cities that succeeded
+    """
+    weather_service = st.session_state.weather_service
+    julep_service = st.session_state.julep_service
+    tour_store = TourStore(get_persistent_cache())
+    flights = get_tour_flights()
+    city_slots = get_city_slots()
+    events = queue.Queue()
+    
+    def run_city(city):
+        with city_slots:
+            events.put((city, "started", None))
+            return generate_tour(
+                city, weather_service, julep_service, tour_store, flights,
+                on_step_done=lambda step_name, output: events.put((city, "step", step_name)),
+                on_chunk=lambda step_name, text: events.put((city, "chunk", (step_name, text)))
+            )
+    
+    tabs = dict(zip(cities, st.tabs(cities)))
+    progress = {}
+    sections = {}
+    steps_done = {city: 0 for city in cities}
+    for city, tab in tabs.items():
+        with tab:
+            progress[city] = show_progress_with_message(0, f"⏳ Waiting for a free slot for {city}...")
+            sections[city] = create_live_sections()
+    
+    def handle_event(city, kind, payload):
+        progress_bar, status_text = progress[city]
+        if kind == "started":
+            progress_bar.progress(5)
+            status_text.text(f"🤖 AI agents creating tour for {city}...")
+        elif kind == "chunk":
+            render_live_section(sections[city], *payload)
+        elif kind == "step":
+            steps_done[city] += 1
+            progress_bar.progress(5 + 95 * steps_done[city] // len(TOUR_STEP_MESSAGES))
+            status_text.text(TOUR_STEP_MESSAGES[payload])
+    
+    tours = {}
+    
+    def on_done(city, future):
+        clear_progress(*progress[city])
+        clear_live_sections(sections[city])
+        with tabs[city]:
+            try:
+                tour = future.result()
+            except Exception as e:
+                st.markdown(f'<div class="error-message">❌ Error creating AI tour for {city}: {str(e)}</div>', unsafe_allow_html=True)
+                return
+            
+            if not tour:
+                st.error(f"❌ Could not fetch weather data for {city}")
+                return
+            
+            tours[city] = tour
+            st.markdown(format_weather_display(tour["weather_data"]), unsafe_allow_html=True)
+            st.markdown(f'<div class="highlight-text">{tour["dining_recommendations"]}</div>', unsafe_allow_html=True)
+            display_tour(tour)
+    
+    with ThreadPoolExecutor(max_workers=min(len(cities), MAX_CONCURRENT_CITIES)) as executor:
+        futures = {executor.submit(run_city, city): city for city in cities}
+        pump_events(futures, events, handle_event, on_done)
+    
+    # Keep the user's city order rather than completion order
+    return {city: tours[city] for city in cities if city in tours}
+
+# Tour sections in display order: (tour field, card CSS class, heading)
+TOUR_SECTIONS = [
+    ("weather_analysis", "content-section", "### 🌤️ AI Weather Analysis & Dining Strategy"),
+    ("dishes", "dish-card", "### 🍜 AI-Curated Dishes for Today's Weather"),
+    ("restaurants", "restaurant-card", "### 🏨 Weather-Perfect Restaurant Recommendations"),
+    ("narrative", "tour-timeline", "### 📖 Your AI-Crafted Day Adventure"),
+    ("final_tour", "content-section", "### 🎯 Complete AI-Generated Tour Guide")
+]
+
+def display_tour(tour):
+    """Display a single tour with beautiful formatting"""
+    
+    for section, css_class, heading in TOUR_SECTIONS:
+        st.markdown(f'<div class="{css_class} fade-in">', unsafe_allow_html=True)
+        st.markdown(heading)
+        st.markdown(tour[section])
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Download button
+    tour_content = create_download_content(tour)
+    
+    st.download_button(
+        label="📥 Download Complete Tour Guide",
+        data=tour_content,
+        file_name=f"{tour['city']}_AI_foodie_tour.md",
+        mime="text/markdown"
+    )
+
+def main():
+    """Main application function"""
+    
+    # Main Header with App Title
+    st.markdown('<div class="main-header">🍜 FOODIE TOURS</div>', unsafe_allow_html=True)
+    
+    # Mood-based Food Tagline
+    st.markdown('<div class="mood-tagline">🎭 Choose Food According to Your Mood 🍽️</div>', unsafe_allow_html=True)
+    
+    # Header with cyberpunk styling    # Sidebar
+    with st.sidebar:
+        st.markdown('<div class="holo-header"><h3>🍽️ CULINARY AI COMMAND CENTER</h3></div>', unsafe_allow_html=True)
+        
+        # Julep Logo
+        st.image("img/julep3.png", width=200)
+        st.markdown('<div class="holo-divider"></div>', unsafe_allow_html=True)
+        
+        # API Status
+        julep_key = os.getenv('JULEP_API_KEY')
+        weather_key = os.getenv('OPENWEATHER_API_KEY')
+        
+        # City selection
+        st.markdown('<div class="holo-header"><h4>🗺️ CULINARY DESTINATIONS HUB</h4></div>', unsafe_allow_html=True)
+        
+        popular_cities = [
+            "Tokyo", "Paris", "New York", "Bangkok", "Istanbul",
+            "Rome", "Barcelona", "London", "Mumbai", "Seoul",
+            "Mexico City", "Buenos Aires", "Cairo", "Sydney", "Berlin",
+            "Singapore", "Hong Kong", "Dubai", "Los Angeles", "Amsterdam"
+        ]
+        
+        st.markdown('<div class="data-panel">', unsafe_allow_html=True)
+        selected_cities = st.multiselect(
+            "Select cities for AI culinary exploration:",
+            popular_cities,
+            default=["Tokyo"],
+            help="Choose destinations to discover local food culture and create personalized tours"
+        )
+        
+        custom_city = st.text_input("Add your own destination:")
+        if custom_city and custom_city not in selected_cities:
+            selected_cities.append(custom_city)
+        st.markdown('</div>', unsafe_allow_html=True)
+        
+        st.markdown('<div class="holo-divider"></div>', unsafe_allow_html=True)
+          # Julep AI info
+        st.markdown('<div class="holo-header"><h4>⬢ NEURAL ARCHITECTURE</h4></div>', unsafe_allow_html=True)
+        st.markdown('<div class="data-panel">', unsafe_allow_html=True)
+        st.info("""
+        **Integrated AI Matrix:**
+        - 🌤️ Weather & Dining Strategist
+        - 🍜 Local Cuisine Specialist  
+        - 🏨 Restaurant Discovery Agent
+        - 📖 Tour Experience Designer
+        - 🎯 Foodie Tour Coordinator
+        """)
+        st.markdown('</div>', unsafe_allow_html=True)
+        
+        if os.getenv("DEBUG") == "True":
+            st.warning("🔧 Debug mode enabled")
+    
+    # Main content
+    if not selected_cities:
+        st.info("👈 Activate neural coordinates from control panel to initialize AI gastronomy protocols!")
+        return
+    
+    # Initialize services
+    if st.session_state.julep_service is None or st.session_state.weather_service is None:
+        with st.spinner("🚀 Initializing Julep AI agents and services..."):
+            if not initialize_services():
+                return
+        st.success("✅ Julep AI multi-agent system initialized successfully!")
+      # Generate tours button
+    rendered_live = False
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        if st.button("🍽️ CREATE AI-POWERED FOODIE TOURS", key="generate_tours"):
+            st.session_state.tours = {}
+
+            if len(selected_cities) > 1:
+                # Warm the weather cache for every selected city in one batch
+                st.session_state.weather_service.get_weather_data_many(selected_cities)
+                
+                # Generate all cities in parallel; each tab renders as soon as its tour is ready
+                st.session_state.tours = create_foodie_tours_concurrently(selected_cities)
+                rendered_live = True
+            else:
+                city = selected_cities[0]
+                st.markdown(f'<div class="city-card slide-in"><h3>🤖 AI agents creating tour for {city}...</h3></div>', unsafe_allow_html=True)
+                
+                try:
+                    tour = create_foodie_tour_for_city(city)
+                    if tour:
+                        st.session_state.tours[city] = tour
+                        st.markdown(f'<div class="success-message">✅ {city} AI tour completed!</div>', unsafe_allow_html=True)
+                    
+                except Exception as e:
+                        st.markdown(f'<div class="error-message">❌ Error creating AI tour for {city}: {str(e)}</div>', unsafe_allow_html=True)
+    
+    # Display tours (multi-city runs were already rendered tab by tab)
+    if st.session_state.tours and not rendered_live:
+        st.markdown("## 🗺️ Your AI-Powered Foodie Tours")
+        
+        if len(st.session_state.tours) > 1:
+            tabs = st.tabs(list(st.session_state.tours.keys()))
+            for i, (city, tour) in enumerate(st.session_state.tours.items()):
+                with tabs[i]:
+                    display_tour(tour)
+        else:
+            city, tour = next(iter(st.session_state.tours.items()))
+            display_tour(tour)
+
+if __name__ == "__main__":
+    main()
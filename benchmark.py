@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark for the Foodie Tours pipelines
+
+Runs the Streamlit tour pipeline (generate_tour, the worker behind
+create_foodie_tour_for_city), the MCP create_complete_foodie_tour flow and
+the Julep task (execute_foodie_tour) against local stand-ins for
+OpenWeatherMap and Julep (see stub_upstreams.py), at several concurrency
+levels. No API keys or network access are needed.
+
+Per level it reports per-city latency, tours per minute and upstream call
+counts, and writes everything to a JSON file so runs can be compared:
+
+    python benchmark.py --levels 1,4,8 --julep-latency 0.5 --julep-error-rate 0.02
+    python benchmark.py --compare benchmark_results/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cassette import Cassette
+from stub_upstreams import LatencyModel, StubJulepClient, StubWeatherServer
+
+# Rate limit variables zeroed for the run unless --keep-rate-limits is given
+RATE_LIMIT_VARIABLES = ('FOODIE_WEATHER_RATE_PER_MIN', 'FOODIE_JULEP_RATE_PER_MIN', 'FOODIE_JULEP_AGENT_RATE_PER_MIN')
+# Scenarios in run order
+SCENARIOS = ('app', 'mcp', 'task')
+# Where results are written when --output is not given
+RESULTS_DIR = "benchmark_results"
+# Relative change in p95 latency or throughput reported as a regression
+REGRESSION_THRESHOLD = 0.10
+
+
+class BenchContext:
+    """Stand-in for the MCP request context that discards notifications"""
+
+    async def info(self, message: str):
+        pass
+
+    async def error(self, message: str):
+        pass
+
+    async def report_progress(self, progress: float, total: Optional[float] = None):
+        pass
+
+
+class Upstreams:
+    """The stub upstreams (or a replayed cassette) and a factory for wired-up services"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.weather: Optional[StubWeatherServer] = None
+        self.julep: Optional[StubJulepClient] = None
+        self.cassette: Optional[Cassette] = None
+        if not args.cassette:
+            self.weather = StubWeatherServer(
+                latency=LatencyModel(args.weather_latency, args.sigma, seed=args.seed),
+                error_rate=args.weather_error_rate,
+                seed=args.seed
+            )
+            self.weather_url = self.weather.start()
+
+    def build_services(self) -> Tuple[Any, Any]:
+        """Fresh services (cold caches, closed circuits) wired to the stubs or the cassette"""
+        from julep_service import JulepAgentService
+        from weather_service import WeatherService
+
+        hedge_requests = not self.args.no_hedge
+        if self.args.cassette:
+            # Reloaded per level so every level replays the recording from the start
+            self.cassette = Cassette(self.args.cassette, latency_scale=self.args.cassette_latency)
+            weather_service = WeatherService("benchmark", cassette=self.cassette)
+            julep_service = JulepAgentService("benchmark", hedge_requests=hedge_requests, cassette=self.cassette)
+            julep_service.initialize_client()
+        else:
+            self.julep = StubJulepClient(
+                latency=LatencyModel(self.args.julep_latency, self.args.sigma, seed=self.args.seed),
+                api_latency=LatencyModel(self.args.api_latency, self.args.sigma, seed=self.args.seed),
+                error_rate=self.args.julep_error_rate,
+                response_chars=self.args.response_chars,
+                seed=self.args.seed
+            )
+            weather_service = WeatherService("benchmark")
+            weather_service.base_url = self.weather_url
+            julep_service = JulepAgentService("benchmark", hedge_requests=hedge_requests)
+            julep_service.client = self.julep
+
+        if not julep_service.create_agents():
+            raise RuntimeError("Could not set up agents on the upstream Julep client")
+        return weather_service, julep_service
+
+    def call_counts(self) -> Dict[str, Counter]:
+        if self.cassette is not None:
+            return {'cassette': Counter(self.cassette.get_stats()['operations'])}
+        return {'openweather': Counter(self.weather.calls), 'julep': Counter(self.julep.calls)}
+
+    def stop(self):
+        if self.weather is not None:
+            self.weather.stop()
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q * len(ordered)))
+    return round(ordered[rank - 1], 4)
+
+
+def summarize_level(concurrency: int, runs: List[Dict[str, Any]], wall_seconds: float,
+                    calls_before: Dict[str, Counter], calls_after: Dict[str, Counter]) -> Dict[str, Any]:
+    """Aggregate one concurrency level"""
+    from metrics import metrics
+
+    latencies = [run['seconds'] for run in runs if run['ok']]
+    completed = len(latencies)
+    upstream = {
+        name: dict(sorted((calls_after[name] - calls_before[name]).items()))
+        for name in calls_after
+    }
+    total_calls = sum(sum(counts.values()) for counts in upstream.values())
+    return {
+        'concurrency': concurrency,
+        'tours': len(runs),
+        'completed': completed,
+        'failed': len(runs) - completed,
+        'wall_seconds': round(wall_seconds, 3),
+        'tours_per_minute': round(completed / wall_seconds * 60, 2) if wall_seconds else None,
+        'latency': {
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'mean': round(sum(latencies) / completed, 4) if completed else None,
+            'max': round(max(latencies), 4) if latencies else None
+        },
+        'upstream_calls': upstream,
+        'upstream_calls_per_tour': round(total_calls / len(runs), 2) if runs else None,
+        'cities': runs,
+        'operations': metrics.snapshot()
+    }
+
+
+def timed(city: str, func: Callable[[], Any], succeeded: Callable[[Any], bool]) -> Dict[str, Any]:
+    """Run one tour and record its latency and outcome"""
+    started = time.perf_counter()
+    try:
+        result = func()
+        ok, error = succeeded(result), None
+        if not ok:
+            error = (result or {}).get('error') if isinstance(result, dict) else "no result"
+    except Exception as e:
+        ok, error = False, f"{type(e).__name__}: {e}"
+    run = {'city': city, 'seconds': round(time.perf_counter() - started, 4), 'ok': ok}
+    if error:
+        run['error'] = str(error)
+    return run
+
+
+def run_threaded(cities: List[str], concurrency: int, tour: Callable[[str], Dict[str, Any]]) -> List[Dict[str, Any]]:
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as executor:
+        return list(executor.map(tour, cities))
+
+
+def bench_app(upstreams: Upstreams, cities: List[str], concurrency: int) -> Callable[[], Any]:
+    """Streamlit pipeline: concurrent agent steps, as run by create_foodie_tour_for_city"""
+    from app import generate_tour
+    from singleflight import SingleFlight
+    from tour_cache import TourStore
+
+    weather_service, julep_service = upstreams.build_services()
+    tour_store = TourStore(None)
+    flights = SingleFlight()
+
+    def tour(city):
+        return timed(
+            city,
+            lambda: generate_tour(city, weather_service, julep_service, tour_store, flights=flights),
+            lambda result: bool(result and result.get('final_tour'))
+        )
+
+    return lambda: run_threaded(cities, concurrency, tour)
+
+
+def bench_mcp(upstreams: Upstreams, cities: List[str], concurrency: int) -> Callable[[], Any]:
+    """MCP server: create_complete_foodie_tour with sequential streamed agent steps"""
+    import mcp_server
+    from tour_cache import TourStore
+
+    weather_service, julep_service = upstreams.build_services()
+    mcp_server.weather_service = weather_service
+    mcp_server.julep_service = julep_service
+    mcp_server.tour_store = TourStore(None)
+    mcp_server.tours_cache.clear()
+
+    async def run_all():
+        slots = asyncio.Semaphore(concurrency)
+        ctx = BenchContext()
+
+        async def tour(city):
+            async with slots:
+                started = time.perf_counter()
+                try:
+                    result = await mcp_server._build_tour(city, ctx)
+                    ok, error = bool(result.get('final_tour_guide')), None
+                except Exception as e:
+                    ok, error = False, f"{type(e).__name__}: {e}"
+                run = {'city': city, 'seconds': round(time.perf_counter() - started, 4), 'ok': ok}
+                if error:
+                    run['error'] = error
+                return run
+
+        return list(await asyncio.gather(*(tour(city) for city in cities)))
+
+    return run_all
+
+
+def bench_task(upstreams: Upstreams, cities: List[str], concurrency: int) -> Callable[[], Any]:
+    """Julep task: execute_foodie_tour, polling the execution until it finishes"""
+    weather_service, julep_service = upstreams.build_services()
+    if not julep_service.create_foodie_tour_task():
+        raise RuntimeError("Could not set up the foodie tour task on the upstream Julep client")
+
+    def run_task(city):
+        weather_data = weather_service.get_weather_data(city)
+        if not weather_data:
+            return {'status': 'error', 'error': 'weather unavailable'}
+        return julep_service.execute_foodie_tour(city, weather_data)
+
+    def tour(city):
+        return timed(city, lambda: run_task(city), lambda result: bool(result and result.get('status') == 'success'))
+
+    return lambda: run_threaded(cities, concurrency, tour)
+
+
+BENCHES = {'app': bench_app, 'mcp': bench_mcp, 'task': bench_task}
+
+
+def run_scenario(name: str, upstreams: Upstreams, levels: List[int], tours: int,
+                 cities: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run a scenario at each concurrency level, by default with unique (cold-cache) cities"""
+    from metrics import metrics
+
+    results: Dict[str, Any] = {'levels': {}}
+    loop = None
+    try:
+        for concurrency in levels:
+            # Unique cities per level so caches and in-flight coalescing never short-circuit a tour
+            level_cities = cities or [f"Bench {name} c{concurrency} #{index:03d}" for index in range(tours)]
+            run = BENCHES[name](upstreams, level_cities, concurrency)
+            metrics.reset()
+            calls_before = upstreams.call_counts()
+            started = time.perf_counter()
+            if name == 'mcp':
+                # One loop for every level: the server's semaphores bind to the first loop that waits on them
+                loop = loop or asyncio.new_event_loop()
+                runs = loop.run_until_complete(run())
+            else:
+                runs = run()
+            wall_seconds = time.perf_counter() - started
+            level = summarize_level(concurrency, runs, wall_seconds, calls_before, upstreams.call_counts())
+            results['levels'][str(concurrency)] = level
+            print(f"  {name:<5} concurrency {concurrency:>3}: {level['completed']}/{level['tours']} tours, "
+                  f"p50 {level['latency']['p50']}s, p95 {level['latency']['p95']}s, "
+                  f"{level['tours_per_minute']} tours/min, {level['upstream_calls_per_tour']} upstream calls/tour")
+    except ImportError as e:
+        print(f"  {name:<5} skipped: {e}")
+        results['skipped'] = str(e)
+    finally:
+        if loop is not None:
+            loop.close()
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """
+    Print p50/p95 latency, throughput and upstream call changes against a baseline run
+
+    Returns:
+        Descriptions of regressions beyond the threshold
+    """
+    def change(new, old):
+        if new is None or not old:
+            return None
+        return (new - old) / old
+
+    def fmt(value):
+        return "   n/a" if value is None else f"{value:+6.1%}"
+
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('revision') or 'baseline'} ({baseline['meta'].get('started_at')}):")
+    for name, scenario in results['scenarios'].items():
+        old_levels = baseline.get('scenarios', {}).get(name, {}).get('levels', {})
+        for concurrency, level in scenario.get('levels', {}).items():
+            old = old_levels.get(concurrency)
+            if old is None:
+                continue
+            p50 = change(level['latency']['p50'], old['latency']['p50'])
+            p95 = change(level['latency']['p95'], old['latency']['p95'])
+            throughput = change(level['tours_per_minute'], old['tours_per_minute'])
+            calls = change(level['upstream_calls_per_tour'], old['upstream_calls_per_tour'])
+            print(f"  {name:<5} concurrency {concurrency:>3}: p50 {fmt(p50)}  p95 {fmt(p95)}  "
+                  f"tours/min {fmt(throughput)}  upstream calls/tour {fmt(calls)}  "
+                  f"failed {old['failed']} -> {level['failed']}")
+            if p95 is not None and p95 > threshold:
+                regressions.append(f"{name} x{concurrency}: p95 latency {p95:+.1%}")
+            if throughput is not None and throughput < -threshold:
+                regressions.append(f"{name} x{concurrency}: tours/min {throughput:+.1%}")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the tour pipelines against local stub upstreams")
+    parser.add_argument('--scenarios', default=",".join(SCENARIOS),
+                        help="Comma-separated scenarios: app, mcp, task (default: all)")
+    parser.add_argument('--levels', default="1,2,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument('--tours', type=int, default=8, help="Tours per concurrency level")
+    parser.add_argument('--weather-latency', type=float, default=0.05, help="Median OpenWeather latency (s)")
+    parser.add_argument('--julep-latency', type=float, default=0.3, help="Median agent response latency (s)")
+    parser.add_argument('--api-latency', type=float, default=0.02,
+                        help="Median latency of Julep session/agent/poll calls (s)")
+    parser.add_argument('--sigma', type=float, default=0.5,
+                        help="Log-normal spread of all latencies (0 for constant latency)")
+    parser.add_argument('--weather-error-rate', type=float, default=0.0, help="Fraction of OpenWeather 503s")
+    parser.add_argument('--julep-error-rate', type=float, default=0.0,
+                        help="Fraction of failing agent chats and executions")
+    parser.add_argument('--response-chars', type=int, default=1200, help="Size of each agent response")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible latencies and failures")
+    parser.add_argument('--no-hedge', action='store_true', help="Disable hedged agent requests")
+    parser.add_argument('--keep-rate-limits', action='store_true',
+                        help="Keep the configured OpenWeather/Julep rate limits instead of disabling them")
+    parser.add_argument('--cities', help="Comma-separated cities to tour at each level instead of generated names "
+                                         "(use the cities a cassette was recorded with)")
+    parser.add_argument('--cassette', help="Replay a recorded cassette (see cassette.py) instead of the stubs")
+    parser.add_argument('--cassette-latency', type=float, default=1.0,
+                        help="Scale for recorded latencies when replaying (0 replays as fast as possible)")
+    parser.add_argument('--output', help=f"Results file (default: {RESULTS_DIR}/benchmark-<timestamp>.json)")
+    parser.add_argument('--compare', metavar='BASELINE', help="Earlier results file to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        return 2
+    levels = [int(level) for level in args.levels.split(",")]
+    cities = [city.strip() for city in args.cities.split(",") if city.strip()] if args.cities else None
+
+    # Cold, isolated runs: no shared on-disk cache, and no quota pacing unless asked for
+    os.environ['FOODIE_CACHE_PATH'] = ""
+    if not args.keep_rate_limits:
+        for variable in RATE_LIMIT_VARIABLES:
+            os.environ[variable] = "0"
+
+    started_at = datetime.now()
+    results: Dict[str, Any] = {
+        'meta': {
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')}
+        },
+        'scenarios': {}
+    }
+
+    upstreams = Upstreams(args)
+    try:
+        for name in scenarios:
+            print(f"Running {name} scenario...")
+            results['scenarios'][name] = run_scenario(name, upstreams, levels, args.tours, cities)
+    finally:
+        upstreams.stop()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"benchmark-{started_at:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
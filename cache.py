@@ -0,0 +1,163 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+def json_size(value: Any) -> int:
+    """Approximate the memory footprint of a value by its UTF-8 JSON size"""
+    return len(json.dumps(value, default=str).encode('utf-8'))
+
+
+class TTLCache:
+    """Thread-safe, bounded LRU cache with per-entry TTL expiry"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 600.0,
+                 max_bytes: Optional[int] = None, sizeof: Callable[[Any], int] = json_size):
+        """
+        Args:
+            max_entries: Maximum number of entries before LRU eviction
+            ttl: Default time-to-live in seconds
+            max_bytes: Optional byte budget across all entries, enforced by LRU eviction
+            sizeof: Function measuring an entry's size in bytes (used with max_bytes)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        # key -> (value, expires_at, size)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'rejected': 0
+        }
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a live entry and mark it as most recently used
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+
+        Returns:
+            Cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Store a value, evicting least recently used entries if full
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Time-to-live in seconds (defaults to the cache TTL)
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+
+        with self._lock:
+            self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Larger than the whole budget; storing it would flush everything else
+                self._stats['rejected'] += 1
+                return
+
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats['evictions'] += 1
+
+    def _remove(self, key: Hashable) -> bool:
+        """Drop an entry and its byte accounting; caller holds the lock"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        return True
+
+    def invalidate(self, key: Hashable) -> bool:
+        """
+        Remove an entry
+
+        Returns:
+            True if the key was cached
+        """
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def keys(self) -> List[Hashable]:
+        """Get the keys of all live entries, least recently used first"""
+        now = time.monotonic()
+        with self._lock:
+            return [key for key, (_, expires_at, _) in self._entries.items() if expires_at > now]
+
+    def purge_expired(self) -> int:
+        """
+        Drop every expired entry
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                self._remove(key)
+            self._stats['expirations'] += len(expired)
+        return len(expired)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with hits, misses, evictions, expirations, size, bytes and hit rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            stats['bytes'] = self._bytes
+
+        lookups = stats['hits'] + stats['misses']
+        stats['max_entries'] = self.max_entries
+        stats['max_bytes'] = self.max_bytes
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
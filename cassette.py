@@ -0,0 +1,590 @@
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+import httpx
+import requests
+
+# Julep SDK calls made by JulepAgentService, by resource path
+JULEP_CALLS = frozenset({
+    'agents.list', 'agents.create', 'agents.update',
+    'sessions.create', 'sessions.chat',
+    'tasks.list', 'tasks.create',
+    'executions.create', 'executions.get'
+})
+JULEP_STREAMS = frozenset({'sessions.with_streaming_response.chat'})
+# Chat prompts change with the pipeline; these may fall back to any recorded reply of the same agent
+LOOSE_OPERATIONS = frozenset({'sessions.chat', 'sessions.with_streaming_response.chat'})
+# Query parameters left out of recordings and match keys
+SECRET_PARAMS = frozenset({'appid'})
+# Cassette file format version
+CASSETTE_VERSION = 1
+
+
+class CassetteMissError(LookupError):
+    """A replayed request has no recorded interaction"""
+
+
+class RecordedUpstreamError(RuntimeError):
+    """An upstream failure captured while recording, raised again on replay"""
+
+
+def _to_plain(value: Any) -> Any:
+    """Convert SDK response objects into JSON-compatible data"""
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(mode='json')
+    if isinstance(value, dict):
+        return {str(key): _to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(item) for item in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if hasattr(value, '__dict__'):
+        return {key: _to_plain(item) for key, item in vars(value).items() if not key.startswith('_')}
+    return str(value)
+
+
+class Recorded:
+    """
+    Replayed response data read through attributes, like SDK models
+
+    Also supports get() and indexing, for fields such as metadata that
+    are plain dicts on SDK models. Fields named like dict methods (e.g.
+    'items' on list responses) stay reachable as attributes.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self._data = {key: self.wrap(item) for key, item in data.items()}
+
+    @classmethod
+    def wrap(cls, value: Any) -> Any:
+        if isinstance(value, dict):
+            return cls(value)
+        if isinstance(value, list):
+            return [cls.wrap(item) for item in value]
+        return value
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self.__dict__['_data'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+
+class Cassette:
+    """
+    Recorded upstream traffic for offline, reproducible runs
+
+    In record mode, the wrapped transports and Julep client pass calls
+    through and capture each request, response and timing. In replay mode
+    they serve the recorded responses without any network access,
+    sleeping for the recorded latency times latency_scale (0 replays as
+    fast as possible).
+
+    Requests are matched on their content. Repeated identical requests
+    (e.g. execution polls) are replayed in recorded order, the last one
+    repeating once they run out. Unless strict, a chat whose prompt was
+    never recorded gets the next recorded reply of the same agent, so
+    pipelines with changed prompts can still be replayed.
+    """
+
+    RECORD = "record"
+    REPLAY = "replay"
+
+    def __init__(self, path: str, mode: str = REPLAY, latency_scale: float = 1.0, strict: bool = False):
+        """
+        Args:
+            path: Cassette file; gzip-compressed if it ends in .gz
+            mode: "record" or "replay"
+            latency_scale: Multiplier for recorded latencies on replay
+            strict: Disable the same-agent fallback for unrecorded chats
+
+        Raises:
+            ValueError: On an unknown mode
+            FileNotFoundError: When replaying a missing cassette
+        """
+        if mode not in (self.RECORD, self.REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self.interactions: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._exact: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._loose: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._stats = Counter()
+        self._operations = Counter()
+
+        if mode == self.REPLAY:
+            self._load()
+        else:
+            atexit.register(self.save)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == self.RECORD
+
+    # Wrapping
+
+    def transport(self, inner: Optional[Any] = None) -> "CassetteTransport":
+        """Wrap a blocking HTTPTransport (only used while recording)"""
+        return CassetteTransport(self, inner)
+
+    def async_transport(self, inner: Optional[Any] = None) -> "AsyncCassetteTransport":
+        """Wrap an AsyncHTTPTransport (only used while recording)"""
+        return AsyncCassetteTransport(self, inner)
+
+    def julep_client(self, inner: Optional[Any] = None) -> "CassetteJulepClient":
+        """Wrap a Julep client (only used while recording)"""
+        return CassetteJulepClient(self, inner)
+
+    # Recording and lookup
+
+    @staticmethod
+    def _key(operation: str, request: Dict[str, Any]) -> str:
+        payload = json.dumps([operation, request], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _loose_key(operation: str, request: Dict[str, Any]) -> Optional[str]:
+        if operation not in LOOSE_OPERATIONS:
+            return None
+        return f"{operation}:{request.get('agent')}"
+
+    def _index(self, interaction: Dict[str, Any]):
+        operation, request = interaction['operation'], interaction['request']
+        self._exact.setdefault(self._key(operation, request), deque()).append(interaction)
+        loose_key = self._loose_key(operation, request)
+        if loose_key:
+            self._loose.setdefault(loose_key, deque()).append(interaction)
+
+    def record(self, operation: str, request: Dict[str, Any], elapsed: float,
+               response: Any = None, error: Optional[str] = None):
+        """
+        Add one interaction
+
+        Args:
+            operation: Call name, e.g. 'openweather.get' or 'sessions.chat'
+            request: JSON-compatible request fields used for matching
+            elapsed: Seconds the call took
+            response: JSON-compatible response
+            error: Failure message, if the call raised
+        """
+        interaction = {'operation': operation, 'request': request, 'elapsed': round(elapsed, 4)}
+        if error is not None:
+            interaction['error'] = error
+        else:
+            interaction['response'] = response
+        with self._lock:
+            self.interactions.append(interaction)
+            self._stats['recorded'] += 1
+            self._operations[operation] += 1
+
+    def replay(self, operation: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get the recorded interaction for a request
+
+        Raises:
+            CassetteMissError: If nothing matches
+        """
+        key = self._key(operation, request)
+        loose_key = None if self.strict else self._loose_key(operation, request)
+        with self._lock:
+            self._operations[operation] += 1
+            recorded = self._exact.get(key)
+            if recorded:
+                interaction = recorded.popleft()
+                self._last[key] = interaction
+                self._stats['hits'] += 1
+            elif key in self._last:
+                interaction = self._last[key]
+                self._stats['repeats'] += 1
+            elif loose_key and self._loose.get(loose_key):
+                # Cycle through the agent's replies
+                candidates = self._loose[loose_key]
+                interaction = candidates[0]
+                candidates.rotate(-1)
+                self._stats['fallbacks'] += 1
+            else:
+                self._stats['misses'] += 1
+                raise CassetteMissError(f"No recorded {operation} interaction matches {json.dumps(request, default=str)[:200]}")
+        return interaction
+
+    def wait(self, seconds: float):
+        """Sleep for a recorded latency, scaled"""
+        if self.latency_scale > 0 and seconds > 0:
+            time.sleep(seconds * self.latency_scale)
+
+    # Storage
+
+    def _load(self):
+        opener = gzip.open if self.path.endswith('.gz') else open
+        with opener(self.path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        self.interactions = data['interactions']
+        for interaction in self.interactions:
+            self._index(interaction)
+
+    def save(self):
+        """Write recorded interactions to the cassette file (record mode only)"""
+        if not self.recording:
+            return
+        with self._lock:
+            data = {
+                'version': CASSETTE_VERSION,
+                'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'interactions': list(self.interactions)
+            }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        opener = gzip.open if self.path.endswith('.gz') else open
+        with opener(self.path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get mode, recorded/hit/repeat/fallback/miss counters and calls per operation"""
+        with self._lock:
+            stats: Dict[str, Any] = {
+                counter: self._stats[counter]
+                for counter in ('recorded', 'hits', 'repeats', 'fallbacks', 'misses')
+            }
+            stats['interactions'] = len(self.interactions)
+            stats['operations'] = dict(self._operations)
+        stats['mode'] = self.mode
+        stats['path'] = self.path
+        return stats
+
+
+def _weather_request(url: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Match fields for a weather call: the endpoint path and non-secret parameters"""
+    path = httpx.URL(url).path
+    return {
+        'path': path,
+        'params': {key: value for key, value in (params or {}).items() if key not in SECRET_PARAMS}
+    }
+
+
+class _CassetteTransportBase:
+    """Shared stats for the recording/replaying HTTP transports"""
+
+    operation = 'openweather.get'
+
+    def __init__(self, cassette: Cassette, inner: Optional[Any] = None):
+        if cassette.recording and inner is None:
+            raise ValueError("Recording needs a transport to pass requests through")
+        self.cassette = cassette
+        self.inner = inner
+        self.rate_limiter = getattr(inner, 'rate_limiter', None)
+
+    def _record(self, request: Dict[str, Any], started: float, response: Any = None, error: Optional[str] = None):
+        recorded = None
+        if response is not None:
+            recorded = {
+                'status': response.status_code,
+                'headers': {
+                    name: response.headers[name]
+                    for name in ('content-type', 'retry-after') if name in response.headers
+                },
+                'body': response.text
+            }
+        self.cassette.record(self.operation, request, time.perf_counter() - started, recorded, error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the wrapped transport's counters while recording, cassette counters on replay"""
+        if self.inner is not None and self.cassette.recording:
+            return self.inner.get_stats()
+        return self.cassette.get_stats()
+
+
+class CassetteTransport(_CassetteTransportBase):
+    """Drop-in HTTPTransport that records or replays responses"""
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None) -> requests.Response:
+        request = _weather_request(url, params)
+        if self.cassette.recording:
+            started = time.perf_counter()
+            try:
+                response = self.inner.get(url, params=params)
+            except requests.exceptions.RequestException as e:
+                self._record(request, started, error=str(e))
+                raise
+            self._record(request, started, response)
+            return response
+
+        try:
+            interaction = self.cassette.replay(self.operation, request)
+        except CassetteMissError as e:
+            # Surface as a network failure, which the weather service already handles
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        self.cassette.wait(interaction['elapsed'])
+        if 'error' in interaction:
+            raise requests.exceptions.ConnectionError(interaction['error'])
+
+        recorded = interaction['response']
+        response = requests.Response()
+        response.status_code = recorded['status']
+        response.headers.update(recorded['headers'])
+        response._content = recorded['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = url
+        return response
+
+    def close(self):
+        if self.inner is not None:
+            self.inner.close()
+
+
+class AsyncCassetteTransport(_CassetteTransportBase):
+    """Drop-in AsyncHTTPTransport that records or replays responses"""
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        request = _weather_request(url, params)
+        if self.cassette.recording:
+            started = time.perf_counter()
+            try:
+                response = await self.inner.get(url, params=params)
+            except httpx.HTTPError as e:
+                self._record(request, started, error=str(e))
+                raise
+            self._record(request, started, response)
+            return response
+
+        try:
+            interaction = self.cassette.replay(self.operation, request)
+        except CassetteMissError as e:
+            raise httpx.ConnectError(str(e)) from e
+        if self.cassette.latency_scale > 0:
+            await asyncio.sleep(interaction['elapsed'] * self.cassette.latency_scale)
+        if 'error' in interaction:
+            raise httpx.ConnectError(interaction['error'])
+
+        recorded = interaction['response']
+        return httpx.Response(
+            recorded['status'],
+            headers=recorded['headers'],
+            content=recorded['body'].encode('utf-8'),
+            request=httpx.Request('GET', url, params=params)
+        )
+
+    async def aclose(self):
+        if self.inner is not None:
+            await self.inner.aclose()
+
+
+class _ReplayedStream:
+    """Replayed streaming chat response"""
+
+    def __init__(self, cassette: Cassette, interaction: Dict[str, Any]):
+        self.cassette = cassette
+        self.interaction = interaction
+        self.headers = interaction['response']['headers']
+        self.started = time.perf_counter()
+
+    def iter_lines(self) -> Iterator[str]:
+        for offset, line in self.interaction['response']['lines']:
+            if self.cassette.latency_scale > 0:
+                remaining = offset * self.cassette.latency_scale - (time.perf_counter() - self.started)
+                if remaining > 0:
+                    time.sleep(remaining)
+            yield line
+
+    def json(self) -> Any:
+        return self.interaction['response']['json']
+
+
+class _RecordingStream:
+    """Pass-through streaming chat response that captures lines with their arrival times"""
+
+    def __init__(self, response: Any, started: float):
+        self.response = response
+        self.started = started
+        self.headers = response.headers
+        self.lines: List[List[Any]] = []
+        self.body: Any = None
+        self.finished = False
+
+    def iter_lines(self) -> Iterator[str]:
+        for line in self.response.iter_lines():
+            self.lines.append([round(time.perf_counter() - self.started, 4), line])
+            yield line
+        self.finished = True
+
+    def json(self) -> Any:
+        self.body = self.response.json()
+        self.finished = True
+        return self.body
+
+
+class _Resource:
+    """Attribute path into the client (e.g. client.sessions.with_streaming_response)"""
+
+    def __init__(self, client: "CassetteJulepClient", path: str):
+        self._client = client
+        self._path = path
+
+    def __getattr__(self, name: str) -> Any:
+        path = f"{self._path}.{name}"
+        if path in JULEP_CALLS:
+            return lambda *args, **kwargs: self._client._call(path, args, kwargs)
+        if path in JULEP_STREAMS:
+            return lambda **kwargs: self._client._stream(path, kwargs)
+        if any(operation.startswith(path + ".") for operation in JULEP_CALLS | JULEP_STREAMS):
+            return _Resource(self._client, path)
+        raise AttributeError(name)
+
+
+class CassetteJulepClient:
+    """
+    Drop-in Julep client that records or replays the calls JulepAgentService makes
+
+    Chat requests are matched on the agent (resolved from the session)
+    and the messages, not on session IDs, which differ between runs.
+    """
+
+    def __init__(self, cassette: Cassette, inner: Optional[Any] = None):
+        if cassette.recording and inner is None:
+            raise ValueError("Recording needs a Julep client to pass calls through")
+        self.cassette = cassette
+        self.inner = inner
+        self._session_agents: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        if any(operation.startswith(name + ".") for operation in JULEP_CALLS | JULEP_STREAMS):
+            return _Resource(self, name)
+        raise AttributeError(name)
+
+    def _inner_call(self, path: str) -> Callable[..., Any]:
+        target = self.inner
+        for name in path.split('.'):
+            target = getattr(target, name)
+        return target
+
+    def _request(self, path: str, args: tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Match fields for a call, with session IDs replaced by their agent"""
+        request = _to_plain(dict(kwargs))
+        if args:
+            request['args'] = _to_plain(list(args))
+        session_id = request.pop('session_id', None)
+        if session_id is not None:
+            with self._lock:
+                request['agent'] = self._session_agents.get(session_id)
+        return request
+
+    def _remember_session(self, path: str, kwargs: Dict[str, Any], response: Any):
+        if path == 'sessions.create':
+            with self._lock:
+                self._session_agents[response.id] = kwargs.get('agent')
+
+    def _call(self, path: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        request = self._request(path, args, kwargs)
+        if self.cassette.recording:
+            started = time.perf_counter()
+            try:
+                response = self._inner_call(path)(*args, **kwargs)
+            except Exception as e:
+                self.cassette.record(path, request, time.perf_counter() - started,
+                                     error=f"{type(e).__name__}: {e}")
+                raise
+            self.cassette.record(path, request, time.perf_counter() - started, _to_plain(response))
+            self._remember_session(path, kwargs, response)
+            return response
+
+        interaction = self.cassette.replay(path, request)
+        self.cassette.wait(interaction['elapsed'])
+        if 'error' in interaction:
+            raise RecordedUpstreamError(interaction['error'])
+        response = Recorded.wrap(interaction['response'])
+        self._remember_session(path, kwargs, response)
+        return response
+
+    def _stream(self, path: str, kwargs: Dict[str, Any]):
+        return _StreamContext(self, path, kwargs)
+
+
+class _StreamContext:
+    """Context manager returned by the wrapped with_streaming_response.chat"""
+
+    def __init__(self, client: CassetteJulepClient, path: str, kwargs: Dict[str, Any]):
+        self.client = client
+        self.cassette = client.cassette
+        self.path = path
+        self.kwargs = kwargs
+        self.request = client._request(path, (), kwargs)
+        self.started = 0.0
+        self._inner = None
+        self._recording: Optional[_RecordingStream] = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        if self.cassette.recording:
+            self._inner = self.client._inner_call(self.path)(**self.kwargs)
+            try:
+                self._recording = _RecordingStream(self._inner.__enter__(), self.started)
+            except Exception as e:
+                self._record_error(e)
+                raise
+            return self._recording
+
+        interaction = self.cassette.replay(self.path, self.request)
+        if 'error' in interaction:
+            self.cassette.wait(interaction['elapsed'])
+            raise RecordedUpstreamError(interaction['error'])
+        return _ReplayedStream(self.cassette, interaction)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._inner is None:
+            return False
+        try:
+            return self._inner.__exit__(exc_type, exc, tb)
+        finally:
+            recording = self._recording
+            if exc is not None and not isinstance(exc, GeneratorExit):
+                self._record_error(exc)
+            elif recording is not None and recording.finished:
+                # Streams abandoned by the reader (e.g. a losing hedge) are not recorded
+                self.cassette.record(self.path, self.request, time.perf_counter() - self.started, {
+                    'headers': {'content-type': recording.headers.get('content-type', '')},
+                    'lines': recording.lines,
+                    'json': recording.body
+                })
+
+    def _record_error(self, error: BaseException):
+        self.cassette.record(self.path, self.request, time.perf_counter() - self.started,
+                             error=f"{type(error).__name__}: {error}")
+
+
+def open_cassette() -> Optional[Cassette]:
+    """
+    Open the cassette configured by FOODIE_CASSETTE / FOODIE_CASSETTE_MODE / FOODIE_CASSETTE_LATENCY
+
+    Returns:
+        Cassette instance, or None if FOODIE_CASSETTE is unset
+    """
+    path = os.getenv('FOODIE_CASSETTE')
+    if not path:
+        return None
+    return Cassette(
+        path,
+        mode=os.getenv('FOODIE_CASSETTE_MODE', Cassette.REPLAY),
+        latency_scale=float(os.getenv('FOODIE_CASSETTE_LATENCY', 1.0))
+    )
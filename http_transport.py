@@ -0,0 +1,267 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limit import TokenBucket
+
+# Status codes worth retrying: rate limiting and transient upstream failures
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class _RetryingTransport:
+    """Shared timeout, retry and counter configuration for the HTTP transports"""
+
+    def __init__(
+        self,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        backoff_max: float = 8.0,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        rate_limiter: Optional[TokenBucket] = None
+    ):
+        """
+        Args:
+            connect_timeout: Seconds to wait for the TCP/TLS handshake
+            read_timeout: Seconds to wait for the server to send data
+            max_retries: Retries after the first attempt on 429/5xx and network errors
+            backoff_factor: Base delay in seconds for exponential backoff
+            backoff_max: Upper bound for a single backoff delay
+            pool_connections: Number of per-host connection pools to keep
+            pool_maxsize: Maximum keep-alive connections per host
+            rate_limiter: Shared quota every attempt (including retries) waits on
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.rate_limiter = rate_limiter
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'retries': 0,
+            'failures': 0
+        }
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Compute the delay before the next attempt
+
+        Args:
+            attempt: Zero-based index of the attempt that just failed
+            retry_after: Value of the server's Retry-After header, if any
+
+        Returns:
+            Delay in seconds (full jitter, capped at backoff_max)
+        """
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+
+        ceiling = min(self.backoff_max, self.backoff_factor * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _hold_back(self, status_code: Optional[int], delay: float) -> bool:
+        """
+        After a 429, push the shared limiter back instead of sleeping alone
+
+        Returns:
+            True if the limiter will enforce the delay on the next acquire
+        """
+        if self.rate_limiter is None or status_code != 429:
+            return False
+        # Every caller sharing the quota backs off, not just this one
+        self.rate_limiter.penalize(delay)
+        return True
+
+    def _increment(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get request, retry and failure counters"""
+        with self._lock:
+            return dict(self._stats)
+
+
+class HTTPTransport(_RetryingTransport):
+    """Pooled, keep-alive HTTP transport with timeouts and jittered retries"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = (self.connect_timeout, self.read_timeout)
+
+        # Retries are handled here so they can be counted and jittered
+        self._adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None) -> requests.Response:
+        """
+        Send a GET request, retrying on 429/5xx and connection errors
+
+        Args:
+            url: Request URL
+            params: Query string parameters
+
+        Returns:
+            The final response (callers decide whether to raise on status)
+
+        Raises:
+            requests.exceptions.RequestException: If every attempt failed at the network level
+        """
+        attempt = 0
+
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            self._increment('requests')
+            status_code = None
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    self._increment('failures')
+                    raise
+                retry_after = None
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    if response.status_code >= 400:
+                        self._increment('failures')
+                    return response
+                retry_after = response.headers.get('Retry-After')
+                status_code = response.status_code
+                # Release the connection back to the pool before sleeping
+                response.close()
+
+            delay = self._backoff_delay(attempt, retry_after)
+            if not self._hold_back(status_code, delay):
+                time.sleep(delay)
+            attempt += 1
+            self._increment('retries')
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get request, retry and connection reuse counters
+
+        Returns:
+            Dictionary of counters; reused_connections is the number of
+            requests that did not need a new TCP handshake
+        """
+        stats = super().get_stats()
+
+        new_connections = 0
+        pooled_requests = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            new_connections += pool.num_connections
+            pooled_requests += pool.num_requests
+
+        stats['new_connections'] = new_connections
+        stats['reused_connections'] = max(pooled_requests - new_connections, 0)
+        return stats
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+class AsyncHTTPTransport(_RetryingTransport):
+    """Non-blocking counterpart of HTTPTransport built on a pooled httpx.AsyncClient"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the pooled client for the running event loop, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        # httpx connections are bound to the loop that opened them, so each loop keeps its own client
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                # Clients of closed loops can no longer be used or awaited
+                for closed in [other for other in self._clients if other.is_closed()]:
+                    del self._clients[closed]
+                client = self._clients[loop] = httpx.AsyncClient(
+                    timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    limits=httpx.Limits(
+                        max_connections=self.pool_maxsize,
+                        max_keepalive_connections=self.pool_maxsize
+                    )
+                )
+        return client
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        """
+        Send a GET request, retrying on 429/5xx and connection errors
+
+        Args:
+            url: Request URL
+            params: Query string parameters
+
+        Returns:
+            The final response (callers decide whether to raise on status)
+
+        Raises:
+            httpx.TransportError: If every attempt failed at the network level
+        """
+        client = self._get_client()
+        attempt = 0
+
+        while True:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async()
+            self._increment('requests')
+            status_code = None
+            try:
+                response = await client.get(url, params=params)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    self._increment('failures')
+                    raise
+                retry_after = None
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    if response.status_code >= 400:
+                        self._increment('failures')
+                    return response
+                retry_after = response.headers.get('Retry-After')
+                status_code = response.status_code
+
+            delay = self._backoff_delay(attempt, retry_after)
+            if not self._hold_back(status_code, delay):
+                await asyncio.sleep(delay)
+            attempt += 1
+            self._increment('retries')
+
+    async def aclose(self):
+        """Close the pooled connections of every event loop's client"""
+        current = asyncio.get_running_loop()
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for loop, client in clients.items():
+            if loop is current:
+                await client.aclose()
+            elif loop.is_running():
+                # Connections have to be closed on the loop that opened them
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
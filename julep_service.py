@@ -1,352 +1,1122 @@
-from julep import Julep
-import yaml
-import uuid
-from typing import Dict, Any, Optional
-
-class JulepAgentService:
-    """Service for managing Julep AI agents and tasks"""
-    
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        self.client = None
-        self.agents = {}
-        self.tasks = {}
-    
-    def initialize_client(self) -> bool:
-        """Initialize the Julep client"""
-        try:
-            self.client = Julep(api_key=self.api_key)
-            return True
-        except Exception as e:
-            print(f"Error initializing Julep client: {e}")
-            return False
-    
-    def create_agents(self) -> bool:
-        """Create all required agents for the foodie tour workflow"""
-        try:
-            # Weather Analysis Agent
-            weather_agent = self.client.agents.create(
-                name="Weather Analysis Agent",
-                about="Expert at analyzing weather conditions and recommending appropriate dining experiences based on temperature, precipitation, and atmospheric conditions.",
-                model="gpt-4o",
-                instructions=[
-                    "Analyze weather conditions comprehensively",
-                    "Consider temperature, humidity, wind, and precipitation",
-                    "Provide specific dining recommendations",
-                    "Factor in seasonal and cultural dining preferences",
-                    "Suggest timing for outdoor activities"
-                ]
-            )
-            self.agents['weather'] = weather_agent
-            
-            # Culinary Expert Agent
-            culinary_agent = self.client.agents.create(
-                name="Local Culinary Expert",
-                about="Specialist in local cuisines, traditional dishes, and cultural food significance. Expert at matching dishes to weather conditions and seasonal preferences.",
-                model="gpt-4o",
-                instructions=[
-                    "Identify authentic local dishes for each city",
-                    "Match dishes to weather conditions appropriately",
-                    "Explain cultural significance and history",
-                    "Consider seasonal availability and preparation",
-                    "Recommend weather-appropriate cooking methods"
-                ]
-            )
-            self.agents['culinary'] = culinary_agent
-            
-            # Restaurant Finder Agent
-            restaurant_agent = self.client.agents.create(
-                name="Restaurant Discovery Agent",
-                about="Expert at finding and recommending restaurants based on weather conditions, cuisine types, and dining preferences. Specialized in matching venues to atmospheric conditions.",
-                model="gpt-4o",
-                instructions=[
-                    "Find restaurants suitable for current weather",
-                    "Consider indoor/outdoor seating options",
-                    "Recommend highly-rated and authentic venues",
-                    "Factor in weather-appropriate ambiance",
-                    "Suggest backup options for weather changes"
-                ]
-            )
-            self.agents['restaurant'] = restaurant_agent
-            
-            # Tour Narrative Agent
-            tour_agent = self.client.agents.create(
-                name="Tour Storytelling Agent",
-                about="Master storyteller who creates engaging food tour narratives, weaving together weather, culture, and culinary experiences into memorable adventures.",
-                model="gpt-4o",
-                instructions=[
-                    "Create engaging, personal tour narratives",
-                    "Incorporate weather conditions into the story",
-                    "Include cultural context and local insights",
-                    "Suggest optimal timing and transitions",
-                    "Make the experience feel like a personal guide"
-                ]
-            )
-            self.agents['tour'] = tour_agent
-            
-            # Coordination Agent
-            coordinator_agent = self.client.agents.create(
-                name="Tour Coordination Agent",
-                about="Expert coordinator who synthesizes all tour elements into a comprehensive, practical guide that visitors can actually use.",
-                model="gpt-4o",
-                instructions=[
-                    "Synthesize all tour components cohesively",
-                    "Create practical, actionable itineraries",
-                    "Ensure logical flow and timing",
-                    "Include backup plans and alternatives",
-                    "Format information clearly and attractively"
-                ]
-            )
-            self.agents['coordinator'] = coordinator_agent
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error creating agents: {e}")
-            return False
-    
-    def chat_with_agent(self, agent_type: str, message: str) -> str:
-        """
-        Send a message to a specific agent and get response
-        
-        Args:
-            agent_type: Type of agent ('weather', 'culinary', 'restaurant', 'tour', 'coordinator')
-            message: Message to send to the agent
-            
-        Returns:
-            Agent's response
-        """
-        try:
-            if agent_type not in self.agents:
-                return f"Agent type '{agent_type}' not found"
-            
-            agent = self.agents[agent_type]
-            
-            # Create a session for this conversation
-            session = self.client.sessions.create(
-                agent=agent.id,
-                situation="Helping create a foodie tour"
-            )
-            
-            # Send message and get response
-            response = self.client.sessions.chat(
-                session_id=session.id,
-                messages=[{
-                    "role": "user",
-                    "content": message
-                }]
-            )
-              # Extract the response content
-            if response.choices and len(response.choices) > 0:
-                return response.choices[0].message.content
-            else:
-                return "No response from agent"
-                
-        except Exception as e:
-            print(f"Error chatting with {agent_type} agent: {e}")
-            return f"Error communicating with {agent_type} agent"
-    
-    def create_foodie_tour_task(self) -> bool:
-        """Create a comprehensive foodie tour task with all agents"""
-        try:
-            # Create the main coordinator agent if not exists
-            if 'coordinator' not in self.agents:
-                self.create_agents()
-            
-            # Define the comprehensive foodie tour task
-            task_definition = yaml.safe_load("""
-            name: Foodie Tour Generator
-            description: Creates comprehensive foodie tours that adapt to real-time weather conditions and local cuisine
-            
-            input_schema:
-              type: object
-              properties:
-                city:
-                  type: string
-                  description: The city to create a foodie tour for
-                weather_data:
-                  type: object
-                  description: Current weather data for the city
-                  properties:
-                    temperature:
-                      type: number
-                    description:
-                      type: string
-                    rain_probability:
-                      type: number
-                    humidity:
-                      type: number
-                    wind_speed:
-                      type: number
-                num_dishes:
-                  type: integer
-                  default: 3
-                  description: Number of iconic dishes to recommend
-            
-            main:
-            # Step 1: Weather Analysis
-            - prompt:
-              - role: system
-                content: >
-                  You are a weather analysis expert. Analyze the given weather conditions
-                  and provide specific dining recommendations for the city.
-              - role: user
-                content: >
-                  $ f'''Analyze the weather in {steps[0].input.city}:
-                  Temperature: {steps[0].input.weather_data.temperature}°C
-                  Conditions: {steps[0].input.weather_data.description}
-                  Rain Probability: {steps[0].input.weather_data.rain_probability}%
-                  Humidity: {steps[0].input.weather_data.humidity}%
-                  Wind Speed: {steps[0].input.weather_data.wind_speed} m/s
-                  
-                  Provide specific dining recommendations based on these conditions.'''
-              unwrap: true
-            
-            # Step 2: Find Weather-Appropriate Dishes
-            - prompt:
-              - role: system
-                content: >
-                  You are a local culinary expert. Recommend iconic local dishes
-                  that are perfect for the current weather conditions.
-              - role: user
-                content: >
-                  $ f'''For {steps[0].input.city} with current weather conditions
-                  (Temperature: {steps[0].input.weather_data.temperature}°C, 
-                  Conditions: {steps[0].input.weather_data.description}),
-                  recommend {steps[0].input.num_dishes} iconic local dishes that are perfect for today's weather.
-                  Explain why each dish suits these conditions.'''
-              unwrap: true
-            
-            # Step 3: Find Suitable Restaurants
-            - prompt:
-              - role: system
-                content: >
-                  You are a restaurant discovery expert. Find restaurants that serve
-                  the recommended dishes and are suitable for current weather conditions.
-              - role: user
-                content: >
-                  $ f'''Based on the weather in {steps[0].input.city} and the recommended dishes,
-                  find top-rated restaurants that:
-                  1. Serve these authentic local dishes
-                  2. Have appropriate indoor/outdoor seating for the weather
-                  3. Are highly rated and authentic
-                  
-                  Weather: {steps[0].input.weather_data.temperature}°C, {steps[0].input.weather_data.description}
-                  Dishes: {steps[1].output}'''
-              unwrap: true
-            
-            # Step 4: Create Tour Narrative
-            - prompt:
-              - role: system
-                content: >
-                  You are a master storyteller creating engaging food tour narratives.
-                  Create a day-long adventure that feels personal and exciting.
-              - role: user
-                content: >
-                  $ f'''Create an engaging one-day foodie tour for {steps[0].input.city}:
-                  
-                  Weather Context: {steps[0].input.weather_data.temperature}°C, {steps[0].input.weather_data.description}
-                  Weather Analysis: {steps[0].output}
-                  Recommended Dishes: {steps[1].output}
-                  Restaurant Options: {steps[2].output}
-                  
-                  Create a narrative that includes morning, afternoon, and evening activities,
-                  with cultural stories and weather-appropriate transitions.'''
-              unwrap: true
-            
-            # Step 5: Final Coordination
-            - prompt:
-              - role: system
-                content: >
-                  You are a tour coordinator. Create a comprehensive, practical guide
-                  that combines all elements into an easy-to-follow format.
-              - role: user
-                content: >
-                  $ f'''Create a final comprehensive guide for {steps[0].input.city} that combines:
-                  
-                  Weather Analysis: {steps[0].output}
-                  Local Dishes: {steps[1].output}
-                  Restaurant Recommendations: {steps[2].output}
-                  Tour Narrative: {steps[3].output}
-                  
-                  Format this as a practical guide with clear sections, timing,
-                  and actionable advice that someone could use today.'''
-              unwrap: true
-            """)
-            
-            # Create the task
-            task = self.client.tasks.create(
-                agent_id=self.agents['coordinator'].id,
-                **task_definition
-            )
-            
-            self.tasks['foodie_tour'] = task
-            return True
-            
-        except Exception as e:
-            print(f"Error creating foodie tour task: {e}")
-            return False
-    
-    def execute_foodie_tour(self, city: str, weather_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """
-        Execute the foodie tour task for a specific city
-        
-        Args:
-            city: Name of the city
-            weather_data: Weather information
-            
-        Returns:
-            Task execution result or None if error
-        """
-        try:
-            if 'foodie_tour' not in self.tasks:
-                if not self.create_foodie_tour_task():
-                    return None
-            
-            task = self.tasks['foodie_tour']
-            
-            # Execute the task
-            execution = self.client.executions.create(
-                task_id=task.id,
-                input={
-                    'city': city,
-                    'weather_data': weather_data,
-                    'num_dishes': 3
-                }
-            )
-            
-            # Wait for completion with timeout
-            max_attempts = 30
-            attempt = 0
-            
-            while attempt < max_attempts:
-                result = self.client.executions.get(execution.id)
-                
-                if result.status == 'succeeded':
-                    return {
-                        'status': 'success',
-                        'output': result.output,
-                        'steps': result.output if hasattr(result, 'output') else None
-                    }
-                elif result.status == 'failed':
-                    return {
-                        'status': 'failed',
-                        'error': getattr(result, 'error', 'Unknown error')
-                    }
-                
-                attempt += 1
-                # Small delay between checks
-                import time
-                time.sleep(2)
-            
-            return {
-                'status': 'timeout',
-                'error': 'Task execution timed out'
-            }
-            
-        except Exception as e:
-            print(f"Error executing foodie tour for {city}: {e}")
-            return {
-                'status': 'error',
-                'error': str(e)
-            }
+from julep import Julep, NotFoundError
+import yaml
+import uuid
+import json
+import time
+import asyncio
+import hashlib
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Dict, Any, Iterator, List, Optional
+from cache import TTLCache
+from persistent_cache import PersistentCache
+from session_pool import SessionPool
+from rate_limit import TokenBucket, limiter_from_env
+from resilience import CircuitBreaker, LatencyTracker
+from metrics import Metrics, metrics as default_metrics
+from cassette import Cassette
+
+# Agent definitions for the foodie tour workflow, keyed by agent type
+AGENT_DEFINITIONS = {
+    # Weather Analysis Agent
+    'weather': {
+        'name': "Weather Analysis Agent",
+        'about': "Expert at analyzing weather conditions and recommending appropriate dining experiences based on temperature, precipitation, and atmospheric conditions.",
+        'model': "gpt-4o",
+        'instructions': [
+            "Analyze weather conditions comprehensively",
+            "Consider temperature, humidity, wind, and precipitation",
+            "Provide specific dining recommendations",
+            "Factor in seasonal and cultural dining preferences",
+            "Suggest timing for outdoor activities"
+        ]
+    },
+    # Culinary Expert Agent
+    'culinary': {
+        'name': "Local Culinary Expert",
+        'about': "Specialist in local cuisines, traditional dishes, and cultural food significance. Expert at matching dishes to weather conditions and seasonal preferences.",
+        'model': "gpt-4o",
+        'instructions': [
+            "Identify authentic local dishes for each city",
+            "Match dishes to weather conditions appropriately",
+            "Explain cultural significance and history",
+            "Consider seasonal availability and preparation",
+            "Recommend weather-appropriate cooking methods"
+        ]
+    },
+    # Restaurant Finder Agent
+    'restaurant': {
+        'name': "Restaurant Discovery Agent",
+        'about': "Expert at finding and recommending restaurants based on weather conditions, cuisine types, and dining preferences. Specialized in matching venues to atmospheric conditions.",
+        'model': "gpt-4o",
+        'instructions': [
+            "Find restaurants suitable for current weather",
+            "Consider indoor/outdoor seating options",
+            "Recommend highly-rated and authentic venues",
+            "Factor in weather-appropriate ambiance",
+            "Suggest backup options for weather changes"
+        ]
+    },
+    # Tour Narrative Agent
+    'tour': {
+        'name': "Tour Storytelling Agent",
+        'about': "Master storyteller who creates engaging food tour narratives, weaving together weather, culture, and culinary experiences into memorable adventures.",
+        'model': "gpt-4o",
+        'instructions': [
+            "Create engaging, personal tour narratives",
+            "Incorporate weather conditions into the story",
+            "Include cultural context and local insights",
+            "Suggest optimal timing and transitions",
+            "Make the experience feel like a personal guide"
+        ]
+    },
+    # Coordination Agent
+    'coordinator': {
+        'name': "Tour Coordination Agent",
+        'about': "Expert coordinator who synthesizes all tour elements into a comprehensive, practical guide that visitors can actually use.",
+        'model': "gpt-4o",
+        'instructions': [
+            "Synthesize all tour components cohesively",
+            "Create practical, actionable itineraries",
+            "Ensure logical flow and timing",
+            "Include backup plans and alternatives",
+            "Format information clearly and attractively"
+        ]
+    }
+}
+
+# Execution polling: start fast, back off geometrically, give up at the deadline
+INITIAL_POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 3.0
+POLL_BACKOFF = 1.5
+EXECUTION_TIMEOUT = 180.0
+
+# How long a memoized agent response is served for an identical prompt
+RESPONSE_CACHE_TTL = 60 * 60
+
+# Client-side pacing (calls per minute) for the whole API key and for each agent;
+# overridable with FOODIE_JULEP_RATE_PER_MIN / FOODIE_JULEP_AGENT_RATE_PER_MIN
+JULEP_RATE_PER_MINUTE = 120
+AGENT_RATE_PER_MINUTE = 60
+
+# Hedged chats: a duplicate request fires once the first has been outstanding for
+# this percentile of the agent's recent latency (after enough samples to trust it)
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+MIN_HEDGE_DELAY = 1.0
+# Consecutive failures that open an agent's circuit, and seconds before a trial call
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30.0
+
+# Metadata tag identifying agents owned by this app on the Julep side
+AGENT_METADATA_APP = "foodie-tours"
+REGISTRY_NAMESPACE = "julep_registry"
+# Registry entries are revalidated against the server on every start
+REGISTRY_TTL = 30 * 24 * 60 * 60
+
+def fingerprint_definition(definition: Dict[str, Any]) -> str:
+    """Content hash of an agent or task definition"""
+    canonical = json.dumps(definition, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+# Foodie tour task definition (Julep task YAML), parsed once by load_task_definition()
+FOODIE_TOUR_TASK_YAML = """
+name: Foodie Tour Generator
+description: Creates comprehensive foodie tours that adapt to real-time weather conditions and local cuisine
+
+input_schema:
+  type: object
+  properties:
+    city:
+      type: string
+      description: The city to create a foodie tour for
+    weather_data:
+      type: object
+      description: Current weather data for the city
+      properties:
+        temperature:
+          type: number
+        description:
+          type: string
+        rain_probability:
+          type: number
+        humidity:
+          type: number
+        wind_speed:
+          type: number
+    num_dishes:
+      type: integer
+      default: 3
+      description: Number of iconic dishes to recommend
+
+main:
+# Step 1: Weather Analysis
+- prompt:
+  - role: system
+    content: >
+      You are a weather analysis expert. Analyze the given weather conditions
+      and provide specific dining recommendations for the city.
+  - role: user
+    content: >
+      $ f'''Analyze the weather in {steps[0].input.city}:
+      Temperature: {steps[0].input.weather_data.temperature}°C
+      Conditions: {steps[0].input.weather_data.description}
+      Rain Probability: {steps[0].input.weather_data.rain_probability}%
+      Humidity: {steps[0].input.weather_data.humidity}%
+      Wind Speed: {steps[0].input.weather_data.wind_speed} m/s
+      
+      Provide specific dining recommendations based on these conditions.'''
+  unwrap: true
+
+# Step 2: Find Weather-Appropriate Dishes
+- prompt:
+  - role: system
+    content: >
+      You are a local culinary expert. Recommend iconic local dishes
+      that are perfect for the current weather conditions.
+  - role: user
+    content: >
+      $ f'''For {steps[0].input.city} with current weather conditions
+      (Temperature: {steps[0].input.weather_data.temperature}°C, 
+      Conditions: {steps[0].input.weather_data.description}),
+      recommend {steps[0].input.num_dishes} iconic local dishes that are perfect for today's weather.
+      Explain why each dish suits these conditions.'''
+  unwrap: true
+
+# Step 3: Find Suitable Restaurants
+- prompt:
+  - role: system
+    content: >
+      You are a restaurant discovery expert. Find restaurants that serve
+      the recommended dishes and are suitable for current weather conditions.
+  - role: user
+    content: >
+      $ f'''Based on the weather in {steps[0].input.city} and the recommended dishes,
+      find top-rated restaurants that:
+      1. Serve these authentic local dishes
+      2. Have appropriate indoor/outdoor seating for the weather
+      3. Are highly rated and authentic
+      
+      Weather: {steps[0].input.weather_data.temperature}°C, {steps[0].input.weather_data.description}
+      Dishes: {steps[1].output}'''
+  unwrap: true
+
+# Step 4: Create Tour Narrative
+- prompt:
+  - role: system
+    content: >
+      You are a master storyteller creating engaging food tour narratives.
+      Create a day-long adventure that feels personal and exciting.
+  - role: user
+    content: >
+      $ f'''Create an engaging one-day foodie tour for {steps[0].input.city}:
+      
+      Weather Context: {steps[0].input.weather_data.temperature}°C, {steps[0].input.weather_data.description}
+      Weather Analysis: {steps[0].output}
+      Recommended Dishes: {steps[1].output}
+      Restaurant Options: {steps[2].output}
+      
+      Create a narrative that includes morning, afternoon, and evening activities,
+      with cultural stories and weather-appropriate transitions.'''
+  unwrap: true
+
+# Step 5: Final Coordination
+- prompt:
+  - role: system
+    content: >
+      You are a tour coordinator. Create a comprehensive, practical guide
+      that combines all elements into an easy-to-follow format.
+  - role: user
+    content: >
+      $ f'''Create a final comprehensive guide for {steps[0].input.city} that combines:
+      
+      Weather Analysis: {steps[0].output}
+      Local Dishes: {steps[1].output}
+      Restaurant Recommendations: {steps[2].output}
+      Tour Narrative: {steps[3].output}
+      
+      Format this as a practical guide with clear sections, timing,
+      and actionable advice that someone could use today.'''
+  unwrap: true
+"""
+
+class AgentError(Exception):
+    """An agent call failed (raised instead of returning error text)"""
+    
+    def __init__(self, agent_type: str, message: str):
+        super().__init__(message)
+        self.agent_type = agent_type
+
+class CircuitOpenError(AgentError):
+    """An agent is failing fast because its upstream is degraded"""
+    
+    def __init__(self, agent_type: str, retry_after: float):
+        super().__init__(agent_type, f"The {agent_type} agent is temporarily unavailable (retry in {retry_after:.0f}s)")
+        self.retry_after = retry_after
+
+@lru_cache(maxsize=1)
+def load_task_definition() -> Dict[str, Any]:
+    """Parse the foodie tour task definition once per process"""
+    return yaml.safe_load(FOODIE_TOUR_TASK_YAML)
+
+class JulepAgentService:
+    """Service for managing Julep AI agents and tasks"""
+    
+    def __init__(self, api_key: str, persistent_cache: Optional[PersistentCache] = None,
+                 session_pool_size: int = 4, session_idle_timeout: float = 900.0,
+                 session_max_uses: int = 50, response_cache: Optional[TTLCache] = None,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 agent_rate_limiters: Optional[Dict[str, TokenBucket]] = None,
+                 hedge_requests: bool = True, metrics: Optional[Metrics] = None,
+                 cassette: Optional[Cassette] = None):
+        self.api_key = api_key
+        self.client = None
+        # Record live API calls to, or serve them back from, a cassette file
+        self.cassette = cassette
+        self.agents = {}
+        self.tasks = {}
+        self.agent_fingerprints = {
+            agent_type: fingerprint_definition(definition)
+            for agent_type, definition in AGENT_DEFINITIONS.items()
+        }
+        # Local agent/task ID registry, scoped to this API key
+        self.persistent_cache = persistent_cache
+        self._registry_scope = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+        # Reusable sessions for stateless prompts, so each chat is one round trip
+        self.session_pool = SessionPool(
+            self._create_session,
+            max_idle=session_pool_size,
+            idle_timeout=session_idle_timeout,
+            max_uses=session_max_uses
+        )
+        # Memoized responses to stateless prompts, keyed by agent definition and prompt;
+        # pass a shared cache to memoize across service instances
+        self.response_cache = response_cache or TTLCache(max_entries=512, ttl=RESPONSE_CACHE_TTL)
+        self.response_cache_enabled = {agent_type: True for agent_type in AGENT_DEFINITIONS}
+        self._response_cache_counts = {agent_type: {'hits': 0, 'misses': 0} for agent_type in AGENT_DEFINITIONS}
+        self._response_cache_lock = threading.Lock()
+        # Calls over the quota queue here instead of failing with 429s
+        self.rate_limiter = rate_limiter or limiter_from_env(
+            'FOODIE_JULEP_RATE_PER_MIN', JULEP_RATE_PER_MINUTE, name="julep",
+            burst_variable='FOODIE_JULEP_BURST'
+        )
+        if agent_rate_limiters is None:
+            agent_rate_limiters = {}
+            for agent_type in AGENT_DEFINITIONS:
+                limiter = limiter_from_env(
+                    'FOODIE_JULEP_AGENT_RATE_PER_MIN', AGENT_RATE_PER_MINUTE, name=f"julep:{agent_type}",
+                    burst_variable='FOODIE_JULEP_AGENT_BURST'
+                )
+                if limiter:
+                    agent_rate_limiters[agent_type] = limiter
+        self.agent_rate_limiters = agent_rate_limiters
+        # Tail latency: per-agent latency windows drive hedged duplicate requests
+        self.hedge_requests = hedge_requests
+        self.latency = LatencyTracker()
+        self._hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="julep-hedge")
+        self._hedge_counts = {'hedged': 0, 'hedge_wins': 0}
+        self._hedge_lock = threading.Lock()
+        # Latency and error rate of every Julep API call, by operation
+        self.metrics = metrics or default_metrics
+        # Fail fast while an agent's upstream is degraded
+        self.circuit_breakers = {
+            agent_type: CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+            for agent_type in AGENT_DEFINITIONS
+        }
+    
+    def initialize_client(self) -> bool:
+        """Initialize the Julep client"""
+        try:
+            if self.cassette and not self.cassette.recording:
+                # Replay needs no API access
+                self.client = self.cassette.julep_client()
+                return True
+            self.client = Julep(api_key=self.api_key)
+            if self.cassette:
+                self.client = self.cassette.julep_client(self.client)
+            return True
+        except Exception as e:
+            print(f"Error initializing Julep client: {e}")
+            return False
+    
+    def create_agents(self) -> bool:
+        """
+        Reuse or create all required agents for the foodie tour workflow
+        
+        Existing agents are found with a single list call and matched by
+        definition fingerprint. An agent is only created when no match
+        exists, and only updated when its definition changed.
+        """
+        try:
+            with self.metrics.timer('julep.agents_list'):
+                listed = self.client.agents.list(limit=100, metadata_filter={'app': AGENT_METADATA_APP})
+            existing = {agent.id: agent for agent in listed.items}
+            
+            for agent_type, definition in AGENT_DEFINITIONS.items():
+                fingerprint = self.agent_fingerprints[agent_type]
+                metadata = {
+                    'app': AGENT_METADATA_APP,
+                    'agent_type': agent_type,
+                    'fingerprint': fingerprint
+                }
+                registered = self._registry_get(f"agent:{agent_type}") or {}
+                agent = self._match_agent(agent_type, fingerprint, registered, existing)
+                
+                if agent is None and registered.get('id') in existing:
+                    # Definition changed since the agent was created
+                    with self.metrics.timer('julep.agent_update'):
+                        agent = self.client.agents.update(registered['id'], metadata=metadata, **definition)
+                elif agent is None:
+                    with self.metrics.timer('julep.agent_create'):
+                        agent = self.client.agents.create(metadata=metadata, **definition)
+                
+                self.agents[agent_type] = agent
+                self._registry_set(f"agent:{agent_type}", {'id': agent.id, 'fingerprint': fingerprint})
+            
+            return True
+            
+        except Exception as e:
+            print(f"Error creating agents: {e}")
+            return False
+    
+    def _match_agent(self, agent_type: str, fingerprint: str, registered: Dict[str, Any],
+                     existing: Dict[str, Any]) -> Optional[Any]:
+        """Find a server-side agent whose definition fingerprint matches"""
+        if registered.get('fingerprint') == fingerprint and registered.get('id') in existing:
+            return existing[registered['id']]
+        
+        for agent in existing.values():
+            metadata = getattr(agent, 'metadata', None) or {}
+            if metadata.get('agent_type') == agent_type and metadata.get('fingerprint') == fingerprint:
+                return agent
+        return None
+    
+    def _registry_get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Read a locally persisted agent/task ID record"""
+        if self.persistent_cache is None:
+            return None
+        return self.persistent_cache.get(REGISTRY_NAMESPACE, f"{self._registry_scope}:{name}")
+    
+    def _registry_delete(self, name: str):
+        """Forget a locally persisted agent/task ID record"""
+        if self.persistent_cache is not None:
+            self.persistent_cache.delete(REGISTRY_NAMESPACE, f"{self._registry_scope}:{name}")
+    
+    def _registry_set(self, name: str, record: Dict[str, Any]):
+        """Persist an agent/task ID record locally"""
+        if self.persistent_cache is not None:
+            self.persistent_cache.set(
+                REGISTRY_NAMESPACE, f"{self._registry_scope}:{name}", record, ttl=REGISTRY_TTL
+            )
+    
+    def chat_with_agent(self, agent_type: str, message: str, session_id: Optional[str] = None) -> str:
+        """
+        Send a message to a specific agent and get response
+        
+        Stateless prompts run on a pooled session and are not saved to its
+        history, so the session can be reused by the next call. They are
+        hedged: if the agent is slower than its recent p95, a duplicate
+        request is sent and the first answer wins.
+        
+        Args:
+            agent_type: Type of agent ('weather', 'culinary', 'restaurant', 'tour', 'coordinator')
+            message: Message to send to the agent
+            session_id: Pinned session from pin_session() for multi-turn context
+            
+        Returns:
+            Agent's response
+            
+        Raises:
+            CircuitOpenError: If the agent is failing fast after repeated errors
+            AgentError: If the agent is unknown, the call fails or the response is empty
+        """
+        self._check_agent(agent_type)
+        
+        cache_key = self._response_cache_key(agent_type, message) if session_id is None else None
+        if cache_key:
+            cached = self._cached_response(agent_type, cache_key)
+            if cached is not None:
+                return cached
+        
+        self._check_circuit(agent_type)
+        if session_id is None:
+            content = self._hedged_call(agent_type, message)
+        else:
+            content = self._tracked_call(agent_type, message, session_id)
+        
+        if cache_key:
+            self.response_cache.set(cache_key, content)
+        return content
+    
+    def chat_with_agent_stream(self, agent_type: str, message: str,
+                               session_id: Optional[str] = None) -> Iterator[str]:
+        """
+        Send a message to a specific agent and yield the response as it arrives
+        
+        Same session handling as chat_with_agent. If the server answers
+        with a complete (non-streamed) response, it is yielded as one chunk.
+        Stateless prompts are hedged on time to first chunk.
+        
+        Args:
+            agent_type: Type of agent ('weather', 'culinary', 'restaurant', 'tour', 'coordinator')
+            message: Message to send to the agent
+            session_id: Pinned session from pin_session() for multi-turn context
+            
+        Yields:
+            Response text chunks
+            
+        Raises:
+            CircuitOpenError: If the agent is failing fast after repeated errors
+            AgentError: If the agent is unknown, the call fails or the response is empty
+        """
+        self._check_agent(agent_type)
+        
+        cache_key = self._response_cache_key(agent_type, message) if session_id is None else None
+        if cache_key:
+            cached = self._cached_response(agent_type, cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        self._check_circuit(agent_type)
+        if session_id is None:
+            stream = self._hedged_stream(agent_type, message)
+        else:
+            stream = self._tracked_stream(agent_type, message, session_id)
+        
+        parts = []
+        for chunk in stream:
+            parts.append(chunk)
+            yield chunk
+        
+        if cache_key and parts:
+            self.response_cache.set(cache_key, "".join(parts))
+    
+    def _check_agent(self, agent_type: str):
+        if agent_type not in self.agents:
+            raise AgentError(agent_type, f"Agent type '{agent_type}' not found")
+    
+    def _check_circuit(self, agent_type: str):
+        breaker = self.circuit_breakers[agent_type]
+        if not breaker.allow():
+            raise CircuitOpenError(agent_type, breaker.retry_after())
+    
+    def _record_failure(self, agent_type: str, error: Exception) -> AgentError:
+        """Count a failed attempt against the agent's circuit and type the error"""
+        self.circuit_breakers[agent_type].record_failure()
+        if isinstance(error, AgentError):
+            return error
+        print(f"Error chatting with {agent_type} agent: {error}")
+        return AgentError(agent_type, f"Error communicating with {agent_type} agent: {error}")
+    
+    def _hedge_delay(self, agent_type: str, kind: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None without enough latency samples"""
+        if not self.hedge_requests or self.latency.count((agent_type, kind)) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(MIN_HEDGE_DELAY, self.latency.percentile((agent_type, kind), HEDGE_PERCENTILE))
+    
+    def _count_hedge(self, counter: str):
+        with self._hedge_lock:
+            self._hedge_counts[counter] += 1
+    
+    def _chat_once(self, agent_type: str, message: str, session_id: Optional[str] = None) -> str:
+        """Send one chat request, raising on errors or an empty response"""
+        pooled_session = self.session_pool.acquire(agent_type) if session_id is None else None
+        try:
+            self._throttle(agent_type)
+            with self.metrics.timer(f'julep.chat.{agent_type}'):
+                response = self.client.sessions.chat(
+                    session_id=session_id or pooled_session,
+                    messages=[{
+                        "role": "user",
+                        "content": message
+                    }],
+                    save=session_id is not None
+                )
+        except Exception:
+            if pooled_session:
+                self.session_pool.release(agent_type, pooled_session, reusable=False)
+            raise
+        
+        if pooled_session:
+            self.session_pool.release(agent_type, pooled_session)
+        
+        # Extract the response content
+        if response.choices and len(response.choices) > 0 and response.choices[0].message.content:
+            return response.choices[0].message.content
+        raise AgentError(agent_type, f"No response from {agent_type} agent")
+    
+    def _tracked_call(self, agent_type: str, message: str, session_id: Optional[str] = None) -> str:
+        """One chat attempt with latency and circuit breaker bookkeeping"""
+        started = time.monotonic()
+        try:
+            content = self._chat_once(agent_type, message, session_id)
+        except Exception as e:
+            raise self._record_failure(agent_type, e) from e
+        self.latency.record((agent_type, 'chat'), time.monotonic() - started)
+        self.circuit_breakers[agent_type].record_success()
+        return content
+    
+    def _hedged_call(self, agent_type: str, message: str) -> str:
+        """Chat, sending a duplicate request if the first is slower than usual"""
+        delay = self._hedge_delay(agent_type, 'chat')
+        if delay is None:
+            return self._tracked_call(agent_type, message)
+        
+        primary = self._hedge_executor.submit(self._tracked_call, agent_type, message)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        
+        self._count_hedge('hedged')
+        hedge = self._hedge_executor.submit(self._tracked_call, agent_type, message)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count_hedge('hedge_wins')
+                    # The slower request finishes in the background and is discarded
+                    return future.result()
+                error = future.exception()
+        raise error
+    
+    def _stream_once(self, agent_type: str, message: str, session_id: Optional[str] = None) -> Iterator[str]:
+        """Stream one chat request, raising on errors or an empty response"""
+        pooled_session = self.session_pool.acquire(agent_type) if session_id is None else None
+        reusable = False
+        try:
+            self._throttle(agent_type)
+            with self.metrics.timer(f'julep.stream.{agent_type}'):
+                with self.client.sessions.with_streaming_response.chat(
+                    session_id=session_id or pooled_session,
+                    messages=[{
+                        "role": "user",
+                        "content": message
+                    }],
+                    save=session_id is not None,
+                    stream=True
+                ) as response:
+                    received = False
+                    if 'text/event-stream' not in response.headers.get('content-type', ''):
+                        choices = response.json().get('choices') or []
+                        if choices and choices[0]['message']['content']:
+                            received = True
+                            yield choices[0]['message']['content']
+                    else:
+                        for line in response.iter_lines():
+                            chunk = self._parse_stream_line(line)
+                            if chunk:
+                                received = True
+                                yield chunk
+                
+                if not received:
+                    raise AgentError(agent_type, f"No response from {agent_type} agent")
+            reusable = True
+        finally:
+            if pooled_session:
+                self.session_pool.release(agent_type, pooled_session, reusable=reusable)
+    
+    def _tracked_stream(self, agent_type: str, message: str,
+                        session_id: Optional[str] = None) -> Iterator[str]:
+        """One streamed attempt with time-to-first-chunk and circuit breaker bookkeeping"""
+        started = time.monotonic()
+        first = True
+        completed = False
+        try:
+            for chunk in self._stream_once(agent_type, message, session_id):
+                if first:
+                    self.latency.record((agent_type, 'first_chunk'), time.monotonic() - started)
+                    first = False
+                yield chunk
+            completed = True
+        except Exception as e:
+            completed = True
+            raise self._record_failure(agent_type, e) from e
+        finally:
+            # Closed early (GeneratorExit, e.g. a cancelled hedge): neither success nor
+            # failure, but a half-open circuit must not wait on this trial forever
+            if not completed:
+                self.circuit_breakers[agent_type].release_trial()
+        self.circuit_breakers[agent_type].record_success()
+    
+    def _hedged_stream(self, agent_type: str, message: str) -> Iterator[str]:
+        """
+        Stream a chat, racing a duplicate request if the first chunk is late
+        
+        Whichever attempt produces the first chunk wins; the other is
+        closed at its next chunk.
+        """
+        delay = self._hedge_delay(agent_type, 'first_chunk')
+        if delay is None:
+            yield from self._tracked_stream(agent_type, message)
+            return
+        
+        events: queue.Queue = queue.Queue()
+        cancelled = [threading.Event(), threading.Event()]
+        
+        def pump(index: int):
+            stream = self._tracked_stream(agent_type, message)
+            try:
+                for chunk in stream:
+                    if cancelled[index].is_set():
+                        break
+                    events.put((index, 'chunk', chunk))
+                events.put((index, 'end', None))
+            except AgentError as e:
+                events.put((index, 'error', e))
+            finally:
+                stream.close()
+        
+        self._hedge_executor.submit(pump, 0)
+        started = 1
+        failed = 0
+        winner = None
+        try:
+            while True:
+                try:
+                    wait_for = delay if started == 1 and winner is None else None
+                    index, kind, payload = events.get(timeout=wait_for)
+                except queue.Empty:
+                    self._count_hedge('hedged')
+                    self._hedge_executor.submit(pump, 1)
+                    started = 2
+                    continue
+                
+                if winner is None:
+                    if kind == 'error':
+                        failed += 1
+                        if failed == started:
+                            raise payload
+                        continue
+                    winner = index
+                    for other in range(started):
+                        if other != winner:
+                            cancelled[other].set()
+                    if winner == 1:
+                        self._count_hedge('hedge_wins')
+                
+                if index != winner:
+                    continue
+                if kind == 'chunk':
+                    yield payload
+                elif kind == 'end':
+                    return
+                else:
+                    raise payload
+        finally:
+            for event in cancelled:
+                event.set()
+    
+    def _replaying(self) -> bool:
+        """Replayed calls never reach the API, so they aren't paced (like replayed weather calls)"""
+        return self.cassette is not None and not self.cassette.recording
+    
+    def _throttle(self, agent_type: Optional[str] = None):
+        """Wait for the agent's quota, then the shared API quota"""
+        if self._replaying():
+            return
+        # Agent first, so callers queued on a busy agent don't hold shared tokens
+        agent_limiter = self.agent_rate_limiters.get(agent_type) if agent_type else None
+        if agent_limiter:
+            agent_limiter.acquire()
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+    
+    async def _throttle_async(self):
+        """Wait for the shared API quota without blocking the event loop"""
+        if self._replaying():
+            return
+        if self.rate_limiter:
+            await self.rate_limiter.acquire_async()
+    
+    def get_rate_limit_stats(self) -> Dict[str, Any]:
+        """Get quota usage and queue wait times for the API key and each agent"""
+        return {
+            'global': self.rate_limiter.get_stats() if self.rate_limiter else None,
+            'agents': {
+                agent_type: limiter.get_stats()
+                for agent_type, limiter in self.agent_rate_limiters.items()
+            }
+        }
+    
+    def get_resilience_stats(self) -> Dict[str, Any]:
+        """Get per-agent latency percentiles, hedging counters and circuit states"""
+        with self._hedge_lock:
+            hedging = dict(self._hedge_counts)
+        hedging['enabled'] = self.hedge_requests
+        return {
+            'latency': self.latency.get_stats(),
+            'hedging': hedging,
+            'circuits': {
+                agent_type: breaker.get_stats()
+                for agent_type, breaker in self.circuit_breakers.items()
+            }
+        }
+    
+    def set_response_caching(self, agent_type: str, enabled: bool):
+        """Enable or disable response memoization for one agent"""
+        self.response_cache_enabled[agent_type] = enabled
+    
+    def get_response_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache size, evictions and per-agent hit rates"""
+        stats = self.response_cache.get_stats()
+        with self._response_cache_lock:
+            per_agent = {agent_type: dict(counts) for agent_type, counts in self._response_cache_counts.items()}
+        for agent_type, counts in per_agent.items():
+            lookups = counts['hits'] + counts['misses']
+            counts['hit_rate'] = round(counts['hits'] / lookups, 3) if lookups else 0.0
+            counts['enabled'] = self.response_cache_enabled.get(agent_type, False)
+        stats['per_agent'] = per_agent
+        return stats
+    
+    def _response_cache_key(self, agent_type: str, message: str) -> Optional[str]:
+        """
+        Build the memoization key for a stateless prompt
+        
+        Returns:
+            Key combining the agent type, its definition fingerprint and a
+            hash of the whitespace-normalized prompt, or None if caching is
+            disabled for the agent
+        """
+        if not self.response_cache_enabled.get(agent_type, False):
+            return None
+        
+        normalized = " ".join(message.split())
+        prompt_hash = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        return f"{agent_type}:{self.agent_fingerprints[agent_type]}:{prompt_hash}"
+    
+    def _cached_response(self, agent_type: str, cache_key: str) -> Optional[str]:
+        """Look up a memoized response and count the hit or miss"""
+        cached = self.response_cache.get(cache_key)
+        with self._response_cache_lock:
+            self._response_cache_counts[agent_type]['hits' if cached is not None else 'misses'] += 1
+        return cached
+    
+    @staticmethod
+    def _parse_stream_line(line: str) -> Optional[str]:
+        """Extract the text delta from one server-sent event line"""
+        if not line.startswith('data:'):
+            return None
+        
+        payload = line[len('data:'):].strip()
+        if not payload or payload == '[DONE]':
+            return None
+        
+        try:
+            choices = json.loads(payload).get('choices') or []
+        except ValueError:
+            return None
+        if not choices:
+            return None
+        
+        delta = choices[0].get('delta') or choices[0].get('message') or {}
+        return delta.get('content')
+    
+    def pin_session(self, agent_type: str) -> str:
+        """
+        Create a dedicated session that keeps conversation history
+        
+        Pass the returned ID as chat_with_agent(..., session_id=...) for
+        multi-turn conversations. Pinned sessions never enter the pool.
+        
+        Args:
+            agent_type: Type of agent
+            
+        Returns:
+            Session ID
+        """
+        return self._create_session(agent_type)
+    
+    def _create_session(self, agent_type: str) -> str:
+        """Create a new session for an agent"""
+        self._throttle()
+        with self.metrics.timer('julep.session_create'):
+            session = self.client.sessions.create(
+                agent=self.agents[agent_type].id,
+                situation="Helping create a foodie tour"
+            )
+        return session.id
+    
+    def create_foodie_tour_task(self) -> bool:
+        """
+        Reuse or create a comprehensive foodie tour task with all agents
+        
+        The task is identified by a content hash of its definition and
+        coordinator agent, so restarts reuse the existing server-side task.
+        """
+        try:
+            # Create the main coordinator agent if not exists
+            if 'coordinator' not in self.agents:
+                self.create_agents()
+            
+            
+            agent_id = self.agents['coordinator'].id
+            task_definition = load_task_definition()
+            fingerprint = fingerprint_definition({'agent_id': agent_id, **task_definition})
+            
+            # Reuse the task recorded locally for this exact definition
+            registered = self._registry_get("task:foodie_tour") or {}
+            if registered.get('fingerprint') == fingerprint:
+                self.tasks['foodie_tour'] = registered['id']
+                return True
+            
+            # Otherwise look for one created by another process before creating it
+            task = None
+            with self.metrics.timer('julep.tasks_list'):
+                listed = self.client.tasks.list(agent_id=agent_id, limit=100)
+            for existing in listed.items:
+                metadata = getattr(existing, 'metadata', None) or {}
+                if metadata.get('fingerprint') == fingerprint:
+                    task = existing
+                    break
+            
+            if task is None:
+                with self.metrics.timer('julep.task_create'):
+                    task = self.client.tasks.create(
+                        agent_id=agent_id,
+                        metadata={'app': AGENT_METADATA_APP, 'fingerprint': fingerprint},
+                        **task_definition
+                    )
+            
+            self.tasks['foodie_tour'] = task.id
+            self._registry_set("task:foodie_tour", {'id': task.id, 'fingerprint': fingerprint})
+            return True
+            
+        except Exception as e:
+            print(f"Error creating foodie tour task: {e}")
+            return False
+    
+    def start_foodie_tour(self, city: str, weather_data: Dict[str, Any]) -> Optional[str]:
+        """
+        Start the foodie tour task for a city without waiting for it
+        
+        Args:
+            city: Name of the city
+            weather_data: Weather information
+            
+        Returns:
+            Execution ID, or None if the task could not be created
+        """
+        if 'foodie_tour' not in self.tasks:
+            if not self.create_foodie_tour_task():
+                return None
+        
+        task_input = {
+            'city': city,
+            'weather_data': weather_data,
+            'num_dishes': 3
+        }
+        
+        # Execute the task
+        self._throttle()
+        try:
+            with self.metrics.timer('julep.execution_create'):
+                execution = self.client.executions.create(task_id=self.tasks['foodie_tour'], input=task_input)
+        except NotFoundError:
+            # The recorded task was deleted server-side; recreate it once
+            self.tasks.pop('foodie_tour', None)
+            self._registry_delete("task:foodie_tour")
+            if not self.create_foodie_tour_task():
+                return None
+            self._throttle()
+            with self.metrics.timer('julep.execution_create'):
+                execution = self.client.executions.create(task_id=self.tasks['foodie_tour'], input=task_input)
+        return execution.id
+    
+    def execute_foodie_tour(self, city: str, weather_data: Dict[str, Any],
+                            timeout: float = EXECUTION_TIMEOUT) -> Optional[Dict[str, Any]]:
+        """
+        Execute the foodie tour task for a specific city
+        
+        Args:
+            city: Name of the city
+            weather_data: Weather information
+            timeout: Seconds to wait for the execution to finish
+            
+        Returns:
+            Task execution result or None if error
+        """
+        try:
+            execution_id = self.start_foodie_tour(city, weather_data)
+            if execution_id is None:
+                return None
+            
+            return self.wait_for_execution(execution_id, timeout=timeout)
+            
+        except Exception as e:
+            print(f"Error executing foodie tour for {city}: {e}")
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+    
+    def execute_foodie_tours(self, weather_by_city: Dict[str, Dict[str, Any]],
+                             timeout: float = EXECUTION_TIMEOUT) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Start the foodie tour task for several cities and wait on them together
+        
+        Args:
+            weather_by_city: Dictionary of city -> weather information
+            timeout: Seconds to wait for all executions to finish
+            
+        Returns:
+            Dictionary of city -> task execution result (None if it could not start)
+        """
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        execution_ids: Dict[str, str] = {}
+        
+        for city, weather_data in weather_by_city.items():
+            try:
+                execution_id = self.start_foodie_tour(city, weather_data)
+            except Exception as e:
+                print(f"Error executing foodie tour for {city}: {e}")
+                results[city] = {'status': 'error', 'error': str(e)}
+                continue
+            if execution_id is None:
+                results[city] = None
+            else:
+                execution_ids[city] = execution_id
+        
+        finished = self.wait_for_executions(list(execution_ids.values()), timeout=timeout)
+        for city, execution_id in execution_ids.items():
+            results[city] = finished[execution_id]
+        return results
+    
+    def wait_for_execution(self, execution_id: str, timeout: float = EXECUTION_TIMEOUT) -> Dict[str, Any]:
+        """
+        Poll an execution until it finishes, with adaptive backoff
+        
+        Polls quickly at first (most of the wait is at the end of long
+        executions, but short ones finish early) and backs off to
+        MAX_POLL_INTERVAL, never sleeping past the deadline.
+        
+        Args:
+            execution_id: Execution to wait for
+            timeout: Seconds before giving up
+            
+        Returns:
+            Dictionary with 'status' of success, failed, timeout or error
+        """
+        deadline = time.monotonic() + timeout
+        interval = INITIAL_POLL_INTERVAL
+        
+        try:
+            while True:
+                self._throttle()
+                with self.metrics.timer('julep.execution_poll'):
+                    result = self.client.executions.get(execution_id)
+                outcome = self._execution_outcome(result)
+                if outcome is not None:
+                    return outcome
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return self._execution_timeout()
+                time.sleep(min(interval, remaining))
+                interval = min(interval * POLL_BACKOFF, MAX_POLL_INTERVAL)
+        except Exception as e:
+            print(f"Error waiting for execution {execution_id}: {e}")
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+    
+    async def wait_for_execution_async(self, execution_id: str,
+                                       timeout: float = EXECUTION_TIMEOUT) -> Dict[str, Any]:
+        """
+        Non-blocking variant of wait_for_execution for use inside an event loop
+        
+        Args:
+            execution_id: Execution to wait for
+            timeout: Seconds before giving up
+            
+        Returns:
+            Dictionary with 'status' of success, failed, timeout or error
+        """
+        deadline = time.monotonic() + timeout
+        interval = INITIAL_POLL_INTERVAL
+        
+        try:
+            while True:
+                await self._throttle_async()
+                with self.metrics.timer('julep.execution_poll'):
+                    result = await asyncio.to_thread(self.client.executions.get, execution_id)
+                outcome = self._execution_outcome(result)
+                if outcome is not None:
+                    return outcome
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return self._execution_timeout()
+                await asyncio.sleep(min(interval, remaining))
+                interval = min(interval * POLL_BACKOFF, MAX_POLL_INTERVAL)
+        except Exception as e:
+            print(f"Error waiting for execution {execution_id}: {e}")
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+    
+    async def wait_for_executions_async(self, execution_ids: List[str],
+                                        timeout: float = EXECUTION_TIMEOUT) -> Dict[str, Dict[str, Any]]:
+        """
+        Wait on many executions concurrently under one shared deadline
+        
+        Returns:
+            Dictionary of execution ID -> result
+        """
+        outcomes = await asyncio.gather(
+            *(self.wait_for_execution_async(execution_id, timeout) for execution_id in execution_ids)
+        )
+        return dict(zip(execution_ids, outcomes))
+    
+    def wait_for_executions(self, execution_ids: List[str],
+                            timeout: float = EXECUTION_TIMEOUT) -> Dict[str, Dict[str, Any]]:
+        """
+        Blocking variant of wait_for_executions_async, polling on worker threads
+        
+        The deadline is shared: an execution queued behind busy workers
+        only gets the time left, so the batch never waits past timeout.
+        
+        Returns:
+            Dictionary of execution ID -> result
+        """
+        if not execution_ids:
+            return {}
+        
+        deadline = time.monotonic() + timeout
+        
+        def wait(execution_id: str) -> Dict[str, Any]:
+            return self.wait_for_execution(execution_id, max(0.0, deadline - time.monotonic()))
+        
+        with ThreadPoolExecutor(max_workers=min(len(execution_ids), 16)) as executor:
+            outcomes = executor.map(wait, execution_ids)
+            return dict(zip(execution_ids, outcomes))
+    
+    @staticmethod
+    def _execution_outcome(result: Any) -> Optional[Dict[str, Any]]:
+        """Convert a finished execution into a result dict, or None while it runs"""
+        if result.status == 'succeeded':
+            return {
+                'status': 'success',
+                'output': result.output,
+                'steps': result.output if hasattr(result, 'output') else None
+            }
+        elif result.status in ('failed', 'cancelled'):
+            return {
+                'status': 'failed',
+                'error': getattr(result, 'error', None) or f"Execution {result.status}"
+            }
+        return None
+    
+    @staticmethod
+    def _execution_timeout() -> Dict[str, Any]:
+        return {
+            'status': 'timeout',
+            'error': 'Task execution timed out'
+        }
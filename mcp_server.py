@@ -1,398 +1,813 @@
-#!/usr/bin/env python3
-"""
-Foodie Tours MCP Server
-
-This MCP server exposes the functionality of the Foodie Tours Streamlit application,
-allowing interaction with weather data, Julep AI agents, and tour generation
-through any MCP-compatible client (Claude Desktop, IDEs, etc.).
-"""
-
-import os
-import sys
-import io
-import json
-
-# Fix encoding issues on Windows
-if sys.platform == "win32":
-    # Ensure UTF-8 encoding for stdout/stderr to handle Unicode characters
-    if hasattr(sys.stdout, 'buffer'):
-        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-    if hasattr(sys.stderr, 'buffer'):
-        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
-import asyncio
-from typing import Dict, Any, Optional, List
-from datetime import datetime
-from dotenv import load_dotenv
-from fastmcp import FastMCP, Context
-
-# Import your existing services
-from weather_service import WeatherService
-from julep_service import JulepAgentService
-from utils import validate_api_key, get_weather_emoji, format_time
-
-# Load environment variables
-load_dotenv()
-
-# Initialize the MCP server
-mcp = FastMCP(
-    name="Foodie Tours Server",
-    instructions="""
-    This server provides access to the Foodie Tours application functionality.
-    You can:
-    - Get weather data for any city
-    - Generate personalized foodie tours using AI agents
-    - Get dining recommendations based on weather conditions
-    - Access weather-appropriate restaurant suggestions
-    - Create complete tour narratives with cultural insights
-    
-    The server integrates weather analysis with AI-powered culinary expertise
-    to create comprehensive food tourism experiences.
-    """
-)
-
-# Global services (will be initialized on server startup)
-weather_service: Optional[WeatherService] = None
-julep_service: Optional[JulepAgentService] = None
-tours_cache: Dict[str, Any] = {}
-
-async def initialize_services():
-    """Initialize weather and Julep services"""
-    global weather_service, julep_service
-    
-    try:
-        # Get API keys from environment
-        julep_key = os.getenv('JULEP_API_KEY')
-        weather_key = os.getenv('OPENWEATHER_API_KEY')
-        
-        if not julep_key:
-            print("WARNING: JULEP_API_KEY not found - some features will be disabled")
-            weather_key_available = weather_key is not None
-            if weather_key_available:
-                weather_service = WeatherService(weather_key)
-                print("SUCCESS: Weather service initialized")
-            return weather_key_available
-        
-        if not weather_key:
-            print("WARNING: OPENWEATHER_API_KEY not found - weather features will be disabled")
-            # Try to initialize just Julep service
-            julep_service = JulepAgentService(julep_key)
-            if julep_service.initialize_client() and julep_service.create_agents():
-                print("SUCCESS: Julep service initialized")
-                return True
-            return False
-        
-        # Initialize both services
-        weather_service = WeatherService(weather_key)
-        print("SUCCESS: Weather service initialized")
-        
-        julep_service = JulepAgentService(julep_key)
-        if julep_service.initialize_client() and julep_service.create_agents():
-            print("SUCCESS: Julep service initialized")
-        else:
-            print("WARNING: Julep service initialization failed")
-        
-        print("SUCCESS: Services initialized successfully")
-        return True
-        
-    except Exception as e:
-        print(f"WARNING: Error during service initialization: {e}")
-        print("Some features may be disabled")
-        return False
-
-@mcp.tool()
-def get_weather_data(city: str) -> Dict[str, Any]:
-    """
-    Get current weather data for a specific city.
-    
-    Args:
-        city: Name of the city to get weather for
-        
-    Returns:
-        Dictionary containing weather information including temperature,
-        humidity, description, wind speed, and more
-    """
-    if not weather_service:
-        return {"error": "Weather service not initialized"}
-    
-    try:
-        weather_data = weather_service.get_weather_data(city)
-        if weather_data:
-            # Add emoji for better display
-            weather_data['emoji'] = get_weather_emoji(weather_data['description'])
-            weather_data['formatted_time'] = format_time(datetime.now())
-            return weather_data
-        else:
-            return {"error": f"Could not fetch weather data for {city}"}
-    except Exception as e:
-        return {"error": f"Error fetching weather: {str(e)}"}
-
-@mcp.tool()
-def get_dining_recommendation(city: str) -> Dict[str, Any]:
-    """
-    Get weather-based dining recommendation for a city.
-    
-    Args:
-        city: Name of the city
-        
-    Returns:
-        Dictionary containing dining recommendation based on current weather
-    """
-    if not weather_service:
-        return {"error": "Weather service not initialized"}
-    
-    try:
-        weather_data = weather_service.get_weather_data(city)
-        if weather_data:
-            recommendation = weather_service.get_dining_recommendation(weather_data)
-            return {
-                "city": city,
-                "weather": weather_data,
-                "dining_recommendation": recommendation
-            }
-        else:
-            return {"error": f"Could not fetch weather data for {city}"}
-    except Exception as e:
-        return {"error": f"Error getting dining recommendation: {str(e)}"}
-
-@mcp.tool()
-def chat_with_agent(agent_type: str, message: str) -> Dict[str, Any]:
-    """
-    Chat with a specific Julep AI agent.
-    
-    Args:
-        agent_type: Type of agent ('weather', 'culinary', 'restaurant', 'tour', 'coordinator')
-        message: Message to send to the agent
-        
-    Returns:
-        Dictionary containing the agent's response
-    """
-    if not julep_service:
-        return {"error": "Julep service not initialized"}
-    
-    valid_agents = ['weather', 'culinary', 'restaurant', 'tour', 'coordinator']
-    if agent_type not in valid_agents:
-        return {
-            "error": f"Invalid agent type. Valid types are: {', '.join(valid_agents)}"
-        }
-    
-    try:
-        response = julep_service.chat_with_agent(agent_type, message)
-        return {
-            "agent_type": agent_type,
-            "message": message,
-            "response": response
-        }
-    except Exception as e:
-        return {"error": f"Error chatting with agent: {str(e)}"}
-
-@mcp.tool()
-async def create_complete_foodie_tour(city: str, ctx: Context) -> Dict[str, Any]:
-    """
-    Create a complete foodie tour for a city using all AI agents.
-    This is the main function that orchestrates weather analysis,
-    culinary expertise, restaurant recommendations, and tour narrative.
-    
-    Args:
-        city: Name of the city to create tour for
-        
-    Returns:
-        Dictionary containing complete foodie tour information
-    """
-    if not weather_service or not julep_service:
-        return {"error": "Services not initialized"}
-    
-    try:
-        await ctx.info(f"Creating complete foodie tour for {city}...")
-        
-        # Step 1: Get weather data
-        await ctx.info("Fetching weather data...")
-        weather_data = weather_service.get_weather_data(city)
-        if not weather_data:
-            return {"error": f"Could not fetch weather data for {city}"}
-        
-        # Step 2: Weather analysis
-        await ctx.info("Analyzing weather with AI agent...")
-        weather_message = f"""
-        Analyze the current weather in {city}:
-        - Temperature: {weather_data['temperature']}°C (feels like {weather_data['feels_like']}°C)
-        - Conditions: {weather_data['description']}
-        - Humidity: {weather_data['humidity']}%
-        - Wind Speed: {weather_data['wind_speed']} m/s
-        
-        Provide dining recommendations that match these weather conditions.
-        """
-        weather_analysis = julep_service.chat_with_agent('weather', weather_message)
-        
-        # Step 3: Culinary expertise
-        await ctx.info("Getting culinary expertise...")
-        culinary_message = f"""
-        Based on the weather analysis for {city}, suggest authentic local dishes
-        that would be perfect for these conditions:
-        {weather_analysis}
-        
-        Focus on traditional cuisine and seasonal specialties.
-        """
-        culinary_suggestions = julep_service.chat_with_agent('culinary', culinary_message)
-        
-        # Step 4: Restaurant recommendations
-        await ctx.info("Finding perfect restaurants...")
-        restaurant_message = f"""
-        Find restaurants in {city} that would be ideal for the current weather
-        and these culinary suggestions:
-        
-        Weather: {weather_data['description']}, {weather_data['temperature']}°C
-        Cuisine Focus: {culinary_suggestions}
-        
-        Recommend specific restaurants with indoor/outdoor options as appropriate.
-        """
-        restaurant_recommendations = julep_service.chat_with_agent('restaurant', restaurant_message)
-        
-        # Step 5: Create tour narrative
-        await ctx.info("Crafting tour narrative...")
-        tour_message = f"""
-        Create an engaging foodie tour narrative for {city} incorporating:
-        
-        Weather Conditions: {weather_data['description']}, {weather_data['temperature']}°C
-        Culinary Focus: {culinary_suggestions}
-        Restaurant Recommendations: {restaurant_recommendations}
-        
-        Make it personal and story-driven, like a local guide showing friends around.
-        """
-        tour_narrative = julep_service.chat_with_agent('tour', tour_message)
-        
-        # Step 6: Final coordination
-        await ctx.info(" Coordinating final tour...")
-        coordination_message = f"""
-        Synthesize all elements into a practical, comprehensive foodie tour guide:
-        
-        City: {city}
-        Weather: {weather_data}
-        Weather Analysis: {weather_analysis}
-        Culinary Suggestions: {culinary_suggestions}
-        Restaurant Recommendations: {restaurant_recommendations}
-        Tour Narrative: {tour_narrative}
-        
-        Create a final, well-organized tour guide that visitors can actually use.
-        """
-        final_tour = julep_service.chat_with_agent('coordinator', coordination_message)
-        
-        # Compile complete tour
-        complete_tour = {
-            "city": city,
-            "created_at": datetime.now().isoformat(),
-            "weather_data": weather_data,
-            "weather_analysis": weather_analysis,
-            "culinary_suggestions": culinary_suggestions,
-            "restaurant_recommendations": restaurant_recommendations,
-            "tour_narrative": tour_narrative,
-            "final_tour_guide": final_tour
-        }
-        
-        # Cache the tour
-        tours_cache[f"{city}_{datetime.now().strftime('%Y%m%d')}"] = complete_tour
-        
-        await ctx.info(f"SUCCESS: Complete foodie tour created for {city}!")
-        return complete_tour
-        
-    except Exception as e:
-        await ctx.error(f"Error creating foodie tour: {str(e)}")
-        return {"error": f"Error creating foodie tour: {str(e)}"}
-
-@mcp.tool()
-def list_available_agents() -> List[str]:
-    """
-    List all available Julep AI agents and their specialties.
-    
-    Returns:
-        List of agent types with descriptions
-    """
-    agents = [
-        "weather - Expert at analyzing weather conditions and dining recommendations",
-        "culinary - Specialist in local cuisines and traditional dishes",
-        "restaurant - Expert at finding restaurants based on weather and cuisine",
-        "tour - Master storyteller for engaging food tour narratives",
-        "coordinator - Expert coordinator for comprehensive tour synthesis"
-    ]
-    return agents
-
-@mcp.tool()
-def get_cached_tours() -> List[str]:
-    """
-    Get list of cached tours.
-    
-    Returns:
-        List of cached tour keys
-    """
-    return list(tours_cache.keys())
-
-@mcp.tool()
-def get_cached_tour(tour_key: str) -> Dict[str, Any]:
-    """
-    Retrieve a cached tour by its key.
-    
-    Args:
-        tour_key: Key of the cached tour
-        
-    Returns:
-        Cached tour data or error message
-    """
-    if tour_key in tours_cache:
-        return tours_cache[tour_key]
-    else:
-        return {"error": f"Tour '{tour_key}' not found in cache"}
-
-# Resources - provide access to static information
-@mcp.resource("resource://app-status")
-async def get_app_status(ctx: Context) -> Dict[str, Any]:
-    """Get the current status of the Foodie Tours application."""
-    await ctx.info("Checking application status...")
-    
-    status = {
-        "app_name": "Foodie Tours",
-        "server_name": mcp.name,
-        "weather_service_active": weather_service is not None,
-        "julep_service_active": julep_service is not None,
-        "cached_tours_count": len(tours_cache),
-        "available_agents": len(julep_service.agents) if julep_service else 0,
-        "last_updated": datetime.now().isoformat()
-    }
-    
-    return status
-
-@mcp.resource("resource://tour-cache")
-def get_tour_cache_info() -> Dict[str, Any]:
-    """Get information about cached tours."""
-    return {
-        "total_tours": len(tours_cache),
-        "tour_keys": list(tours_cache.keys()),
-        "cache_created": datetime.now().isoformat()
-    }
-
-@mcp.resource("resource://service-config")
-def get_service_configuration() -> Dict[str, Any]:
-    """Get current service configuration."""
-    return {
-        "weather_api_configured": os.getenv('OPENWEATHER_API_KEY') is not None,
-        "julep_api_configured": os.getenv('JULEP_API_KEY') is not None,
-        "base_weather_url": "http://api.openweathermap.org/data/2.5" if weather_service else None,
-        "supported_agents": [
-            "weather", "culinary", "restaurant", "tour", "coordinator"
-        ]
-    }
-
-# Server lifecycle management will be handled in main
-if __name__ == "__main__":
-    # Initialize services synchronously before starting server
-    print("Starting Foodie Tours MCP Server...")
-    
-    # Run initialization in an event loop
-    import asyncio
-    try:
-        asyncio.run(initialize_services())
-        print("SUCCESS: Foodie Tours MCP Server started successfully!")
-        # Run the server
-        # Default to stdio for CLI usage, but can be overridden
-        mcp.run()
-    except Exception as e:
-        print(f"ERROR: Failed to start server: {e}")
-        exit(1)
+#!/usr/bin/env python3
+"""
+Foodie Tours MCP Server
+
+This MCP server exposes the functionality of the Foodie Tours Streamlit application,
+allowing interaction with weather data, Julep AI agents, and tour generation
+through any MCP-compatible client (Claude Desktop, IDEs, etc.).
+"""
+
+import os
+import sys
+import io
+import json
+
+# Fix encoding issues on Windows
+if sys.platform == "win32":
+    # Ensure UTF-8 encoding for stdout/stderr to handle Unicode characters
+    if hasattr(sys.stdout, 'buffer'):
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    if hasattr(sys.stderr, 'buffer'):
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional, List
+from datetime import datetime
+from dotenv import load_dotenv
+from fastmcp import FastMCP, Context
+
+# Import your existing services
+from weather_service import WeatherService
+from julep_service import JulepAgentService, CircuitOpenError
+from cache import TTLCache
+from singleflight import AsyncSingleFlight
+from metrics import metrics
+from persistent_cache import open_persistent_cache
+from cassette import open_cassette
+from prompt_compaction import compact_context, prompt_sizes
+from tour_cache import TourStore, TOURS_NAMESPACE, TOUR_CACHE_TTL
+from utils import validate_api_key, get_weather_emoji, format_time
+
+# Load environment variables
+load_dotenv()
+
+# Initialize the MCP server
+mcp = FastMCP(
+    name="Foodie Tours Server",
+    instructions="""
+    This server provides access to the Foodie Tours application functionality.
+    You can:
+    - Get weather data for any city
+    - Generate personalized foodie tours using AI agents
+    - Generate tours for many cities in one call (create_foodie_tours_batch)
+    - Get dining recommendations based on weather conditions
+    - Access weather-appropriate restaurant suggestions
+    - Create complete tour narratives with cultural insights
+    
+    The server integrates weather analysis with AI-powered culinary expertise
+    to create comprehensive food tourism experiences.
+    
+    Concurrency: blocking Julep and cache calls run on a bounded worker pool
+    (FOODIE_MCP_WORKERS, default 8), so other tools stay responsive while a
+    tour is built. At most FOODIE_MCP_MAX_TOURS tours (default 4) are generated
+    at once; further requests wait for a free slot. Cached tours are served
+    without waiting.
+    """
+)
+
+# Blocking service calls run here instead of on the event loop. Each tour being
+# generated holds one worker while an agent streams, so keep workers above the
+# tour limit to leave room for chats and cache reads.
+MCP_WORKERS = int(os.getenv('FOODIE_MCP_WORKERS', 8))
+MAX_CONCURRENT_TOURS = max(1, min(int(os.getenv('FOODIE_MCP_MAX_TOURS', 4)), MCP_WORKERS - 1))
+blocking_executor = ThreadPoolExecutor(max_workers=MCP_WORKERS, thread_name_prefix="foodie-mcp")
+tour_slots = asyncio.Semaphore(MAX_CONCURRENT_TOURS)
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking call on the bounded worker pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, functools.partial(func, *args, **kwargs))
+
+class TourUnavailableError(Exception):
+    """A tour can't be built for a city (e.g. its weather is unavailable)"""
+
+# Global services (will be initialized on server startup)
+weather_service: Optional[WeatherService] = None
+julep_service: Optional[JulepAgentService] = None
+# In-memory tours, bounded by entry count and approximate (JSON) size
+TOUR_CACHE_MAX_ENTRIES = int(os.getenv('FOODIE_TOUR_CACHE_MAX_ENTRIES', 100))
+TOUR_CACHE_MAX_BYTES = int(float(os.getenv('FOODIE_TOUR_CACHE_MAX_MB', 16)) * 1024 * 1024)
+tours_cache = TTLCache(
+    max_entries=TOUR_CACHE_MAX_ENTRIES,
+    max_bytes=TOUR_CACHE_MAX_BYTES,
+    ttl=TOUR_CACHE_TTL
+)
+# On-disk store shared with the Streamlit app
+persistent_cache = open_persistent_cache()
+tour_store = TourStore(persistent_cache)
+# Optional record/replay of upstream traffic (FOODIE_CASSETTE)
+cassette = open_cassette()
+# Concurrent requests for the same city and weather bucket share one generation
+tour_flights = AsyncSingleFlight()
+# Progress of the tours being generated, so callers that join one can follow it
+tours_in_progress: Dict[str, "TourProgress"] = {}
+# Serializes (re)initialization; services are only published once fully set up
+services_lock = threading.Lock()
+
+def _initialize_services_sync() -> bool:
+    """Build the services and publish them to the module globals"""
+    global weather_service, julep_service
+    
+    # Get API keys from environment
+    julep_key = os.getenv('JULEP_API_KEY')
+    weather_key = os.getenv('OPENWEATHER_API_KEY')
+    
+    if not julep_key:
+        print("WARNING: JULEP_API_KEY not found - some features will be disabled")
+        weather_key_available = weather_key is not None
+        if weather_key_available:
+            weather_service = WeatherService(weather_key, persistent_cache=persistent_cache, cassette=cassette)
+            print("SUCCESS: Weather service initialized")
+        return weather_key_available
+    
+    if not weather_key:
+        print("WARNING: OPENWEATHER_API_KEY not found - weather features will be disabled")
+        # Try to initialize just Julep service
+        julep = JulepAgentService(julep_key, persistent_cache=persistent_cache, cassette=cassette)
+        if julep.initialize_client() and julep.create_agents():
+            julep_service = julep
+            print("SUCCESS: Julep service initialized")
+            return True
+        return False
+    
+    # Initialize both services
+    weather_service = WeatherService(weather_key, persistent_cache=persistent_cache, cassette=cassette)
+    print("SUCCESS: Weather service initialized")
+    
+    julep = JulepAgentService(julep_key, persistent_cache=persistent_cache, cassette=cassette)
+    if julep.initialize_client() and julep.create_agents():
+        julep_service = julep
+        print("SUCCESS: Julep service initialized")
+    else:
+        print("WARNING: Julep service initialization failed")
+    
+    print("SUCCESS: Services initialized successfully")
+    return True
+
+async def initialize_services():
+    """Initialize weather and Julep services"""
+    def initialize():
+        with services_lock:
+            return _initialize_services_sync()
+    
+    try:
+        return await run_blocking(initialize)
+    except Exception as e:
+        print(f"WARNING: Error during service initialization: {e}")
+        print("Some features may be disabled")
+        return False
+
+@mcp.tool()
+async def get_weather_data(city: str) -> Dict[str, Any]:
+    """
+    Get current weather data for a specific city.
+    
+    Args:
+        city: Name of the city to get weather for
+        
+    Returns:
+        Dictionary containing weather information including temperature,
+        humidity, description, wind speed, and more
+    """
+    if not weather_service:
+        return {"error": "Weather service not initialized"}
+    
+    try:
+        weather_data = await weather_service.get_weather_data_async(city)
+        if weather_data:
+            # Add emoji for better display
+            weather_data['emoji'] = get_weather_emoji(weather_data['description'])
+            weather_data['formatted_time'] = format_time(datetime.now())
+            return weather_data
+        else:
+            return {"error": f"Could not fetch weather data for {city}"}
+    except Exception as e:
+        return {"error": f"Error fetching weather: {str(e)}"}
+
+@mcp.tool()
+async def get_dining_recommendation(city: str) -> Dict[str, Any]:
+    """
+    Get weather-based dining recommendation for a city.
+    
+    Args:
+        city: Name of the city
+        
+    Returns:
+        Dictionary containing dining recommendation based on current weather
+    """
+    if not weather_service:
+        return {"error": "Weather service not initialized"}
+    
+    try:
+        weather_data = await weather_service.get_weather_data_async(city)
+        if weather_data:
+            recommendation = weather_service.get_dining_recommendation(weather_data)
+            return {
+                "city": city,
+                "weather": weather_data,
+                "dining_recommendation": recommendation
+            }
+        else:
+            return {"error": f"Could not fetch weather data for {city}"}
+    except Exception as e:
+        return {"error": f"Error getting dining recommendation: {str(e)}"}
+
+# Streamed agent output is forwarded to the client in chunks of about this many characters
+STREAM_FLUSH_CHARS = 200
+
+async def stream_agent_response(agent_type: str, message: str, ctx: Any) -> str:
+    """
+    Stream an agent's response, forwarding chunks to the client as log notifications
+    
+    The blocking Julep stream is consumed on a worker thread so the event
+    loop stays free while tokens arrive.
+    
+    Args:
+        agent_type: Type of agent
+        message: Message to send to the agent
+        ctx: MCP request context, or the TourProgress of a tour being generated
+        
+    Returns:
+        The complete response text
+    """
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+    
+    def produce():
+        try:
+            for chunk in julep_service.chat_with_agent_stream(agent_type, message):
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+        finally:
+            loop.call_soon_threadsafe(chunks.put_nowait, None)
+    
+    producer = loop.run_in_executor(blocking_executor, produce)
+    
+    parts = []
+    pending = ""
+    while (chunk := await chunks.get()) is not None:
+        parts.append(chunk)
+        pending += chunk
+        if len(pending) >= STREAM_FLUSH_CHARS:
+            await ctx.info(f"[{agent_type}] {pending}")
+            pending = ""
+    if pending:
+        await ctx.info(f"[{agent_type}] {pending}")
+    
+    await producer
+    return "".join(parts)
+
+# Tour steps in order; names match the tour fields holding their output
+TOUR_STEPS = [
+    "weather_data",
+    "weather_analysis",
+    "culinary_suggestions",
+    "restaurant_recommendations",
+    "tour_narrative",
+    "final_tour_guide"
+]
+
+class TourProgress:
+    """
+    Structured per-step progress for one tour
+    
+    Updates are queued for every caller waiting on the tour, including
+    callers that joined it while it was being generated. Each caller sends
+    its own queue to its client (see forward_progress), so a disconnected
+    caller never affects the tour or the other callers.
+    """
+    
+    def __init__(self, city: str):
+        """
+        Args:
+            city: City the tour is for
+        """
+        self.city = city
+        self.listeners: List[asyncio.Queue] = []
+        self.started = time.monotonic()
+        self.steps_done: List[str] = []
+    
+    def add_listener(self, updates: asyncio.Queue):
+        """Queue this tour's updates for another caller"""
+        self.listeners.append(updates)
+    
+    def remove_listener(self, updates: asyncio.Queue):
+        """Stop queueing updates for a caller"""
+        if updates in self.listeners:
+            self.listeners.remove(updates)
+    
+    def _publish(self, message: str, progress: Optional[int] = None):
+        for updates in self.listeners:
+            updates.put_nowait((message, progress))
+    
+    def _payload(self, event: str, step: Optional[str] = None, **fields) -> str:
+        return json.dumps({
+            "event": event,
+            "city": self.city,
+            "step": step,
+            "index": TOUR_STEPS.index(step) + 1 if step else None,
+            "total": len(TOUR_STEPS),
+            "elapsed": round(time.monotonic() - self.started, 2),
+            **fields
+        }, default=str)
+    
+    async def info(self, message: str):
+        """Log a plain message (e.g. streamed agent output) like Context.info"""
+        self._publish(message)
+    
+    async def event(self, event: str, step: Optional[str] = None, **fields):
+        """Log a JSON event with the step index, total and elapsed seconds"""
+        self._publish(self._payload(event, step, **fields))
+    
+    async def step_started(self, step: str, message: str, **fields):
+        """Announce a step with a human-readable message and extra fields (e.g. prompt_chars)"""
+        await self.event("step_started", step, message=message, **fields)
+    
+    async def step_done(self, step: str, output: Any):
+        """Send a finished step's output and advance the progress bar"""
+        self.steps_done.append(step)
+        self._publish(self._payload("step_done", step, output=output), TOUR_STEPS.index(step) + 1)
+    
+    async def joined(self, steps_done: List[str]):
+        """Tell the caller it joined a tour in flight, and which steps were already done"""
+        message = f"Joined a foodie tour for {self.city} already being generated"
+        self._publish(self._payload("tour_joined", message=message, steps_done=steps_done), len(steps_done))
+    
+    async def finished(self, event: str, message: str):
+        """Mark the tour complete (generated, cached or joined)"""
+        self._publish(self._payload(event, message=message), len(TOUR_STEPS))
+
+async def forward_progress(updates: asyncio.Queue, ctx: Context, report_progress: bool = True):
+    """
+    Send one caller's queued tour updates to its client until None is queued
+    
+    Runs in the caller's request so ctx reaches the right client.
+    
+    Args:
+        updates: Queue of (message, progress) tuples
+        ctx: MCP request context
+        report_progress: False to only log events, e.g. when the caller
+            reports its own progress (batches)
+    """
+    while (update := await updates.get()) is not None:
+        message, progress = update
+        try:
+            await ctx.info(message)
+            if progress is not None and report_progress:
+                await ctx.report_progress(progress, len(TOUR_STEPS))
+        except Exception as e:
+            print(f"WARNING: Could not send tour progress: {e}")
+            return
+
+@mcp.tool()
+async def chat_with_agent(agent_type: str, message: str, ctx: Context) -> Dict[str, Any]:
+    """
+    Chat with a specific Julep AI agent.
+    
+    The response is streamed to the client as log notifications while
+    it is generated.
+    
+    Args:
+        agent_type: Type of agent ('weather', 'culinary', 'restaurant', 'tour', 'coordinator')
+        message: Message to send to the agent
+        
+    Returns:
+        Dictionary containing the agent's response
+    """
+    if not julep_service:
+        return {"error": "Julep service not initialized"}
+    
+    valid_agents = ['weather', 'culinary', 'restaurant', 'tour', 'coordinator']
+    if agent_type not in valid_agents:
+        return {
+            "error": f"Invalid agent type. Valid types are: {', '.join(valid_agents)}"
+        }
+    
+    try:
+        response = await stream_agent_response(agent_type, message, ctx)
+        return {
+            "agent_type": agent_type,
+            "message": message,
+            "response": response
+        }
+    except CircuitOpenError as e:
+        return {"error": str(e), "retry_after": round(e.retry_after, 1)}
+    except Exception as e:
+        return {"error": f"Error chatting with agent: {str(e)}"}
+
+@mcp.tool()
+async def create_complete_foodie_tour(city: str, ctx: Context) -> Dict[str, Any]:
+    """
+    Create a complete foodie tour for a city using all AI agents.
+    This is the main function that orchestrates weather analysis,
+    culinary expertise, restaurant recommendations, and tour narrative.
+    
+    Progress is reported per step, and each step's output is sent as a
+    JSON log event ("step_done") as soon as it is ready.
+    
+    Args:
+        city: Name of the city to create tour for
+        
+    Returns:
+        Dictionary containing complete foodie tour information
+    """
+    if not weather_service or not julep_service:
+        return {"error": "Services not initialized"}
+    
+    try:
+        return await _build_tour(city, ctx)
+    except TourUnavailableError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        await ctx.error(f"Error creating foodie tour: {str(e)}")
+        return {"error": f"Error creating foodie tour: {str(e)}"}
+
+# Default number of cities a batch generates at once
+BATCH_CONCURRENCY = 3
+
+@mcp.tool()
+async def create_foodie_tours_batch(cities: List[str], ctx: Context,
+                                    max_concurrency: int = BATCH_CONCURRENCY) -> Dict[str, Any]:
+    """
+    Create complete foodie tours for several cities in one call.
+    Cities are generated in parallel; a failure in one city doesn't
+    affect the others.
+    
+    Args:
+        cities: Names of the cities (duplicates are generated once)
+        max_concurrency: Maximum cities generated at once from this batch
+        
+    Returns:
+        Dictionary with tours and errors keyed by city, plus counts
+    """
+    if not weather_service or not julep_service:
+        return {"error": "Services not initialized"}
+    
+    # Deduplicate by normalized name, keeping the first spelling given
+    unique_cities = []
+    seen = set()
+    for city in cities:
+        normalized = " ".join(city.split()).casefold()
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            unique_cities.append(city.strip())
+    if not unique_cities:
+        return {"error": "No cities given"}
+    
+    total = len(unique_cities)
+    await ctx.info(f"Creating foodie tours for {total} cities...")
+    
+    # Warm the weather cache with grouped requests before the per-city pipelines
+    await run_blocking(weather_service.get_weather_data_many, unique_cities)
+    
+    batch_slots = asyncio.Semaphore(max(1, min(max_concurrency, total)))
+    tours: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    
+    async def run_city(city: str):
+        async with batch_slots:
+            await ctx.info(f"[{city}] Starting tour...")
+            try:
+                tours[city] = await _build_tour(city, ctx, report_progress=False)
+                await ctx.info(f"[{city}] SUCCESS: Tour ready")
+            except Exception as e:
+                errors[city] = str(e)
+                await ctx.error(f"[{city}] Error creating foodie tour: {str(e)}")
+            await ctx.report_progress(len(tours) + len(errors), total)
+    
+    await asyncio.gather(*(run_city(city) for city in unique_cities))
+    
+    return {
+        "tours": {city: tours[city] for city in unique_cities if city in tours},
+        "errors": {city: errors[city] for city in unique_cities if city in errors},
+        "requested": total,
+        "completed": len(tours),
+        "failed": len(errors)
+    }
+
+async def _build_tour(city: str, ctx: Context, report_progress: bool = True) -> Dict[str, Any]:
+    """
+    Get a city's tour from the caches or generate it
+    
+    Args:
+        city: Name of the city
+        ctx: MCP request context
+        report_progress: Whether to report step progress through ctx
+        
+    Raises:
+        TourUnavailableError: If weather data for the city can't be fetched
+    """
+    progress = TourProgress(city)
+    updates: asyncio.Queue = asyncio.Queue()
+    progress.add_listener(updates)
+    forwarder = asyncio.create_task(forward_progress(updates, ctx, report_progress))
+    try:
+        return await _find_or_generate_tour(city, progress, updates)
+    except asyncio.CancelledError:
+        # The client is gone, so there is nobody left to send updates to
+        forwarder.cancel()
+        raise
+    finally:
+        updates.put_nowait(None)
+        await asyncio.wait([forwarder])
+
+async def _find_or_generate_tour(city: str, progress: TourProgress,
+                                 updates: asyncio.Queue) -> Dict[str, Any]:
+    """Fetch the weather, then load the tour from the caches, join it, or generate it"""
+    await progress.info(f"Creating complete foodie tour for {city}...")
+    
+    # Step 1: Get weather data
+    await progress.step_started("weather_data", "Fetching weather data...")
+    with metrics.timer("mcp.step.weather_data"):
+        weather_data = await weather_service.get_weather_data_async(city)
+        if not weather_data:
+            raise TourUnavailableError(f"Could not fetch weather data for {city}")
+    await progress.step_done("weather_data", weather_data)
+    
+    # Reuse a tour generated under the same weather bucket by this server or the Streamlit app
+    tour_key = tour_store.key(city, weather_data)
+    cached_tour = tours_cache.get(tour_key) or await run_blocking(tour_store.get, city, weather_data)
+    if cached_tour:
+        tours_cache.set(tour_key, cached_tour)
+        await progress.finished("tour_cached", f"SUCCESS: Loaded cached foodie tour for {city}")
+        return cached_tour
+    
+    # A caller asking for a tour already being generated gets its remaining steps
+    tour_progress = tours_in_progress.setdefault(tour_key, progress)
+    joined = tour_progress is not progress
+    if joined:
+        await progress.joined(list(tour_progress.steps_done))
+        tour_progress.add_listener(updates)
+    try:
+        tour, shared = await tour_flights.do(tour_key, _run_tour, city, weather_data, tour_key, tour_progress)
+    finally:
+        if joined:
+            tour_progress.remove_listener(updates)
+    if shared and not joined:
+        # The tour finished as this caller arrived, so its own progress was never used
+        if tours_in_progress.get(tour_key) is progress:
+            del tours_in_progress[tour_key]
+        await progress.finished("tour_joined", f"SUCCESS: Joined a foodie tour for {city} already being generated")
+    return tour
+
+async def _run_tour(city: str, weather_data: Dict[str, Any], tour_key: str,
+                    progress: TourProgress) -> Dict[str, Any]:
+    """Generate a tour once a tour slot is free (run once per in-flight key)"""
+    try:
+        if tour_slots.locked():
+            await progress.info(f"Waiting for a free tour slot ({MAX_CONCURRENT_TOURS} tours already running)...")
+        async with tour_slots:
+            with metrics.timer("mcp.tour"):
+                return await _generate_tour(city, weather_data, tour_key, progress)
+    finally:
+        if tours_in_progress.get(tour_key) is progress:
+            del tours_in_progress[tour_key]
+
+async def _generate_tour(city: str, weather_data: Dict[str, Any], tour_key: str,
+                         progress: TourProgress) -> Dict[str, Any]:
+    """Run the agent steps for a tour, reporting each output as it is ready, and cache the result"""
+    # Streamed chunks are queued for every caller waiting on this tour
+    ctx = progress
+    
+    # Step 2: Weather analysis
+    weather_message = f"""
+    Analyze the current weather in {city}:
+    - Temperature: {weather_data['temperature']}°C (feels like {weather_data['feels_like']}°C)
+    - Conditions: {weather_data['description']}
+    - Humidity: {weather_data['humidity']}%
+    - Wind Speed: {weather_data['wind_speed']} m/s
+    
+    Provide dining recommendations that match these weather conditions.
+    """
+    await progress.step_started("weather_analysis", "Analyzing weather with AI agent...",
+                                prompt_chars=len(weather_message))
+    with metrics.timer("mcp.step.weather_analysis"):
+        weather_analysis = await stream_agent_response('weather', weather_message, ctx)
+    await progress.step_done("weather_analysis", weather_analysis)
+    
+    # Later steps get the facts extracted from earlier answers, not the full text,
+    # so prompts stay the same size however long the answers are
+    
+    # Step 3: Culinary expertise
+    culinary_message = f"""
+    Based on the weather analysis for {city}, suggest authentic local dishes
+    that would be perfect for these conditions:
+    {compact_context("culinary_suggestions", weather_data, weather_analysis=weather_analysis)}
+    
+    Focus on traditional cuisine and seasonal specialties.
+    """
+    await progress.step_started("culinary_suggestions", "Getting culinary expertise...",
+                                prompt_chars=len(culinary_message))
+    with metrics.timer("mcp.step.culinary_suggestions"):
+        culinary_suggestions = await stream_agent_response('culinary', culinary_message, ctx)
+    await progress.step_done("culinary_suggestions", culinary_suggestions)
+    
+    # Step 4: Restaurant recommendations
+    restaurant_message = f"""
+    Find restaurants in {city} that would be ideal for the current weather
+    and these culinary suggestions:
+    
+    {compact_context("restaurant_recommendations", weather_data, dishes=culinary_suggestions)}
+    
+    Recommend specific restaurants with indoor/outdoor options as appropriate.
+    """
+    await progress.step_started("restaurant_recommendations", "Finding perfect restaurants...",
+                                prompt_chars=len(restaurant_message))
+    with metrics.timer("mcp.step.restaurant_recommendations"):
+        restaurant_recommendations = await stream_agent_response('restaurant', restaurant_message, ctx)
+    await progress.step_done("restaurant_recommendations", restaurant_recommendations)
+    
+    # Step 5: Create tour narrative
+    tour_message = f"""
+    Create an engaging foodie tour narrative for {city} incorporating:
+    
+    {compact_context("tour_narrative", weather_data, dishes=culinary_suggestions, restaurants=restaurant_recommendations)}
+    
+    Make it personal and story-driven, like a local guide showing friends around.
+    """
+    await progress.step_started("tour_narrative", "Crafting tour narrative...",
+                                prompt_chars=len(tour_message))
+    with metrics.timer("mcp.step.tour_narrative"):
+        tour_narrative = await stream_agent_response('tour', tour_message, ctx)
+    await progress.step_done("tour_narrative", tour_narrative)
+    
+    # Step 6: Final coordination
+    coordination_context = compact_context(
+        "final_tour_guide", weather_data,
+        weather_analysis=weather_analysis,
+        dishes=culinary_suggestions,
+        restaurants=restaurant_recommendations,
+        narrative=tour_narrative
+    )
+    coordination_message = f"""
+    Synthesize all elements into a practical, comprehensive foodie tour guide:
+    
+    City: {city}
+    {coordination_context}
+    
+    Create a final, well-organized tour guide that visitors can actually use.
+    """
+    await progress.step_started("final_tour_guide", "Coordinating final tour...",
+                                prompt_chars=len(coordination_message))
+    with metrics.timer("mcp.step.final_tour_guide"):
+        final_tour = await stream_agent_response('coordinator', coordination_message, ctx)
+    await progress.step_done("final_tour_guide", final_tour)
+    
+    # Compile complete tour
+    complete_tour = {
+        "city": city,
+        "created_at": datetime.now().isoformat(),
+        "weather_data": weather_data,
+        "weather_analysis": weather_analysis,
+        "culinary_suggestions": culinary_suggestions,
+        "restaurant_recommendations": restaurant_recommendations,
+        "tour_narrative": tour_narrative,
+        "final_tour_guide": final_tour
+    }
+    
+    # Cache the tour
+    tours_cache.set(tour_key, complete_tour)
+    await run_blocking(tour_store.put, city, weather_data, complete_tour)
+    
+    await progress.finished("tour_created", f"SUCCESS: Complete foodie tour created for {city}!")
+    return complete_tour
+
+@mcp.tool()
+def list_available_agents() -> List[str]:
+    """
+    List all available Julep AI agents and their specialties.
+    
+    Returns:
+        List of agent types with descriptions
+    """
+    agents = [
+        "weather - Expert at analyzing weather conditions and dining recommendations",
+        "culinary - Specialist in local cuisines and traditional dishes",
+        "restaurant - Expert at finding restaurants based on weather and cuisine",
+        "tour - Master storyteller for engaging food tour narratives",
+        "coordinator - Expert coordinator for comprehensive tour synthesis"
+    ]
+    return agents
+
+@mcp.tool()
+async def get_cached_tours() -> List[str]:
+    """
+    Get list of cached tours.
+    
+    Returns:
+        List of cached tour keys
+    """
+    keys = tours_cache.keys()
+    if persistent_cache:
+        memory_keys = set(keys)
+        stored_keys = await run_blocking(persistent_cache.keys, TOURS_NAMESPACE)
+        keys += [key for key in stored_keys if key not in memory_keys]
+    return keys
+
+@mcp.tool()
+async def get_cached_tour(tour_key: str) -> Dict[str, Any]:
+    """
+    Retrieve a cached tour by its key.
+    
+    Args:
+        tour_key: Key of the cached tour
+        
+    Returns:
+        Cached tour data or error message
+    """
+    cached_tour = tours_cache.get(tour_key)
+    if cached_tour:
+        return cached_tour
+    
+    stored_tour = await run_blocking(persistent_cache.get, TOURS_NAMESPACE, tour_key) if persistent_cache else None
+    if stored_tour:
+        return stored_tour
+    return {"error": f"Tour '{tour_key}' not found in cache"}
+
+# Resources - provide access to static information
+@mcp.resource("resource://app-status")
+async def get_app_status(ctx: Context) -> Dict[str, Any]:
+    """Get the current status of the Foodie Tours application."""
+    await ctx.info("Checking application status...")
+    
+    status = {
+        "app_name": "Foodie Tours",
+        "server_name": mcp.name,
+        "weather_service_active": weather_service is not None,
+        "julep_service_active": julep_service is not None,
+        "cached_tours_count": len(tours_cache),
+        "tour_cache": tours_cache.get_stats(),
+        "persistent_cache": await run_blocking(persistent_cache.get_stats) if persistent_cache else None,
+        "available_agents": len(julep_service.agents) if julep_service else 0,
+        "response_cache": julep_service.get_response_cache_stats() if julep_service else None,
+        "agent_resilience": julep_service.get_resilience_stats() if julep_service else None,
+        "tour_requests": tour_flights.get_stats(),
+        "rate_limits": {
+            "openweather": weather_service.get_rate_limit_stats() if weather_service else None,
+            "julep": julep_service.get_rate_limit_stats() if julep_service else None
+        },
+        "concurrency": {
+            "workers": MCP_WORKERS,
+            "max_concurrent_tours": MAX_CONCURRENT_TOURS
+        },
+        "cassette": cassette.get_stats() if cassette else None,
+        "prompt_sizes": prompt_sizes.get_stats(),
+        "last_updated": datetime.now().isoformat()
+    }
+    
+    return status
+
+@mcp.resource("resource://metrics")
+def get_metrics() -> Dict[str, Any]:
+    """Get per-operation latency percentiles (p50/p95/p99), counts and error rates."""
+    return {
+        "operations": metrics.snapshot(),
+        "generated_at": datetime.now().isoformat()
+    }
+
+@mcp.resource("resource://metrics/prometheus", mime_type="text/plain")
+def get_metrics_prometheus() -> str:
+    """Get the same latency metrics in the Prometheus text exposition format."""
+    return metrics.to_prometheus()
+
+@mcp.resource("resource://tour-cache")
+def get_tour_cache_info() -> Dict[str, Any]:
+    """Get information about cached tours."""
+    tours_cache.purge_expired()
+    return {
+        "total_tours": len(tours_cache),
+        "tour_keys": tours_cache.keys(),
+        "stats": tours_cache.get_stats(),
+        "cache_created": datetime.now().isoformat()
+    }
+
+@mcp.resource("resource://service-config")
+def get_service_configuration() -> Dict[str, Any]:
+    """Get current service configuration."""
+    return {
+        "weather_api_configured": os.getenv('OPENWEATHER_API_KEY') is not None,
+        "julep_api_configured": os.getenv('JULEP_API_KEY') is not None,
+        "base_weather_url": "http://api.openweathermap.org/data/2.5" if weather_service else None,
+        "supported_agents": [
+            "weather", "culinary", "restaurant", "tour", "coordinator"
+        ]
+    }
+
+# Server lifecycle management will be handled in main
+if __name__ == "__main__":
+    # Initialize services synchronously before starting server
+    print("Starting Foodie Tours MCP Server...")
+    
+    # Run initialization in an event loop
+    import asyncio
+    try:
+        asyncio.run(initialize_services())
+        print("SUCCESS: Foodie Tours MCP Server started successfully!")
+        # Run the server
+        # Default to stdio for CLI usage, but can be overridden
+        mcp.run()
+    except Exception as e:
+        print(f"ERROR: Failed to start server: {e}")
+        exit(1)
@@ -0,0 +1,158 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+# Histogram bucket upper bounds in seconds, from cache hits to slow LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Recent samples kept per operation for percentile estimates
+RESERVOIR_SIZE = 1024
+
+
+class _Operation:
+    """Counters, histogram and recent samples for one operation"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.samples: Deque[float] = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, seconds: float, error: bool):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if error:
+            self.errors += 1
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        if index < len(self.buckets):
+            self.buckets[index] += 1
+        self.samples.append(seconds)
+
+
+def _percentile(sorted_samples: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted samples"""
+    if not sorted_samples:
+        return None
+    rank = max(1, math.ceil(q * len(sorted_samples)))
+    return round(sorted_samples[rank - 1], 4)
+
+
+class Metrics:
+    """Thread-safe per-operation latency histograms, counts and error rates"""
+
+    def __init__(self):
+        self._operations: Dict[str, _Operation] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, operation: str, seconds: float, error: bool = False):
+        """
+        Record one timed call
+
+        Args:
+            operation: Operation name, e.g. 'weather.fetch' or 'julep.chat.culinary'
+            seconds: Duration of the call
+            error: Whether the call failed
+        """
+        with self._lock:
+            op = self._operations.get(operation)
+            if op is None:
+                op = self._operations[operation] = _Operation()
+            op.observe(seconds, error)
+
+    @contextmanager
+    def timer(self, operation: str) -> Iterator[None]:
+        """
+        Time a block, counting it as an error if it raises
+
+        A generator closed early (GeneratorExit) or a cancelled task is
+        not recorded, since the call neither finished nor failed.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.observe(operation, time.perf_counter() - started, error=True)
+            raise
+        self.observe(operation, time.perf_counter() - started)
+
+    def reset(self):
+        """Drop all recorded operations"""
+        with self._lock:
+            self._operations.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize every operation
+
+        Returns:
+            Dictionary of operation -> count, errors, error_rate, mean,
+            max and p50/p95/p99 latency in seconds
+        """
+        with self._lock:
+            operations = {
+                name: (op.count, op.errors, op.total, op.max, sorted(op.samples))
+                for name, op in self._operations.items()
+            }
+
+        summary = {}
+        for name, (count, errors, total, slowest, samples) in sorted(operations.items()):
+            summary[name] = {
+                'count': count,
+                'errors': errors,
+                'error_rate': round(errors / count, 4) if count else 0.0,
+                'mean': round(total / count, 4) if count else None,
+                'max': round(slowest, 4),
+                'p50': _percentile(samples, 0.50),
+                'p95': _percentile(samples, 0.95),
+                'p99': _percentile(samples, 0.99)
+            }
+        return summary
+
+    def to_prometheus(self, prefix: str = "foodie") -> str:
+        """
+        Render all operations in the Prometheus text exposition format
+
+        Args:
+            prefix: Metric name prefix
+
+        Returns:
+            A histogram of durations and an error counter, labelled by operation
+        """
+        with self._lock:
+            operations = {
+                name: (op.count, op.errors, op.total, list(op.buckets))
+                for name, op in self._operations.items()
+            }
+
+        duration = f"{prefix}_operation_duration_seconds"
+        errors = f"{prefix}_operation_errors_total"
+        lines = [
+            f"# HELP {duration} Duration of upstream calls and pipeline steps.",
+            f"# TYPE {duration} histogram"
+        ]
+        for name, (count, _, total, buckets) in sorted(operations.items()):
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                cumulative += bucket_count
+                lines.append(f'{duration}_bucket{{operation="{label}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{duration}_bucket{{operation="{label}",le="+Inf"}} {count}')
+            lines.append(f'{duration}_sum{{operation="{label}"}} {total:.6f}')
+            lines.append(f'{duration}_count{{operation="{label}"}} {count}')
+
+        lines.append(f"# HELP {errors} Failed upstream calls and pipeline steps.")
+        lines.append(f"# TYPE {errors} counter")
+        for name, (_, error_count, _, _) in sorted(operations.items()):
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'{errors}{{operation="{label}"}} {error_count}')
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry shared by the services, the app and the MCP server
+metrics = Metrics()
@@ -0,0 +1,210 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Shared by the Streamlit app and the MCP server unless overridden
+DEFAULT_CACHE_PATH = ".foodie_cache.db"
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+class PersistentCache:
+    """SQLite (WAL mode) key/value cache with TTLs, shared across processes"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 default_ttl: float = 86400.0):
+        """
+        Args:
+            path: SQLite database file
+            max_bytes: Total size budget for stored values before LRU eviction
+            default_ttl: Default time-to-live in seconds
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # sqlite3 connections can't be shared between threads
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._rejected = 0
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            # WAL lets readers in other processes proceed while one process writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def get_entry(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Get a live entry and refresh its access time
+
+        Args:
+            namespace: Entry namespace (e.g. 'weather', 'tours')
+            key: Entry key
+
+        Returns:
+            Tuple of (value, expires_at epoch seconds) or None
+        """
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                    return None
+                conn.execute(
+                    "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key)
+                )
+            return json.loads(row[0]), row[1]
+        except sqlite3.Error as e:
+            print(f"Error reading persistent cache entry {namespace}/{key}: {e}")
+            return None
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """Get a live value or default"""
+        entry = self.get_entry(namespace, key)
+        return default if entry is None else entry[0]
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """
+        Store a JSON-serializable value and enforce the size budget
+
+        Args:
+            namespace: Entry namespace
+            key: Entry key
+            value: JSON-serializable value
+            ttl: Time-to-live in seconds (defaults to default_ttl)
+
+        Returns:
+            True if the value was stored (False if it alone exceeds max_bytes)
+        """
+        now = time.time()
+        payload = json.dumps(value, default=str)
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+
+        if len(payload) > self.max_bytes:
+            # Larger than the whole budget; storing it would evict every other entry
+            with self._lock:
+                self._rejected += 1
+            self.delete(namespace, key)
+            return False
+
+        try:
+            conn = self._connect()
+            with conn:
+                # Take the write lock up front so eviction sees a consistent total
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, key, payload, len(payload), expires_at, now)
+                )
+                self._evict(conn, now)
+            return True
+        except sqlite3.Error as e:
+            print(f"Error writing persistent cache entry {namespace}/{key}: {e}")
+            return False
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired entries, then least recently used ones over budget"""
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = conn.execute("SELECT namespace, key, size FROM entries ORDER BY accessed_at").fetchall()
+        for namespace, key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            total -= size
+
+    def delete(self, namespace: str, key: str) -> bool:
+        """Remove an entry, returning True if it existed"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    "DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+                )
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error deleting persistent cache entry {namespace}/{key}: {e}")
+            return False
+
+    def keys(self, namespace: str) -> List[str]:
+        """Get the keys of all live entries in a namespace"""
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT key FROM entries WHERE namespace = ? AND expires_at > ? ORDER BY accessed_at",
+                    (namespace, time.time())
+                ).fetchall()
+            return [row[0] for row in rows]
+        except sqlite3.Error as e:
+            print(f"Error listing persistent cache namespace {namespace}: {e}")
+            return []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get entry counts and stored bytes per namespace, and oversized values rejected"""
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY namespace"
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error reading persistent cache stats: {e}")
+            rows = []
+
+        return {
+            'path': self.path,
+            'max_bytes': self.max_bytes,
+            'total_bytes': sum(row[2] for row in rows),
+            'rejected': self._rejected,
+            'namespaces': {row[0]: {'entries': row[1], 'bytes': row[2]} for row in rows}
+        }
+
+
+def open_persistent_cache() -> Optional[PersistentCache]:
+    """
+    Open the shared cache configured by FOODIE_CACHE_PATH / FOODIE_CACHE_MAX_MB
+
+    Returns:
+        PersistentCache instance, or None if disabled or unavailable
+    """
+    path = os.getenv('FOODIE_CACHE_PATH', DEFAULT_CACHE_PATH)
+    if not path:
+        return None
+
+    max_mb = float(os.getenv('FOODIE_CACHE_MAX_MB', DEFAULT_MAX_BYTES / (1024 * 1024)))
+    try:
+        return PersistentCache(path, max_bytes=int(max_mb * 1024 * 1024))
+    except sqlite3.Error as e:
+        print(f"WARNING: Persistent cache disabled: {e}")
+        return None
@@ -0,0 +1,64 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class Step:
+    """A pipeline step and the named inputs it needs"""
+
+    def __init__(self, name: str, func: Callable[..., Any], inputs: Iterable[str] = ()):
+        """
+        Args:
+            name: Name the step's output is stored under
+            func: Callable receiving each input as a keyword argument
+            inputs: Names of context values or other steps' outputs
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+
+
+def run_step_graph(
+    steps: List[Step],
+    context: Dict[str, Any],
+    max_workers: int = 4,
+    on_step_done: Optional[Callable[[str, Any], None]] = None
+) -> Dict[str, Any]:
+    """
+    Run steps concurrently as soon as their declared inputs are available
+
+    Args:
+        steps: Steps to run; each name must be unique
+        context: Initial values steps can declare as inputs
+        max_workers: Maximum steps running at once
+        on_step_done: Called as (step name, output) on the calling thread
+            as each step finishes, e.g. to update progress
+
+    Returns:
+        The context extended with every step's output
+
+    Raises:
+        ValueError: If some step's inputs can never be satisfied
+    """
+    results = dict(context)
+    pending = {step.name: step for step in steps}
+    running: Dict[Future, Step] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for name, step in list(pending.items()):
+                if all(input_name in results for input_name in step.inputs):
+                    kwargs = {input_name: results[input_name] for input_name in step.inputs}
+                    running[executor.submit(step.func, **kwargs)] = step
+                    del pending[name]
+
+            if not running:
+                raise ValueError(f"Unsatisfiable step inputs: {', '.join(sorted(pending))}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                results[step.name] = future.result()
+                if on_step_done:
+                    on_step_done(step.name, results[step.name])
+
+    return results
@@ -0,0 +1,211 @@
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+# Upper bound on the prior-step context embedded in one prompt, overridable with FOODIE_PROMPT_MAX_CHARS
+MAX_STEP_INPUT_CHARS = int(os.getenv('FOODIE_PROMPT_MAX_CHARS', 1200))
+# Names or timings carried forward per list, and the longest kept
+MAX_ITEMS = 6
+MAX_ITEM_CHARS = 80
+# Free-text excerpt used for advice, or when no names can be extracted
+EXCERPT_CHARS = 300
+
+# "1. Ramen", "- Ramen", "• Ramen" and "### Ramen" lines
+_LIST_ITEM = re.compile(r'^\s*(?:#{1,6}\s*)?(?:\d+[.)]|[-*•])?\s*(.+)$')
+_BOLD = re.compile(r'\*\*(.+?)\*\*|__(.+?)__')
+# Separators between a name and its description
+_NAME_END = re.compile(r'\s+[-–—]\s+|:\s|\s\(|[.!]\s')
+_TIMING = re.compile(
+    r'\b(?:\d{1,2}(?::\d{2})?\s?[ap]\.?m\.?|\d{1,2}:\d{2}|morning|noon|afternoon|evening|night|'
+    r'breakfast|brunch|lunch|dinner)\b',
+    re.IGNORECASE
+)
+
+
+def _clean(text: str) -> str:
+    """Strip markdown emphasis, numbering and trailing punctuation"""
+    text = re.sub(r'[*_`#]+', '', text)
+    text = re.sub(r'^\s*(?:\d+[.)]|[-•])\s*', '', text)
+    return text.strip(' \t:-–—,.;')
+
+
+def _dedupe(items: List[str], limit: int) -> List[str]:
+    seen = set()
+    unique = []
+    for item in items:
+        key = item.casefold()
+        if item and key not in seen and len(item) <= MAX_ITEM_CHARS and not item.endswith('?'):
+            seen.add(key)
+            unique.append(item)
+        if len(unique) >= limit:
+            break
+    return unique
+
+
+def extract_names(text: str, limit: int = MAX_ITEMS) -> List[str]:
+    """
+    Pull dish or restaurant names out of an agent's markdown answer
+
+    Each list item or heading contributes one name: its first bold span,
+    or without one, the part before its description. Nested items are
+    only used when no top-level line yields a name.
+
+    Args:
+        text: Agent response
+        limit: Maximum names returned
+
+    Returns:
+        Names in order of appearance (may be empty for unstructured text)
+    """
+    names, nested = [], []
+    for line in (text or "").splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        is_item = bool(re.match(r'(?:#{1,6}\s|\d+[.)]\s|[-*•]\s)', stripped))
+        spans = [match.group(1) or match.group(2) for match in _BOLD.finditer(stripped)]
+        # "**Why it's perfect:**" is a label, not a name
+        bold = [span for span in spans if not span.rstrip().endswith(':')]
+        if bold and (is_item or stripped.startswith(('**', '__'))):
+            name = bold[0]
+        elif is_item and not spans and not stripped.endswith(':'):
+            name = _NAME_END.split(_LIST_ITEM.match(stripped).group(1), maxsplit=1)[0]
+        else:
+            continue
+        (nested if line[:1].isspace() else names).append(_clean(name))
+    return _dedupe(names, limit) or _dedupe(nested, limit)
+
+
+def extract_timings(text: str, limit: int = MAX_ITEMS) -> List[str]:
+    """
+    Pull itinerary lines that mention a time of day or a meal
+
+    Returns:
+        Lines, each cut to MAX_ITEM_CHARS
+    """
+    timings = []
+    for line in (text or "").splitlines():
+        if _TIMING.search(line):
+            timings.append(cap(_clean(line), MAX_ITEM_CHARS))
+    return _dedupe(timings, limit)
+
+
+def cap(text: str, max_chars: int) -> str:
+    """Cut text to max_chars at a word boundary, marking the cut with an ellipsis"""
+    text = " ".join((text or "").split())
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1].rsplit(" ", 1)[0]
+    return cut.rstrip(' ,;:') + "…"
+
+
+def weather_summary(weather_data: Dict[str, Any]) -> str:
+    """One line with the weather fields the agents use"""
+    parts = [f"{weather_data['temperature']}°C"]
+    if 'feels_like' in weather_data:
+        parts[0] += f" (feels like {weather_data['feels_like']}°C)"
+    parts.append(str(weather_data.get('description', '')))
+    if 'humidity' in weather_data:
+        parts.append(f"humidity {weather_data['humidity']}%")
+    if 'wind_speed' in weather_data:
+        parts.append(f"wind {weather_data['wind_speed']} m/s")
+    if 'rain_probability' in weather_data:
+        parts.append(f"{weather_data['rain_probability']}% rain chance")
+    return ", ".join(part for part in parts if part)
+
+
+class PromptSizes:
+    """Thread-safe per-step record of prior-step context available vs. actually sent"""
+
+    def __init__(self):
+        self._steps: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, step: str, source_chars: int, sent_chars: int):
+        """
+        Args:
+            step: Pipeline step the prompt is for
+            source_chars: Size of the prior outputs the step could have embedded
+            sent_chars: Size of the compacted context actually embedded
+        """
+        with self._lock:
+            stats = self._steps.setdefault(step, {'prompts': 0, 'source_chars': 0, 'sent_chars': 0, 'max_sent_chars': 0})
+            stats['prompts'] += 1
+            stats['source_chars'] += source_chars
+            stats['sent_chars'] += sent_chars
+            stats['max_sent_chars'] = max(stats['max_sent_chars'], sent_chars)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-step prompt counts, average source and sent sizes and the share saved
+
+        Returns:
+            Dictionary of step -> prompts, avg_source_chars, avg_sent_chars,
+            max_sent_chars and saved (fraction of source chars not sent)
+        """
+        with self._lock:
+            steps = {step: dict(stats) for step, stats in self._steps.items()}
+        return {
+            step: {
+                'prompts': stats['prompts'],
+                'avg_source_chars': round(stats['source_chars'] / stats['prompts']),
+                'avg_sent_chars': round(stats['sent_chars'] / stats['prompts']),
+                'max_sent_chars': stats['max_sent_chars'],
+                'saved': round(1 - stats['sent_chars'] / stats['source_chars'], 3) if stats['source_chars'] else 0.0
+            }
+            for step, stats in sorted(steps.items())
+        }
+
+
+# Process-wide prompt size stats shared by the app and the MCP server
+prompt_sizes = PromptSizes()
+
+
+def compact_context(step: str, weather_data: Optional[Dict[str, Any]] = None,
+                    weather_analysis: Optional[str] = None, dishes: Optional[str] = None,
+                    restaurants: Optional[str] = None, narrative: Optional[str] = None,
+                    max_chars: int = MAX_STEP_INPUT_CHARS) -> str:
+    """
+    Reduce earlier step outputs to the facts a later step needs
+
+    Dish and restaurant answers become name lists, the narrative becomes
+    its timed stops and the weather analysis a short excerpt. An answer
+    with no recognizable structure is carried as an excerpt instead, so
+    nothing is dropped outright. The size before and after is recorded
+    in prompt_sizes.
+
+    Args:
+        step: Step the context is for (used for stats)
+        weather_data: Processed weather data
+        weather_analysis: Weather agent answer
+        dishes: Culinary agent answer
+        restaurants: Restaurant agent answer
+        narrative: Tour agent answer
+        max_chars: Cap on the returned context
+
+    Returns:
+        Newline-separated "- Label: facts" lines
+    """
+    lines = []
+    if weather_data:
+        lines.append(f"- Weather: {weather_summary(weather_data)}")
+    if weather_analysis:
+        lines.append(f"- Weather advice: {cap(weather_analysis, EXCERPT_CHARS)}")
+    for label, text in (("Dishes", dishes), ("Restaurants", restaurants)):
+        if text:
+            names = extract_names(text)
+            lines.append(f"- {label}: {'; '.join(names) if names else cap(text, EXCERPT_CHARS)}")
+    if narrative:
+        timings = extract_timings(narrative)
+        lines.append(f"- Itinerary: {'; '.join(timings) if timings else cap(narrative, EXCERPT_CHARS)}")
+
+    context = "\n".join(lines)
+    if len(context) > max_chars:
+        context = context[:max_chars - 1].rstrip() + "…"
+
+    source_chars = len(str(weather_data or "")) + sum(
+        len(text or "") for text in (weather_analysis, dishes, restaurants, narrative)
+    )
+    prompt_sizes.record(step, source_chars, len(context))
+    return context
@@ -0,0 +1,176 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that queues callers instead of rejecting them
+
+    Each call reserves its tokens immediately, letting the balance go
+    negative, and then sleeps until the reservation is covered. Callers
+    are therefore served in arrival order and throughput settles at the
+    refill rate.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, name: str = ""):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (defaults to one second of tokens, at least 1)
+            name: Label used in stats
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.name = name
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {
+            'acquired': 0,
+            'delayed': 0,
+            'waiting': 0,
+            'total_wait': 0.0,
+            'max_wait': 0.0
+        }
+
+    @classmethod
+    def per_minute(cls, calls: float, burst: Optional[float] = None, name: str = "") -> "TokenBucket":
+        """Build a bucket allowing calls per minute, with an optional burst size"""
+        return cls(calls / 60.0, capacity=burst, name=name)
+
+    def _refill(self, now: float):
+        """Add tokens for the time since the last update; caller holds the lock"""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens now and get how long to wait before using them
+
+        Returns:
+            Delay in seconds (0.0 if tokens were available)
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            delay = max(0.0, -self._tokens / self.rate)
+
+            self._stats['acquired'] += 1
+            if delay > 0:
+                self._stats['delayed'] += 1
+                self._stats['total_wait'] += delay
+                self._stats['max_wait'] = max(self._stats['max_wait'], delay)
+            return delay
+
+    def penalize(self, seconds: float):
+        """
+        Hold back every caller for a while, e.g. after a 429 with Retry-After
+
+        Args:
+            seconds: Time until the next token becomes available
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 1.0 - seconds * self.rate)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until tokens are available
+
+        Returns:
+            Seconds spent waiting
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            self._track_waiting(1)
+            try:
+                time.sleep(delay)
+            finally:
+                self._track_waiting(-1)
+        return delay
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """
+        Wait without blocking the event loop until tokens are available
+
+        Returns:
+            Seconds spent waiting
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            self._track_waiting(1)
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._track_waiting(-1)
+        return delay
+
+    def _track_waiting(self, change: int):
+        with self._lock:
+            self._stats['waiting'] += change
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get limiter statistics
+
+        Returns:
+            Dictionary with acquisitions, delayed calls, callers currently
+            queued, and total/average/max queue wait in seconds
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats['available'] = round(max(self._tokens, 0.0), 3)
+
+        stats['name'] = self.name
+        stats['rate_per_minute'] = round(self.rate * 60, 3)
+        stats['capacity'] = self.capacity
+        stats['avg_wait'] = round(stats['total_wait'] / stats['acquired'], 4) if stats['acquired'] else 0.0
+        stats['total_wait'] = round(stats['total_wait'], 3)
+        stats['max_wait'] = round(stats['max_wait'], 3)
+        return stats
+
+
+# Default burst as a share of the per-minute quota, so a batch of calls
+# (e.g. a multi-city run on a cold cache) goes out at once instead of
+# being spread over the minute
+DEFAULT_BURST_FRACTION = 0.5
+
+# Limiters built from the environment, shared process-wide so every service
+# instance (and every Streamlit session) draws on the same quota
+_env_limiters: Dict[Any, TokenBucket] = {}
+_env_limiters_lock = threading.Lock()
+
+
+def limiter_from_env(variable: str, default_per_minute: float, name: str = "",
+                     burst_variable: Optional[str] = None) -> Optional[TokenBucket]:
+    """
+    Get the process-wide per-minute limiter configured by environment variables
+
+    Calls with the same variables, name, rate and burst return the same bucket.
+
+    Args:
+        variable: Environment variable holding calls per minute ("0" disables limiting)
+        default_per_minute: Rate used when the variable is unset
+        name: Label used in stats
+        burst_variable: Environment variable holding the burst size
+            (defaults to DEFAULT_BURST_FRACTION of the per-minute rate)
+
+    Returns:
+        TokenBucket, or None if limiting is disabled
+    """
+    per_minute = float(os.getenv(variable, default_per_minute))
+    if per_minute <= 0:
+        return None
+    burst = float(os.getenv(burst_variable, 0)) if burst_variable else 0.0
+    if burst <= 0:
+        burst = per_minute * DEFAULT_BURST_FRACTION
+    burst = max(1.0, burst)
+    key = (variable, name, per_minute, burst)
+    with _env_limiters_lock:
+        limiter = _env_limiters.get(key)
+        if limiter is None:
+            limiter = _env_limiters[key] = TokenBucket.per_minute(per_minute, burst=burst, name=name)
+        return limiter
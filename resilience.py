@@ -0,0 +1,157 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Optional
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies per key, for percentile estimates"""
+
+    def __init__(self, window: int = 100):
+        """
+        Args:
+            window: Number of most recent samples kept per key
+        """
+        self.window = window
+        self._samples: Dict[Hashable, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: Hashable, seconds: float):
+        """Add a latency sample"""
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: Hashable, q: float) -> Optional[float]:
+        """
+        Get a latency percentile (nearest rank)
+
+        Args:
+            key: Sample key
+            q: Percentile between 0 and 1, e.g. 0.95
+
+        Returns:
+            Latency in seconds, or None without samples
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        rank = max(1, math.ceil(q * len(samples)))
+        return samples[rank - 1]
+
+    def count(self, key: Hashable) -> int:
+        """Number of samples currently held for a key"""
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get sample count and p50/p95 per key"""
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            str(key): {
+                'samples': self.count(key),
+                'p50': self.percentile(key, 0.5),
+                'p95': self.percentile(key, 0.95)
+            }
+            for key in keys
+        }
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Closed: calls pass. After failure_threshold consecutive failures the
+    circuit opens and calls fail fast. Once reset_timeout has passed, one
+    trial call is let through (half-open); its outcome closes or re-opens
+    the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {
+            'opened': 0,
+            'rejected': 0
+        }
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may proceed
+
+        Returns:
+            False while the circuit is open (the call should fail fast)
+        """
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            self._stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        """Close the circuit and reset the failure count"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Free the half-open trial after a call that ended with no outcome (e.g. a stream closed early)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Count a failure, opening the circuit at the threshold or after a failed trial"""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+                self._stats['opened'] += 1
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until a trial call will be allowed (0 unless open)"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get state, consecutive failures and open/rejected counters"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats['state'] = self._state
+            stats['consecutive_failures'] = self._failures
+        return stats
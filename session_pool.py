@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Tuple
+
+
+class SessionPool:
+    """Per-agent pool of reusable Julep chat sessions"""
+
+    def __init__(
+        self,
+        create_session: Callable[[str], str],
+        max_idle: int = 4,
+        idle_timeout: float = 900.0,
+        max_uses: int = 50
+    ):
+        """
+        Args:
+            create_session: Callable taking an agent type and returning a new session ID
+            max_idle: Maximum idle sessions kept per agent
+            idle_timeout: Seconds an idle session stays reusable
+            max_uses: Chats served by a session before it is retired
+        """
+        self.create_session = create_session
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.max_uses = max_uses
+
+        # agent_type -> idle (session_id, last_used, uses), most recently used last
+        self._idle: Dict[str, Deque[Tuple[str, float, int]]] = {}
+        # session_id -> uses for sessions currently checked out
+        self._in_use: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'created': 0,
+            'reused': 0,
+            'expired': 0,
+            'retired': 0
+        }
+
+    def acquire(self, agent_type: str) -> str:
+        """
+        Check out a session for an agent, creating one if none is idle
+
+        Args:
+            agent_type: Type of agent the session belongs to
+
+        Returns:
+            Session ID
+        """
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.setdefault(agent_type, deque())
+            while idle:
+                session_id, last_used, uses = idle.pop()
+                if now - last_used > self.idle_timeout:
+                    self._stats['expired'] += 1
+                    continue
+                self._in_use[session_id] = uses
+                self._stats['reused'] += 1
+                return session_id
+
+        # Create outside the lock so other agents aren't blocked on the API call
+        session_id = self.create_session(agent_type)
+        with self._lock:
+            self._in_use[session_id] = 0
+            self._stats['created'] += 1
+        return session_id
+
+    def release(self, agent_type: str, session_id: str, reusable: bool = True):
+        """
+        Return a session to the pool
+
+        Args:
+            agent_type: Type of agent the session belongs to
+            session_id: Session ID from acquire()
+            reusable: False to drop the session (e.g. after an error)
+        """
+        with self._lock:
+            uses = self._in_use.pop(session_id, 0) + 1
+            if not reusable or uses >= self.max_uses:
+                self._stats['retired'] += 1
+                return
+
+            idle = self._idle.setdefault(agent_type, deque())
+            idle.append((session_id, time.monotonic(), uses))
+            while len(idle) > self.max_idle:
+                idle.popleft()
+                self._stats['retired'] += 1
+
+    def clear(self):
+        """Drop all idle sessions"""
+        with self._lock:
+            self._idle.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get created/reused/expired/retired counters and idle sessions per agent"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats['in_use'] = len(self._in_use)
+            stats['idle'] = {agent_type: len(idle) for agent_type, idle in self._idle.items()}
+        return stats
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """An in-flight computation and its outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution (threads)"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'executions': 0,
+            'coalesced': 0
+        }
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run func, or wait for the identical call already in flight
+
+        Args:
+            key: Identifies equivalent calls
+            func: Callable to run if no call with this key is in flight
+            *args, **kwargs: Passed to func
+
+        Returns:
+            Tuple of (result, shared) where shared is True if another
+            caller's execution was reused
+
+        Raises:
+            Whatever func raised, in the leader and every waiter
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats['executions'] += 1
+            else:
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Later callers start a fresh execution (and usually hit a cache)
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get execution/coalesced counters and the keys currently in flight"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats['in_flight'] = {str(key): call.waiters for key, call in self._calls.items()}
+        return stats
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent coroutine calls with the same key into one task"""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._stats = {
+            'executions': 0,
+            'coalesced': 0
+        }
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]],
+                 *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Await func, or the identical call already in flight
+
+        The computation runs as its own task, so a caller that is cancelled
+        (e.g. a disconnected client) doesn't cancel it for the others.
+
+        Args:
+            key: Identifies equivalent calls
+            func: Coroutine function to run if no call with this key is in flight
+            *args, **kwargs: Passed to func
+
+        Returns:
+            Tuple of (result, shared) where shared is True if another
+            caller's execution was reused
+        """
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self._stats['coalesced'] += 1
+        else:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._tasks[key] = task
+            self._stats['executions'] += 1
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        """Drop a finished task so later callers start afresh"""
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get execution/coalesced counters and the keys currently in flight"""
+        stats: Dict[str, Any] = dict(self._stats)
+        stats['in_flight'] = [str(key) for key in self._tasks]
+        return stats
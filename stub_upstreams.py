@@ -0,0 +1,340 @@
+"""
+Local stand-ins for OpenWeatherMap and the Julep API
+
+Used by benchmark.py to exercise the real services without spending API
+quota. Both stubs take a latency model and an error rate, and count every
+call they serve.
+"""
+
+import hashlib
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class LatencyModel:
+    """Log-normal latency: most calls near the median, with a long right tail"""
+
+    def __init__(self, median: float, sigma: float = 0.5, seed: Optional[int] = None):
+        """
+        Args:
+            median: Median latency in seconds
+            sigma: Spread of the underlying normal; 0 gives a constant latency
+            seed: Seed for reproducible samples
+        """
+        self.median = median
+        self.sigma = sigma
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """Draw one latency in seconds"""
+        if self.median <= 0:
+            return 0.0
+        with self._lock:
+            return self.median * math.exp(self.sigma * self._random.gauss(0, 1))
+
+    def sleep(self):
+        time.sleep(self.sample())
+
+    def describe(self) -> Dict[str, float]:
+        return {'median': self.median, 'sigma': self.sigma}
+
+
+class StubUpstreamError(RuntimeError):
+    """Injected upstream failure"""
+
+
+class _FailureInjector:
+    """Thread-safe error-rate coin flips"""
+
+    def __init__(self, error_rate: float, seed: Optional[int] = None):
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def should_fail(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+def stub_weather_payload(city: str, city_id: Optional[int] = None) -> Dict[str, Any]:
+    """Deterministic OpenWeatherMap-shaped current weather for a city"""
+    digest = int(hashlib.sha256(city.casefold().encode('utf-8')).hexdigest(), 16)
+    conditions = [
+        ('Clear', 'clear sky'),
+        ('Clouds', 'scattered clouds'),
+        ('Rain', 'light rain'),
+        ('Drizzle', 'drizzle'),
+        ('Snow', 'light snow')
+    ]
+    main, description = conditions[digest % len(conditions)]
+    now = int(time.time())
+    return {
+        'id': city_id if city_id is not None else digest % 10_000_000,
+        'name': city,
+        'dt': now - 120,
+        'sys': {'country': 'XX', 'sunrise': now - 6 * 3600, 'sunset': now + 6 * 3600},
+        'main': {
+            'temp': round(-5 + (digest >> 8) % 400 / 10, 1),
+            'feels_like': round(-7 + (digest >> 8) % 400 / 10, 1),
+            'humidity': 30 + (digest >> 16) % 60
+        },
+        'weather': [{'main': main, 'description': description}],
+        'wind': {'speed': round((digest >> 24) % 120 / 10, 1)},
+        'clouds': {'all': (digest >> 32) % 100}
+    }
+
+
+class StubWeatherServer:
+    """OpenWeatherMap /weather and /group endpoints on a local port"""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            latency: Per-request latency model (defaults to none)
+            error_rate: Fraction of requests answered with HTTP 503
+            seed: Seed for reproducible failures
+        """
+        self.latency = latency or LatencyModel(0.0)
+        self.failures = _FailureInjector(error_rate, seed)
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._names: Dict[int, str] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/data/2.5"
+
+    def start(self) -> str:
+        """Start serving in a background thread and return the API base URL"""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                endpoint = url.path.rsplit('/', 1)[-1]
+                stub._count(endpoint)
+                stub.latency.sleep()
+
+                if stub.failures.should_fail():
+                    stub._count(f"{endpoint}_errors")
+                    self._send(503, {'cod': 503, 'message': 'stub failure'})
+                elif endpoint == 'weather':
+                    self._send(200, stub._weather(query['q'][0]))
+                elif endpoint == 'group':
+                    ids = [int(city_id) for city_id in query['id'][0].split(',')]
+                    self._send(200, {'cnt': len(ids), 'list': [stub._weather_by_id(city_id) for city_id in ids]})
+                else:
+                    self._send(404, {'cod': 404, 'message': 'not found'})
+
+            def _send(self, status: int, body: Dict[str, Any]):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _count(self, name: str):
+        with self._lock:
+            self.calls[name] += 1
+
+    def _weather(self, city: str) -> Dict[str, Any]:
+        payload = stub_weather_payload(city)
+        with self._lock:
+            self._names[payload['id']] = city
+        return payload
+
+    def _weather_by_id(self, city_id: int) -> Dict[str, Any]:
+        with self._lock:
+            city = self._names.get(city_id, f"City {city_id}")
+        return stub_weather_payload(city, city_id)
+
+
+class _StubStreamResponse:
+    """Minimal stand-in for the SDK's raw streaming response"""
+
+    headers = {'content-type': 'text/event-stream'}
+
+    def __init__(self, text: str, chunk_chars: int):
+        self.text = text
+        self.chunk_chars = chunk_chars
+
+    def iter_lines(self) -> Iterator[str]:
+        for start in range(0, len(self.text), self.chunk_chars):
+            chunk = self.text[start:start + self.chunk_chars]
+            yield "data: " + json.dumps({'choices': [{'delta': {'content': chunk}}]})
+        yield "data: [DONE]"
+
+
+class StubJulepClient:
+    """
+    In-process stand-in for the Julep SDK client
+
+    Implements the calls JulepAgentService makes: agents, sessions
+    (plain and streamed chat), tasks and executions. Chat latency
+    is drawn from the latency model; executions run for about five
+    chat latencies.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, error_rate: float = 0.0,
+                 response_chars: int = 1200, api_latency: Optional[LatencyModel] = None,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            latency: Latency of a chat until its first token
+            error_rate: Fraction of chats and executions that fail
+            response_chars: Size of each agent response
+            api_latency: Latency of bookkeeping calls (sessions, agents, polls)
+            seed: Seed for reproducible failures
+        """
+        self.latency = latency or LatencyModel(0.0)
+        self.api_latency = api_latency or LatencyModel(0.0)
+        self.failures = _FailureInjector(error_rate, seed)
+        self.response_chars = response_chars
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._agents: Dict[str, Any] = {}
+        self._tasks: List[Any] = []
+        self._executions: Dict[str, Dict[str, Any]] = {}
+
+        self.agents = SimpleNamespace(list=self._list_agents, create=self._create_agent, update=self._update_agent)
+        self.sessions = SimpleNamespace(
+            create=self._create_session,
+            chat=self._chat,
+            with_streaming_response=SimpleNamespace(chat=self._stream_chat)
+        )
+        self.tasks = SimpleNamespace(list=self._list_tasks, create=self._create_task)
+        self.executions = SimpleNamespace(create=self._create_execution, get=self._get_execution)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.calls[name] += 1
+
+    def _new_id(self, prefix: str) -> str:
+        with self._lock:
+            return f"{prefix}-{next(self._ids)}"
+
+    def _reply(self, messages: List[Dict[str, Any]]) -> str:
+        prompt = messages[0]['content'] if messages else ""
+        head = f"Stub answer to: {' '.join(prompt.split())[:80]}\n"
+        filler = "Local dishes, restaurants and a walking route for the weather. "
+        return (head + filler * (self.response_chars // len(filler) + 1))[:max(self.response_chars, len(head))]
+
+    def _maybe_fail(self, operation: str):
+        if self.failures.should_fail():
+            self._count(f"{operation}_errors")
+            raise StubUpstreamError(f"stub {operation} failure")
+
+    # Agents
+
+    def _list_agents(self, **kwargs) -> SimpleNamespace:
+        self._count('agents.list')
+        self.api_latency.sleep()
+        return SimpleNamespace(items=list(self._agents.values()))
+
+    def _create_agent(self, **kwargs) -> SimpleNamespace:
+        self._count('agents.create')
+        self.api_latency.sleep()
+        agent = SimpleNamespace(id=self._new_id('agent'), **kwargs)
+        self._agents[agent.id] = agent
+        return agent
+
+    def _update_agent(self, agent_id: str, **kwargs) -> SimpleNamespace:
+        self._count('agents.update')
+        self.api_latency.sleep()
+        agent = SimpleNamespace(id=agent_id, **kwargs)
+        self._agents[agent_id] = agent
+        return agent
+
+    # Sessions
+
+    def _create_session(self, **kwargs) -> SimpleNamespace:
+        self._count('sessions.create')
+        self.api_latency.sleep()
+        return SimpleNamespace(id=self._new_id('session'))
+
+    def _chat(self, session_id: str, messages: List[Dict[str, Any]], **kwargs) -> SimpleNamespace:
+        self._count('sessions.chat')
+        self.latency.sleep()
+        self._maybe_fail('sessions.chat')
+        message = SimpleNamespace(content=self._reply(messages))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    @contextmanager
+    def _stream_chat(self, session_id: str, messages: List[Dict[str, Any]], **kwargs):
+        self._count('sessions.stream')
+        self.latency.sleep()
+        self._maybe_fail('sessions.stream')
+        yield _StubStreamResponse(self._reply(messages), chunk_chars=40)
+
+    # Tasks and executions
+
+    def _list_tasks(self, agent_id: str, **kwargs) -> SimpleNamespace:
+        self._count('tasks.list')
+        self.api_latency.sleep()
+        return SimpleNamespace(items=list(self._tasks))
+
+    def _create_task(self, agent_id: str, **kwargs) -> SimpleNamespace:
+        self._count('tasks.create')
+        self.api_latency.sleep()
+        task = SimpleNamespace(id=self._new_id('task'), **kwargs)
+        self._tasks.append(task)
+        return task
+
+    def _create_execution(self, task_id: str, input: Dict[str, Any]) -> SimpleNamespace:
+        self._count('executions.create')
+        self.api_latency.sleep()
+        execution_id = self._new_id('execution')
+        duration = sum(self.latency.sample() for _ in range(5))
+        self._executions[execution_id] = {
+            'ready_at': time.monotonic() + duration,
+            'failed': self.failures.should_fail(),
+            'city': input.get('city')
+        }
+        return SimpleNamespace(id=execution_id)
+
+    def _get_execution(self, execution_id: str) -> SimpleNamespace:
+        self._count('executions.get')
+        self.api_latency.sleep()
+        execution = self._executions[execution_id]
+        if time.monotonic() < execution['ready_at']:
+            return SimpleNamespace(status='running', output=None, error=None)
+        if execution['failed']:
+            self._count('executions_errors')
+            return SimpleNamespace(status='failed', output=None, error='stub execution failure')
+        guide = self._reply([{'content': f"Final guide for {execution['city']}"}])
+        return SimpleNamespace(status='succeeded', output=guide, error=None)
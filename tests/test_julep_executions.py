@@ -0,0 +1,30 @@
+import time
+
+import pytest
+
+from julep_service import JulepAgentService
+from stub_upstreams import LatencyModel, StubJulepClient
+
+
+@pytest.fixture
+def julep_service(monkeypatch):
+    for variable in ('FOODIE_JULEP_RATE_PER_MIN', 'FOODIE_JULEP_AGENT_RATE_PER_MIN'):
+        monkeypatch.setenv(variable, '0')
+    service = JulepAgentService("test", hedge_requests=False)
+    # Executions run for about five chat latencies: 5s, far past the timeout below
+    service.client = StubJulepClient(latency=LatencyModel(1.0, sigma=0))
+    return service
+
+
+def test_wait_for_executions_shares_one_deadline(julep_service):
+    execution_ids = [
+        julep_service.client.executions.create(task_id="task", input={'city': f"City {index}"}).id
+        for index in range(40)
+    ]
+
+    started = time.monotonic()
+    outcomes = julep_service.wait_for_executions(execution_ids, timeout=0.3)
+
+    # 40 waiters on 16 threads: without a shared deadline this takes about 3 x 0.3s
+    assert time.monotonic() - started < 0.6
+    assert {outcome['status'] for outcome in outcomes.values()} == {'timeout'}
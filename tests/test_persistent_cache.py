@@ -0,0 +1,25 @@
+from persistent_cache import PersistentCache
+
+
+def test_oversized_value_is_rejected_without_flushing(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.db"), max_bytes=100)
+    assert cache.set('weather', 'paris', {'temperature': 12})
+
+    assert not cache.set('tours', 'big', 'y' * 500)
+
+    assert cache.get('weather', 'paris') == {'temperature': 12}
+    assert cache.get('tours', 'big') is None
+    stats = cache.get_stats()
+    assert stats['rejected'] == 1
+    assert stats['namespaces'] == {'weather': {'entries': 1, 'bytes': len('{"temperature": 12}')}}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.db"), max_bytes=100)
+    cache.set('tours', 'a', 'x' * 40)
+    cache.set('tours', 'b', 'x' * 40)
+    cache.get('tours', 'a')
+
+    cache.set('tours', 'c', 'x' * 40)
+
+    assert sorted(cache.keys('tours')) == ['a', 'c']
@@ -0,0 +1,28 @@
+from prompt_compaction import compact_context, extract_names
+
+
+def test_extract_names_mixed_formatting():
+    text = "1. **Ramen**\n2. Sushi\n3. **Tempura**\n4. Oden"
+
+    assert extract_names(text) == ["Ramen", "Sushi", "Tempura", "Oden"]
+
+
+def test_extract_names_skips_labels_and_descriptions():
+    text = (
+        "1. **Ramen** - rich pork broth\n"
+        "   - **Why it's perfect:** warms you up\n"
+        "2. Sushi (fresh from the market)\n"
+        "### 3. Oden\n"
+    )
+
+    assert extract_names(text) == ["Ramen", "Sushi", "Oden"]
+
+
+def test_extract_names_unstructured_text():
+    assert extract_names("Try something warm and local today.") == []
+
+
+def test_compact_context_falls_back_to_excerpt():
+    context = compact_context("test", dishes="Try something warm and local today.")
+
+    assert context == "- Dishes: Try something warm and local today."
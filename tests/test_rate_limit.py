@@ -0,0 +1,23 @@
+from rate_limit import limiter_from_env
+
+
+def test_env_limiter_allows_a_burst_and_is_shared(monkeypatch):
+    monkeypatch.setenv('FOODIE_TEST_RATE_PER_MIN', '60')
+    limiter = limiter_from_env('FOODIE_TEST_RATE_PER_MIN', 10, name="test")
+
+    assert limiter is limiter_from_env('FOODIE_TEST_RATE_PER_MIN', 10, name="test")
+    # Ten calls fit in the default burst of half a minute's quota
+    assert all(limiter.reserve() == 0.0 for _ in range(10))
+
+
+def test_env_limiter_burst_override(monkeypatch):
+    monkeypatch.setenv('FOODIE_TEST_RATE_PER_MIN', '60')
+    monkeypatch.setenv('FOODIE_TEST_BURST', '2')
+    limiter = limiter_from_env('FOODIE_TEST_RATE_PER_MIN', 10, name="test", burst_variable='FOODIE_TEST_BURST')
+
+    assert [limiter.reserve() > 0 for _ in range(3)] == [False, False, True]
+
+
+def test_env_limiter_disabled(monkeypatch):
+    monkeypatch.setenv('FOODIE_TEST_RATE_PER_MIN', '0')
+    assert limiter_from_env('FOODIE_TEST_RATE_PER_MIN', 10) is None
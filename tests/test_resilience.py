@@ -0,0 +1,52 @@
+import pytest
+
+from julep_service import JulepAgentService
+from resilience import CircuitBreaker
+from stub_upstreams import StubJulepClient
+
+
+@pytest.fixture
+def julep_service(monkeypatch):
+    for variable in ('FOODIE_JULEP_RATE_PER_MIN', 'FOODIE_JULEP_AGENT_RATE_PER_MIN'):
+        monkeypatch.setenv(variable, '0')
+    service = JulepAgentService("test", hedge_requests=False)
+    service.client = StubJulepClient(response_chars=400)
+    assert service.create_agents()
+    return service
+
+
+def test_failed_trial_reopens_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.get_stats()['opened'] == 2
+
+
+def test_stream_closed_during_half_open_trial_releases_it(julep_service):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    julep_service.circuit_breakers['culinary'] = breaker
+    breaker.record_failure()
+
+    # The trial call is abandoned after its first chunk
+    stream = julep_service.chat_with_agent_stream('culinary', "Suggest a dish")
+    assert next(stream)
+    stream.close()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_completed_stream_closes_circuit(julep_service):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    julep_service.circuit_breakers['culinary'] = breaker
+    breaker.record_failure()
+
+    response = "".join(julep_service.chat_with_agent_stream('culinary', "Suggest a dish"))
+
+    assert response
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,118 @@
+import math
+import os
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+
+from persistent_cache import PersistentCache
+from utils import get_weather_condition
+
+TOURS_NAMESPACE = "tours"
+# A tour is reused while its weather bucket matches, for at most this long
+TOUR_CACHE_TTL = 6 * 60 * 60
+
+# Default banding: 5°C temperature bands, rain tiers split at 20% and 50%
+# (the thresholds WeatherService.get_dining_recommendation reacts to)
+DEFAULT_TEMPERATURE_BAND = 5.0
+DEFAULT_RAIN_TIERS = (20, 50)
+
+# Streamlit tour fields -> MCP tour fields (the MCP shape is what gets stored)
+APP_TO_SHARED_FIELDS = {
+    'dishes': 'culinary_suggestions',
+    'restaurants': 'restaurant_recommendations',
+    'narrative': 'tour_narrative',
+    'final_tour': 'final_tour_guide'
+}
+
+
+class WeatherBuckets:
+    """Rules for quantizing weather into a tour cache signature"""
+
+    def __init__(self, temperature_band: float = DEFAULT_TEMPERATURE_BAND,
+                 rain_tiers: Sequence[int] = DEFAULT_RAIN_TIERS):
+        """
+        Args:
+            temperature_band: Width of each temperature band in °C
+            rain_tiers: Ascending rain probability thresholds separating tiers
+        """
+        self.temperature_band = temperature_band
+        self.rain_tiers = tuple(sorted(rain_tiers))
+
+    @classmethod
+    def from_env(cls) -> "WeatherBuckets":
+        """Build rules from FOODIE_TEMP_BAND and FOODIE_RAIN_TIERS (e.g. "20,50")"""
+        band = float(os.getenv('FOODIE_TEMP_BAND', DEFAULT_TEMPERATURE_BAND))
+        tiers = os.getenv('FOODIE_RAIN_TIERS')
+        rain_tiers = [int(tier) for tier in tiers.split(',')] if tiers else DEFAULT_RAIN_TIERS
+        return cls(temperature_band=band, rain_tiers=rain_tiers)
+
+    def signature(self, weather_data: Dict[str, Any]) -> str:
+        """
+        Quantize weather into a signature, e.g. "cloud-t15-r1"
+
+        Args:
+            weather_data: Weather information from WeatherService
+
+        Returns:
+            Condition class, temperature band floor and rain tier
+        """
+        band_floor = math.floor(weather_data['temperature'] / self.temperature_band) * self.temperature_band
+        rain_tier = bisect_right(self.rain_tiers, weather_data['rain_probability'])
+        condition = get_weather_condition(weather_data['description'])
+        return f"{condition}-t{band_floor:g}-r{rain_tier}"
+
+
+def tour_cache_key(city: str, weather_data: Dict[str, Any],
+                   buckets: Optional[WeatherBuckets] = None) -> str:
+    """Build the shared cache key for a city's tour under its current weather bucket"""
+    normalized = " ".join(city.split()).casefold()
+    return f"{normalized}|{(buckets or WeatherBuckets()).signature(weather_data)}"
+
+
+def to_shared_tour(tour: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a Streamlit tour into the stored (MCP) shape"""
+    shared = {APP_TO_SHARED_FIELDS.get(field, field): value for field, value in tour.items()}
+    shared.setdefault('created_at', datetime.now().isoformat())
+    return shared
+
+
+def to_app_tour(tour: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a stored (MCP) tour into the Streamlit shape"""
+    shared_to_app = {shared: app for app, shared in APP_TO_SHARED_FIELDS.items()}
+    return {shared_to_app.get(field, field): value for field, value in tour.items()}
+
+
+class TourStore:
+    """Completed tours persisted in the shared cache, keyed by city and weather bucket"""
+
+    def __init__(self, cache: Optional[PersistentCache], ttl: float = TOUR_CACHE_TTL,
+                 buckets: Optional[WeatherBuckets] = None):
+        self.cache = cache
+        self.ttl = ttl
+        self.buckets = buckets or WeatherBuckets.from_env()
+
+    def key(self, city: str, weather_data: Dict[str, Any]) -> str:
+        """Cache key for a city's tour under the given weather"""
+        return tour_cache_key(city, weather_data, self.buckets)
+
+    def get(self, city: str, weather_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Get a stored tour generated under the same weather bucket
+
+        Returns:
+            Tour in the MCP shape, or None
+        """
+        if self.cache is None:
+            return None
+        return self.cache.get(TOURS_NAMESPACE, self.key(city, weather_data))
+
+    def put(self, city: str, weather_data: Dict[str, Any], tour: Dict[str, Any]) -> bool:
+        """
+        Store a completed tour in the MCP shape
+
+        Returns:
+            True if the tour was stored
+        """
+        if self.cache is None:
+            return False
+        return self.cache.set(TOURS_NAMESPACE, self.key(city, weather_data), tour, ttl=self.ttl)
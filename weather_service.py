@@ -1,114 +1,418 @@
-import requests
-import os
-from datetime import datetime
-from typing import Dict, Any, Optional
-
-class WeatherService:
-    """Service for fetching weather data from OpenWeatherMap API"""
-    
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        self.base_url = "http://api.openweathermap.org/data/2.5"
-    
-    def get_weather_data(self, city: str) -> Optional[Dict[str, Any]]:
-        """
-        Fetch current weather data for a city
-        
-        Args:
-            city: Name of the city
-            
-        Returns:
-            Dictionary containing weather data or None if error
-        """
-        try:
-            # Current weather endpoint
-            url = f"{self.base_url}/weather"
-            params = {
-                'q': city,
-                'appid': self.api_key,
-                'units': 'metric'  # For Celsius
-            }
-            
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Extract relevant information
-            weather_data = {
-                'city': data['name'],
-                'country': data['sys']['country'],
-                'temperature': round(data['main']['temp']),
-                'feels_like': round(data['main']['feels_like']),
-                'humidity': data['main']['humidity'],
-                'description': data['weather'][0]['description'].title(),
-                'wind_speed': round(data['wind']['speed'], 1),
-                'sunrise': datetime.fromtimestamp(data['sys']['sunrise']).strftime("%H:%M"),
-                'sunset': datetime.fromtimestamp(data['sys']['sunset']).strftime("%H:%M"),
-                'rain_probability': self._get_rain_probability(data)
-            }
-            
-            return weather_data
-            
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching weather data for {city}: {e}")
-            return None
-        except KeyError as e:
-            print(f"Error parsing weather data for {city}: {e}")
-            return None
-    
-    def _get_rain_probability(self, data: Dict[str, Any]) -> int:
-        """
-        Extract rain probability from weather data
-        
-        Args:
-            data: Raw weather API response
-            
-        Returns:
-            Rain probability as percentage
-        """
-        # OpenWeatherMap doesn't always provide rain probability in current weather
-        # We'll estimate based on weather conditions
-        weather_main = data['weather'][0]['main'].lower()
-        
-        if 'rain' in weather_main:
-            return 80
-        elif 'drizzle' in weather_main:
-            return 60
-        elif 'cloud' in weather_main:
-            humidity = data['main']['humidity']
-            if humidity > 80:
-                return 40
-            elif humidity > 60:
-                return 20
-            else:
-                return 10
-        elif 'clear' in weather_main:
-            return 5
-        else:
-            return 15
-    
-    def get_dining_recommendation(self, weather_data: Dict[str, Any]) -> str:
-        """
-        Generate dining recommendation based on weather conditions
-        
-        Args:
-            weather_data: Weather information
-            
-        Returns:
-            Dining recommendation string
-        """
-        temp = weather_data['temperature']
-        rain_prob = weather_data['rain_probability']
-        description = weather_data['description'].lower()
-        
-        if rain_prob > 50:
-            return "🏠 Perfect weather for cozy indoor dining with warm comfort foods!"
-        elif temp < 10:
-            return "🔥 Cold weather calls for warm, hearty meals in comfortable indoor spaces!"
-        elif temp > 25 and rain_prob < 20:
-            return "☀️ Beautiful weather for outdoor dining, rooftop restaurants, and patio experiences!"
-        elif 15 <= temp <= 25:
-            return "🌤️ Pleasant weather ideal for both indoor and outdoor dining options!"
-        else:
-            return "🏛️ Mixed conditions - indoor dining recommended with possible outdoor options!"
+import asyncio
+import httpx
+import requests
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional
+from http_transport import HTTPTransport, AsyncHTTPTransport
+from cache import TTLCache
+from persistent_cache import PersistentCache
+from rate_limit import TokenBucket, limiter_from_env
+from metrics import Metrics, metrics as default_metrics
+from cassette import Cassette
+
+# OpenWeatherMap refreshes current conditions roughly every 10 minutes
+WEATHER_CACHE_TTL = 600
+# Lower bound so observations older than the TTL aren't refetched on every call
+MIN_WEATHER_CACHE_TTL = 60
+WEATHER_NAMESPACE = "weather"
+# The group endpoint accepts at most 20 city IDs per request
+GROUP_MAX_IDS = 20
+# Free tier quota (calls per minute), overridable with FOODIE_WEATHER_RATE_PER_MIN
+WEATHER_RATE_PER_MINUTE = 60
+
+class WeatherService:
+    """Service for fetching weather data from OpenWeatherMap API"""
+    
+    def __init__(self, api_key: str, transport: Optional[HTTPTransport] = None,
+                 cache_size: int = 256, cache_ttl: float = WEATHER_CACHE_TTL,
+                 async_transport: Optional[AsyncHTTPTransport] = None,
+                 persistent_cache: Optional[PersistentCache] = None,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 metrics: Optional[Metrics] = None,
+                 cassette: Optional[Cassette] = None):
+        self.api_key = api_key
+        self.base_url = "http://api.openweathermap.org/data/2.5"
+        # One quota shared by the sync and async transports; excess calls queue
+        self.rate_limiter = rate_limiter or limiter_from_env(
+            'FOODIE_WEATHER_RATE_PER_MIN', WEATHER_RATE_PER_MINUTE, name="openweather",
+            burst_variable='FOODIE_WEATHER_BURST'
+        )
+        # Pooled keep-alive transport shared by every lookup from this service
+        self.transport = transport or HTTPTransport(rate_limiter=self.rate_limiter)
+        # Non-blocking transport for callers running inside an event loop
+        self.async_transport = async_transport or AsyncHTTPTransport(rate_limiter=self.rate_limiter)
+        # Record live traffic to, or serve it back from, a cassette file
+        self.cassette = cassette
+        if cassette:
+            self.transport = cassette.transport(self.transport)
+            self.async_transport = cassette.async_transport(self.async_transport)
+        self.cache_ttl = cache_ttl
+        self.cache = TTLCache(max_entries=cache_size, ttl=cache_ttl)
+        # Optional cross-process snapshot store consulted on in-memory misses
+        self.persistent_cache = persistent_cache
+        # OpenWeatherMap city IDs learned from earlier lookups, used for group requests
+        self._city_ids: Dict[str, int] = {}
+        # Lookup and upstream fetch latencies ('weather.get' includes cache hits)
+        self.metrics = metrics or default_metrics
+    
+    def get_weather_data(self, city: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch current weather data for a city
+        
+        Args:
+            city: Name of the city
+            
+        Returns:
+            Dictionary containing weather data or None if error
+        """
+        with self.metrics.timer('weather.get'):
+            cache_key = self._normalize_city(city)
+            cached = self._get_cached(cache_key)
+            if cached is not None:
+                return dict(cached)
+            
+            try:
+                return dict(self._fetch_weather(city))
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching weather data for {city}: {e}")
+                return None
+            except KeyError as e:
+                print(f"Error parsing weather data for {city}: {e}")
+                return None
+    
+    async def get_weather_data_async(self, city: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch current weather data for a city without blocking the event loop
+        
+        Shares the cache and output shape with get_weather_data.
+        
+        Args:
+            city: Name of the city
+            
+        Returns:
+            Dictionary containing weather data or None if error
+        """
+        with self.metrics.timer('weather.get'):
+            loop = asyncio.get_running_loop()
+            cache_key = self._normalize_city(city)
+            cached = self.cache.get(cache_key)
+            if cached is None and self.persistent_cache is not None:
+                # SQLite reads and writes run on a worker thread, not the event loop
+                cached = await loop.run_in_executor(None, self._get_persisted, cache_key)
+            if cached is not None:
+                return dict(cached)
+            
+            try:
+                url = f"{self.base_url}/weather"
+                params = {
+                    'q': city,
+                    'appid': self.api_key,
+                    'units': 'metric'
+                }
+                
+                with self.metrics.timer('weather.fetch'):
+                    response = await self.async_transport.get(url, params=params)
+                    response.raise_for_status()
+                    payload = response.json()
+                    if self.persistent_cache is not None:
+                        weather_data = await loop.run_in_executor(None, self._store, cache_key, payload)
+                    else:
+                        weather_data = self._store(cache_key, payload)
+                return dict(weather_data)
+            except httpx.HTTPError as e:
+                print(f"Error fetching weather data for {city}: {e}")
+                return None
+            except (KeyError, ValueError) as e:
+                print(f"Error parsing weather data for {city}: {e}")
+                return None
+    
+    def get_weather_data_many(self, cities: List[str], max_workers: int = 8) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch current weather data for several cities at once
+        
+        Cached cities are served locally. Cities whose OpenWeatherMap ID is
+        already known are fetched with the group endpoint (up to 20 per
+        request); the rest are fetched concurrently one city per request.
+        
+        Args:
+            cities: Names of the cities
+            max_workers: Maximum concurrent single-city requests
+            
+        Returns:
+            Dictionary with 'results' (city -> weather data) and
+            'errors' (city -> error message)
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, str] = {}
+        pending: List[str] = []
+        
+        for city in dict.fromkeys(cities):
+            cached = self._get_cached(self._normalize_city(city))
+            if cached is not None:
+                results[city] = dict(cached)
+            else:
+                pending.append(city)
+        
+        known = [city for city in pending if self._normalize_city(city) in self._city_ids]
+        unknown = [city for city in pending if self._normalize_city(city) not in self._city_ids]
+        
+        for i in range(0, len(known), GROUP_MAX_IDS):
+            chunk = known[i:i + GROUP_MAX_IDS]
+            try:
+                fetched = self._fetch_weather_group(chunk)
+            except (requests.exceptions.RequestException, KeyError) as e:
+                print(f"Error fetching grouped weather data, falling back to single requests: {e}")
+                fetched = {}
+            
+            for city in chunk:
+                if city in fetched:
+                    results[city] = dict(fetched[city])
+                else:
+                    unknown.append(city)
+        
+        if unknown:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(unknown))) as executor:
+                futures = {executor.submit(self._fetch_weather, city): city for city in unknown}
+                for future in as_completed(futures):
+                    city = futures[future]
+                    try:
+                        results[city] = dict(future.result())
+                    except requests.exceptions.RequestException as e:
+                        errors[city] = f"Error fetching weather data: {e}"
+                    except KeyError as e:
+                        errors[city] = f"Error parsing weather data: {e}"
+        
+        return {'results': results, 'errors': errors}
+    
+    def _fetch_weather(self, city: str) -> Dict[str, Any]:
+        """
+        Fetch, parse and cache current weather for one city
+        
+        Raises:
+            requests.exceptions.RequestException: On HTTP errors
+            KeyError: If the payload is missing expected fields
+        """
+        # Current weather endpoint
+        url = f"{self.base_url}/weather"
+        params = {
+            'q': city,
+            'appid': self.api_key,
+            'units': 'metric'  # For Celsius
+        }
+        
+        with self.metrics.timer('weather.fetch'):
+            response = self.transport.get(url, params=params)
+            response.raise_for_status()
+            
+            data = response.json()
+            return self._store(self._normalize_city(city), data)
+    
+    def _fetch_weather_group(self, cities: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch current weather for cities with known IDs in a single request
+        
+        Args:
+            cities: Up to GROUP_MAX_IDS city names with known IDs
+            
+        Returns:
+            Dictionary mapping each returned city name to its weather data
+        """
+        ids = {self._city_ids[self._normalize_city(city)]: city for city in cities}
+        
+        url = f"{self.base_url}/group"
+        params = {
+            'id': ",".join(str(city_id) for city_id in ids),
+            'appid': self.api_key,
+            'units': 'metric'
+        }
+        
+        with self.metrics.timer('weather.fetch_group'):
+            response = self.transport.get(url, params=params)
+            response.raise_for_status()
+            payload = response.json()
+        
+        fetched = {}
+        for data in payload['list']:
+            city = ids.get(data['id'])
+            if city is not None:
+                fetched[city] = self._store(self._normalize_city(city), data)
+        return fetched
+    
+    def _get_cached(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Look up a city in memory, then in the persistent snapshot store"""
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        return self._get_persisted(cache_key)
+    
+    def _get_persisted(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Look up a city in the persistent snapshot store and warm the memory cache"""
+        if self.persistent_cache is None:
+            return None
+        
+        entry = self.persistent_cache.get_entry(WEATHER_NAMESPACE, cache_key)
+        if entry is None:
+            return None
+        
+        weather_data, expires_at = entry
+        self.cache.set(cache_key, weather_data, ttl=expires_at - time.time())
+        return weather_data
+    
+    def _store(self, cache_key: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse a raw payload, cache it and remember the city ID"""
+        weather_data = self._parse_weather(data)
+        if 'id' in data:
+            self._city_ids[cache_key] = data['id']
+        
+        ttl = self._cache_ttl_for(data)
+        self.cache.set(cache_key, weather_data, ttl=ttl)
+        if self.persistent_cache is not None:
+            self.persistent_cache.set(WEATHER_NAMESPACE, cache_key, weather_data, ttl=ttl)
+        return weather_data
+    
+    def invalidate(self, city: str) -> bool:
+        """
+        Drop the cached weather for a city
+        
+        Args:
+            city: Name of the city
+            
+        Returns:
+            True if an entry was removed
+        """
+        cache_key = self._normalize_city(city)
+        removed = self.cache.invalidate(cache_key)
+        if self.persistent_cache is not None:
+            removed = self.persistent_cache.delete(WEATHER_NAMESPACE, cache_key) or removed
+        return removed
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get weather cache hit/miss/eviction statistics"""
+        return self.cache.get_stats()
+    
+    def _parse_weather(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extract relevant information from a raw current weather payload
+        
+        Args:
+            data: Raw weather API response
+            
+        Returns:
+            Dictionary containing weather data
+        """
+        return {
+            'city': data['name'],
+            'country': data['sys']['country'],
+            'temperature': round(data['main']['temp']),
+            'feels_like': round(data['main']['feels_like']),
+            'humidity': data['main']['humidity'],
+            'description': data['weather'][0]['description'].title(),
+            'wind_speed': round(data['wind']['speed'], 1),
+            'sunrise': datetime.fromtimestamp(data['sys']['sunrise']).strftime("%H:%M"),
+            'sunset': datetime.fromtimestamp(data['sys']['sunset']).strftime("%H:%M"),
+            'rain_probability': self._get_rain_probability(data)
+        }
+    
+    def _cache_ttl_for(self, data: Dict[str, Any]) -> float:
+        """
+        Compute how long a payload stays fresh
+        
+        The observation time (`dt`) anchors the TTL, so a reading that is
+        already 8 minutes old is only kept until the next expected update.
+        
+        Args:
+            data: Raw weather API response
+            
+        Returns:
+            TTL in seconds
+        """
+        observed_at = data.get('dt')
+        if not observed_at:
+            return self.cache_ttl
+        
+        remaining = observed_at + self.cache_ttl - time.time()
+        return max(MIN_WEATHER_CACHE_TTL, min(remaining, self.cache_ttl))
+    
+    @staticmethod
+    def _normalize_city(city: str) -> str:
+        """Normalize a city name for use as a cache key"""
+        return " ".join(city.split()).casefold()
+    
+    def _get_rain_probability(self, data: Dict[str, Any]) -> int:
+        """
+        Extract rain probability from weather data
+        
+        Args:
+            data: Raw weather API response
+            
+        Returns:
+            Rain probability as percentage
+        """
+        # OpenWeatherMap doesn't always provide rain probability in current weather
+        # We'll estimate based on weather conditions
+        weather_main = data['weather'][0]['main'].lower()
+        
+        if 'rain' in weather_main:
+            return 80
+        elif 'drizzle' in weather_main:
+            return 60
+        elif 'cloud' in weather_main:
+            humidity = data['main']['humidity']
+            if humidity > 80:
+                return 40
+            elif humidity > 60:
+                return 20
+            else:
+                return 10
+        elif 'clear' in weather_main:
+            return 5
+        else:
+            return 15
+    
+    def get_dining_recommendation(self, weather_data: Dict[str, Any]) -> str:
+        """
+        Generate dining recommendation based on weather conditions
+        
+        Args:
+            weather_data: Weather information
+            
+        Returns:
+            Dining recommendation string
+        """
+        temp = weather_data['temperature']
+        rain_prob = weather_data['rain_probability']
+        description = weather_data['description'].lower()
+        
+        if rain_prob > 50:
+            return "🏠 Perfect weather for cozy indoor dining with warm comfort foods!"
+        elif temp < 10:
+            return "🔥 Cold weather calls for warm, hearty meals in comfortable indoor spaces!"
+        elif temp > 25 and rain_prob < 20:
+            return "☀️ Beautiful weather for outdoor dining, rooftop restaurants, and patio experiences!"
+        elif 15 <= temp <= 25:
+            return "🌤️ Pleasant weather ideal for both indoor and outdoor dining options!"
+        else:
+            return "🏛️ Mixed conditions - indoor dining recommended with possible outdoor options!"
+    
+    def get_transport_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get HTTP request, retry and connection reuse counters"""
+        return {
+            'sync': self.transport.get_stats(),
+            'async': self.async_transport.get_stats()
+        }
+    
+    def get_rate_limit_stats(self) -> Optional[Dict[str, Any]]:
+        """Get OpenWeather quota usage and queue wait times, or None if unlimited"""
+        return self.rate_limiter.get_stats() if self.rate_limiter else None
+    
+    def close(self):
+        """Release pooled HTTP connections"""
+        self.transport.close()
+    
+    async def aclose(self):
+        """Release pooled HTTP connections, including the async pool"""
+        self.transport.close()
+        await self.async_transport.aclose()